@@ -0,0 +1,24 @@
+from fastapi import Depends, HTTPException, status
+from jose import JWTError
+
+from app.core.security import oauth2_scheme, token_verifier
+from app.services.user_cache import CachedUser, user_cache
+
+_CREDENTIALS_ERROR = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CachedUser:
+    # Claims and users both come from in-memory caches once seen
+    try:
+        email = token_verifier.verify(token).get("sub")
+    except JWTError:
+        raise _CREDENTIALS_ERROR
+    if not email:
+        raise _CREDENTIALS_ERROR
+    user = await user_cache.get(email)
+    if user is None or not user.is_active:
+        raise _CREDENTIALS_ERROR
+    return user
@@ -1,6 +1,21 @@
+from importlib import import_module
+from typing import Iterable
 from fastapi import APIRouter
-from app.api.v1.endpoints import search
 
-api_router = APIRouter()
+# URL prefix of each endpoint module; only the modules of the routers a
+# worker serves are imported
+ROUTERS = {
+    "auth": "/auth",
+    "admin": "/admin",
+    # Searches stay open: the frontend does not send a usable token yet
+    "search": "/search",
+}
 
-api_router.include_router(search.router, prefix="/search", tags=["search"]) 
\ No newline at end of file
+def create_api_router(names: Iterable[str]) -> APIRouter:
+    api_router = APIRouter()
+    for name in names:
+        if name not in ROUTERS:
+            raise ValueError(f"Unknown API router '{name}', expected one of {', '.join(ROUTERS)}")
+        module = import_module(f"app.api.v1.endpoints.{name}")
+        api_router.include_router(module.router, prefix=ROUTERS[name], tags=[name])
+    return api_router
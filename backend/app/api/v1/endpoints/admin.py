@@ -1,29 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from typing import Any, List
-import pandas as pd
-import io
+from typing import Any
 
 from app.db.session import get_db
-from app.models.user import User, UserRole
-from app.models.airport import Airport
-from app.models.flight import Flight
+from app.models.user import UserRole
 from app.services.openai_service import OpenAIService
+from app.services.ingest_specs import AIRPORTS, FLIGHTS, TableSpec
+from app.services.ingest_jobs import create_job, get_job, keep_upload, run_job
+from app.services.airport_index import airport_index
+from app.services.result_cache import result_cache, written_tables
+from app.services.flight_stats import refresh_flight_stats
+from app.services.schema_context import schema_context
 from app.core.security import oauth2_scheme
-from app.schemas.admin import AdminCommand, AdminResponse
+from app.api.deps import get_current_user
+from app.services.user_cache import CachedUser, user_cache
+from app.schemas.admin import AdminCommand, AdminResponse, IngestJobResponse, UploadResponse
 
 router = APIRouter()
 
-# Database schema information for OpenAI
-SCHEMA_INFO = """
-Tables:
-- airports (id, code, name, city, country, latitude, longitude, timezone, terminal_count, runway_count, description)
-- flights (id, flight_number, airline, departure_airport_id, arrival_airport_id, departure_time, arrival_time, duration, aircraft_type, status, gate, terminal, price)
-"""
-
-async def verify_admin(token: str = Depends(oauth2_scheme)) -> None:
-    # This would be implemented in a proper authentication middleware
-    pass
+async def verify_admin(token: str = Depends(oauth2_scheme)) -> CachedUser:
+    user = await get_current_user(token)
+    if user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return user
 
 @router.post("/command", response_model=AdminResponse)
 async def execute_admin_command(
@@ -34,12 +40,23 @@ async def execute_admin_command(
     await verify_admin(token)
     
     # Generate SQL query using OpenAI
-    sql_query = await OpenAIService.generate_admin_query(command.command, SCHEMA_INFO)
+    schema_context.ensure_fresh_sync(db)
+    sql_query = await OpenAIService.generate_admin_query(command.command, schema_context.for_admin())
     
     try:
         # Execute the query
-        result = db.execute(sql_query)
+        result = db.execute(text(sql_query))
         db.commit()
+        # Unparseable commands clear all cached results
+        tables = written_tables(sql_query)
+        result_cache.invalidate(tables)
+        if tables is None or "airports" in tables:
+            airport_index.invalidate()
+        if tables is None or "users" in tables:
+            user_cache.invalidate()
+        if tables is None or "flights" in tables:
+            # Commands may delete or move flights, so recompute everything
+            await run_in_threadpool(refresh_flight_stats, db)
         
         return {
             "command": command.command,
@@ -52,74 +69,72 @@ async def execute_admin_command(
             detail=f"Error executing command: {str(e)}"
         )
 
-@router.post("/upload/airports")
-async def upload_airports(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+async def _ingest_upload(
+    file: UploadFile,
+    spec: TableSpec,
+    label: str,
+    background: bool,
+    background_tasks: BackgroundTasks,
+    db: Session
 ) -> Any:
-    await verify_admin(token)
-    
     try:
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        for _, row in df.iterrows():
-            airport = Airport(
-                code=row['code'],
-                name=row['name'],
-                city=row['city'],
-                country=row['country'],
-                latitude=row['latitude'],
-                longitude=row['longitude'],
-                timezone=row['timezone'],
-                terminal_count=row.get('terminal_count'),
-                runway_count=row.get('runway_count'),
-                description=row.get('description')
-            )
-            db.add(airport)
+        # Starlette spools the upload to disk; it is parsed from there in chunks
+        if background:
+            job = create_job(spec.table, file.filename)
+            background_tasks.add_task(run_job, job, await keep_upload(file), spec)
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(job.as_dict()))
         
-        db.commit()
-        return {"message": "Airports uploaded successfully"}
+        # pandas and the file readers load with the first upload, not with the app
+        from app.services.ingestion import ingest_file
+
+        try:
+            # Parsing and COPY are blocking, keep them off the event loop
+            await file.seek(0)
+            report = await run_in_threadpool(ingest_file, db, file.file, file.filename, spec)
+        finally:
+            result_cache.invalidate([spec.table])
+            if spec is AIRPORTS:
+                airport_index.invalidate()
+        return {"message": f"{label} uploaded successfully", **report.as_dict()}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error uploading airports: {str(e)}"
+            detail=f"Error uploading {label.lower()}: {str(e)}"
         )
 
-@router.post("/upload/flights")
+@router.post("/upload/airports", response_model=UploadResponse, responses={202: {"model": IngestJobResponse}})
+async def upload_airports(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    background: bool = False,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> Any:
+    await verify_admin(token)
+    return await _ingest_upload(file, AIRPORTS, "Airports", background, background_tasks, db)
+
+@router.post("/upload/flights", response_model=UploadResponse, responses={202: {"model": IngestJobResponse}})
 async def upload_flights(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    background: bool = False,
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> Any:
     await verify_admin(token)
+    return await _ingest_upload(file, FLIGHTS, "Flights", background, background_tasks, db)
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    job_id: str,
+    token: str = Depends(oauth2_scheme)
+) -> Any:
+    await verify_admin(token)
     
-    try:
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        for _, row in df.iterrows():
-            flight = Flight(
-                flight_number=row['flight_number'],
-                airline=row['airline'],
-                departure_airport_id=row['departure_airport_id'],
-                arrival_airport_id=row['arrival_airport_id'],
-                departure_time=row['departure_time'],
-                arrival_time=row['arrival_time'],
-                duration=row.get('duration'),
-                aircraft_type=row.get('aircraft_type'),
-                status=row.get('status'),
-                gate=row.get('gate'),
-                terminal=row.get('terminal'),
-                price=row.get('price')
-            )
-            db.add(flight)
-        
-        db.commit()
-        return {"message": "Flights uploaded successfully"}
-    except Exception as e:
+    job = get_job(job_id)
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error uploading flights: {str(e)}"
-        ) 
\ No newline at end of file
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job.as_dict()
@@ -1,46 +1,73 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from typing import Any
 
-from app.core.security import create_access_token, oauth2_scheme
+from app.core.security import create_access_token, get_password_hash, verify_password
 from app.core.config import settings
-from app.schemas.auth import Token, UserCreate, UserResponse, MOCK_USERS
+from app.db.session import get_db
+from app.schemas.auth import Token, UserCreate, UserResponse
+from app.services.user_cache import USER_COLUMNS, USER_SQL, user_cache, user_from_row
 
 router = APIRouter()
 
+# Plain functions: FastAPI runs them in its thread pool, so neither bcrypt nor
+# the blocking session holds up the event loop
+
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate) -> Any:
-    if user.email in MOCK_USERS:
+def register(user: UserCreate, db: Session = Depends(get_db)) -> Any:
+    hashed_password = get_password_hash(user.password)
+    try:
+        # Self-registered accounts are regular users whatever the request says;
+        # admins are promoted by an admin. role is left to the column default
+        # so both db_init.sql's and the ORM's enum labels work
+        db.execute(
+            text("INSERT INTO users (email, hashed_password, full_name, is_active) VALUES (:email, :hashed_password, :full_name, true)"),
+            {"email": user.email, "hashed_password": hashed_password, "full_name": user.full_name}
+        )
+        row = db.execute(text(USER_SQL), {"email": user.email}).one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
-    # For mock purposes, we'll just return a success response
+    created = user_from_row(row)
+    user_cache.invalidate(user.email)
     return UserResponse(
-        id=len(MOCK_USERS) + 1,
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role,
-        is_active=True
+        id=created.id,
+        email=created.email,
+        full_name=created.full_name,
+        role=created.role,
+        is_active=created.is_active
     )
 
 @router.post("/token", response_model=Token)
-async def login(
-    form_data: OAuth2PasswordRequestForm = Depends()
+def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
 ) -> Any:
-    user = MOCK_USERS.get(form_data.username)
-    if not user or user["password"] != form_data.password:
+    row = db.execute(
+        text(f"SELECT {USER_COLUMNS}, hashed_password FROM users WHERE email = :email"),
+        {"email": form_data.username}
+    ).first()
+    if row is None or row.is_active is False or not verify_password(form_data.password, row.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    # The row is fresh: the requests made with this token start from the cache
+    user = user_from_row(row)
+    user_cache.put(user.email, user)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["email"], "role": user["role"]},
+        data={"sub": user.email, "role": user.role.value},
         expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -1,144 +1,373 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from typing import Any, List
-import json
+from sqlalchemy.exc import DBAPIError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
 import logging
-from decimal import Decimal
-from datetime import datetime
+import time
+import uuid
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import get_search_db, pool_stats, SearchSessionLocal
 from app.services.openai_service import OpenAIService
+from app.core.logs import log_event
+from app.core.metrics import metrics
+from app.core.tracing import span, stage_stats, start_trace
+from app.services.airport_index import IndexAnswer, airport_index
+from app.services.intent_router import TemplateQuery, intent_router, routing_stats
+from app.services.query_cache import sql_cache
+from app.services.query_guard import enforce_limit, query_guard
+from app.services.result_cache import result_cache
+from app.services.schema_context import schema_context
+from app.services.search_history import history_writer, popular_queries
+from app.services.cache_warmer import cache_warmer
+from app.services.search_orchestrator import (
+    ClientDisconnected, explanations, run_until_disconnected, speculative_warmer
+)
+from app.services.response_renderer import dumps, render_json, search_payload
+from app.services.result_materializer import RowMaterializer, bind_statement, decode_page_token
+from app.services.sql_normalizer import binding_failed, fetch_prepared_page, normalize_sql, query_shapes
 from app.core.security import oauth2_scheme
-from app.schemas.search import SearchQuery, SearchResponse
+from app.schemas.search import BatchSearchRequest, ExplanationResponse, SearchQuery, SearchResponse
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Database schema information for OpenAI
-SCHEMA_INFO = """
-Database Schema for Airport Database Assistant:
-
-1. Users Table
-- id (SERIAL PRIMARY KEY)
-- email (VARCHAR(255) UNIQUE)
-- hashed_password (VARCHAR(255))
-- full_name (VARCHAR(255))
-- role (VARCHAR(50))
-- is_active (BOOLEAN)
-- created_at (TIMESTAMP)
-
-2. Airlines Table
-- id (SERIAL PRIMARY KEY)
-- code (VARCHAR(10) UNIQUE)
-- name (VARCHAR(255))
-- country (VARCHAR(255))
-- logo_url (VARCHAR(255))
-- website_url (VARCHAR(255))
-
-3. Aircraft Types Table
-- id (SERIAL PRIMARY KEY)
-- code (VARCHAR(10) UNIQUE)
-- manufacturer (VARCHAR(255))
-- model (VARCHAR(255))
-- capacity (INTEGER)
-- range_km (INTEGER)
-
-4. Airports Table
-- id (SERIAL PRIMARY KEY)
-- code (VARCHAR(10) UNIQUE)
-- name (VARCHAR(255))
-- city (VARCHAR(255))
-- country (VARCHAR(255))
-- latitude (DECIMAL)
-- longitude (DECIMAL)
-- timezone (VARCHAR(50))
-- terminal_count (INTEGER)
-- runway_count (INTEGER)
-- description (TEXT)
-
-5. Flights Table
-- id (SERIAL PRIMARY KEY)
-- flight_number (VARCHAR(20))
-- airline_id (INTEGER REFERENCES airlines(id))
-- departure_airport_id (INTEGER REFERENCES airports(id))
-- arrival_airport_id (INTEGER REFERENCES airports(id))
-- departure_time (TIMESTAMP)
-- arrival_time (TIMESTAMP)
-- duration (INTEGER)
-- aircraft_type_id (INTEGER REFERENCES aircraft_types(id))
-- status (VARCHAR(50))
-- gate (VARCHAR(10))
-- terminal (INTEGER)
-- price (DECIMAL)
-
-Relationships:
-- Flights.airline_id -> Airlines.id
-- Flights.departure_airport_id -> Airports.id
-- Flights.arrival_airport_id -> Airports.id
-- Flights.aircraft_type_id -> Aircraft_Types.id
-"""
-
-def json_serializer(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+# Bounds the number of searches in flight per worker; excess requests wait here
+search_slots = asyncio.Semaphore(settings.SEARCH_MAX_CONCURRENCY)
 
 @router.post("", response_model=SearchResponse)
-def search(
+async def search(
     query: SearchQuery,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_search_db)
 ) -> Any:
+    accept_encoding = request.headers.get("accept-encoding", "")
+
+    async def render(response: Dict[str, Any]) -> Response:
+        # Rows go from driver values to JSON in one pass, without response model validation
+        return await render_json(search_payload(response, query.result_format), accept_encoding)
+
+    async with search_slots:
+        try:
+            # A client that gives up takes its LLM calls and statements with it
+            return await run_until_disconnected(request, run_search(query, db, render=render))
+        except ClientDisconnected:
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+async def run_search(
+    query: SearchQuery,
+    db: AsyncSession,
+    generated_sql: Optional[str] = None,
+    render: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None
+) -> Any:
+    """Answer `query`, as the response dict or as whatever `render` makes of it.
+
+    Rendering runs inside the search's trace, so the serialization stage and
+    its time are part of the search_completed record.
+    """
+    started = time.perf_counter()
+    request_id = uuid.uuid4().hex
+    path = "llm"
+    stages = start_trace()
+    sql_query = token_sql = None
+    row_count = 0
+
+    async def respond(response: Dict[str, Any]) -> Any:
+        if render is None:
+            return response
+        with span("serialization"):
+            return await render(response)
+
     try:
-        logger.info(f"Received search query: {query.query}")
+        route = None
+        if settings.AIRPORT_INDEX_ENABLED and not query.page_token:
+            # Reference questions and common flight lookups skip the LLM
+            await airport_index.ensure_fresh(db)
+            route = intent_router.route(query.query)
+        
+        if isinstance(route, IndexAnswer):
+            path = "airport_index"
+            sql_query = route.sql_query
+            row_count = len(route.results)
+            columns = list(route.results[0]) if route.results else []
+            return await respond({
+                "query": query.query,
+                "sql_query": route.sql_query,
+                "columns": columns,
+                "rows": [[row.get(column) for column in columns] for row in route.results],
+                "explanation": route.explanation,
+                "next_page_token": None,
+                "request_id": request_id
+            })
         
-        # Generate SQL query using OpenAI
-        logger.info("Generating SQL query using OpenAI...")
-        sql_query = OpenAIService.generate_sql_query(query.query, SCHEMA_INFO)
-        logger.info(f"Generated SQL query: {sql_query}")
+        params = None
+        if isinstance(route, TemplateQuery):
+            path = "template"
+            sql_query, params, token_sql, offset = route.sql, route.params, route.display_sql, 0
+        elif query.page_token:
+            # Later pages re-run the SQL of the first page without asking the LLM
+            path = "page"
+            try:
+                sql_query, offset = decode_page_token(query.page_token)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        elif generated_sql is not None:
+            # Converted ahead of time, e.g. packed with other batch items
+            sql_query = enforce_limit(generated_sql, settings.QUERY_DEFAULT_LIMIT)
+            offset = 0
+        else:
+            await schema_context.ensure_fresh(db)
+            # No connection is held through the LLM call: the freshness checks
+            # above may have checked one out, and the next statement takes a new one
+            await db.close()
+            with span("generate_sql"):
+                sql_query = await OpenAIService.generate_sql_query(query.query, schema_context.for_query(query.query))
+            sql_query = enforce_limit(sql_query, settings.QUERY_DEFAULT_LIMIT)
+            offset = 0
+            # Likely follow-ups get their SQL generated while this one runs
+            speculative_warmer.warm(query.query, schema_context.for_query)
         
-        # Execute the query against the database
-        logger.info("Executing SQL query...")
-        result = db.execute(text(sql_query))
+        if route is None:
+            # Generated SQL must fit the cost budget before it runs
+            with span("query_guard"):
+                await query_guard.check(db, sql_query)
         
-        # Convert result rows to dictionaries
-        columns = result.keys()
-        results = []
-        for row in result:
-            row_dict = {}
-            for i, col in enumerate(columns):
-                value = row[i]
-                # Convert Decimal and datetime to JSON-serializable types
-                if isinstance(value, (Decimal, datetime)):
-                    value = json_serializer(value)
-                row_dict[col] = value
-            results.append(row_dict)
-            
-        logger.info(f"Query executed successfully. Found {len(results)} results")
+        # Execute the query against the database, one bounded page at a time;
+        # fetching records the db_execute and row_conversion stages
+        page_size = min(query.page_size or settings.SEARCH_MAX_ROWS, settings.SEARCH_MAX_ROWS)
+        page = await fetch_prepared_page(db, sql_query, page_size, offset, params=params, token_sql=token_sql)
+        row_count = len(page.values)
+        
+        # Release the connection before the slow explanation call
+        await db.close()
         
         # Generate explanation
-        logger.info("Generating explanation...")
-        explanation = OpenAIService.explain_query_results(results, query.query)
-        logger.info("Explanation generated successfully")
+        if isinstance(route, TemplateQuery):
+            explanation = route.describe(page.rows)
+        elif query.defer_explanation:
+            # The response goes out now; the explanation is fetched by request id
+            explanations.submit(request_id, OpenAIService.explain_query_results(page.rows, query.query))
+            explanation = None
+        else:
+            with span("explanation"):
+                explanation = await OpenAIService.explain_query_results(page.rows, query.query)
         
-        response = {
+        # Kept columnar; search_payload shapes it for the response
+        return await respond({
             "query": query.query,
-            "sql_query": sql_query,
-            "results": results,
-            "explanation": explanation
-        }
-        
-        logger.info(f"Returning response: {json.dumps(response, indent=2, default=json_serializer)}")
-        return response
+            "sql_query": token_sql or sql_query,
+            "columns": page.columns,
+            "rows": page.values,
+            "explanation": explanation,
+            "next_page_token": page.next_page_token,
+            "request_id": request_id
+        })
         
+    except HTTPException:
+        path = f"{path}_error"
+        raise
+    except asyncio.CancelledError:
+        path = f"{path}_cancelled"
+        raise
     except Exception as e:
-        logger.error(f"Error processing search query: {str(e)}", exc_info=True)
+        path = f"{path}_error"
+        logger.error(f"Error processing search query {request_id}: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
-        ) 
\ No newline at end of file
+        ) 
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.increment("search_requests_total", path=path)
+        metrics.observe("search_latency_seconds", elapsed, path=path)
+        # One record per search; successful ones are sampled
+        succeeded = not path.endswith(("_error", "_cancelled"))
+        if succeeded and path != "page":
+            history_writer.record(query.query, token_sql or sql_query, row_count)
+        log_event(
+            logger, "search_completed",
+            level=logging.INFO if succeeded else logging.WARNING,
+            sampled=succeeded,
+            request_id=request_id,
+            path=path,
+            query=query.query,
+            sql=lambda: token_sql or sql_query,
+            rows=row_count,
+            latency_ms=round(elapsed * 1000, 3),
+            stages_ms=lambda: {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()},
+        )
+
+def _ndjson(event: str, **payload: Any) -> bytes:
+    return dumps({"event": event, **payload}) + b"\n"
+
+@router.post("/stream")
+async def search_stream(query: SearchQuery) -> StreamingResponse:
+    # Emits one JSON object per line: the SQL, the column names, batches of
+    # rows as they leave the cursor, explanation tokens, and a final summary
+    return StreamingResponse(stream_search(query), media_type="application/x-ndjson")
+
+async def stream_search(query: SearchQuery) -> AsyncIterator[bytes]:
+    async with search_slots:
+        try:
+            if schema_context.needs_check:
+                async with SearchSessionLocal() as db:
+                    await schema_context.ensure_fresh(db)
+            sql_query = await OpenAIService.generate_sql_query(query.query, schema_context.for_query(query.query))
+            sql_query = enforce_limit(sql_query, settings.QUERY_DEFAULT_LIMIT)
+            yield _ndjson("sql", query=query.query, sql_query=sql_query)
+
+            sample = []
+            result_count = 0
+            truncated = False
+            # The session lives inside the generator because the response body
+            # is produced after the endpoint function has returned
+            async with SearchSessionLocal() as db:
+                await query_guard.check(db, sql_query)
+                normalized = normalize_sql(sql_query)
+                stream_options = {"yield_per": settings.SEARCH_STREAM_BATCH_SIZE}
+                try:
+                    result = await db.stream(bind_statement(normalized.sql, normalized.params), execution_options=stream_options)
+                except DBAPIError as e:
+                    if not binding_failed(e):
+                        raise
+                    # Retry as written, e.g. when a lifted literal did not fit its inferred type
+                    await db.rollback()
+                    result = await db.stream(text(sql_query), execution_options=stream_options)
+                materializer = RowMaterializer(result.keys())
+                yield _ndjson("columns", columns=materializer.columns)
+
+                async for partition in result.partitions():
+                    rows = materializer.to_dicts(partition[:settings.SEARCH_STREAM_MAX_ROWS - result_count])
+                    result_count += len(rows)
+                    if len(sample) < settings.SEARCH_EXPLAIN_SAMPLE_ROWS:
+                        sample.extend(rows[:settings.SEARCH_EXPLAIN_SAMPLE_ROWS - len(sample)])
+                    yield _ndjson("rows", rows=rows)
+                    if result_count >= settings.SEARCH_STREAM_MAX_ROWS:
+                        truncated = True
+                        break
+                await result.close()
+
+            async for token in OpenAIService.stream_explanation(sample, query.query, result_count):
+                yield _ndjson("explanation", delta=token)
+
+            yield _ndjson("done", result_count=result_count, truncated=truncated)
+            history_writer.record(query.query, sql_query, result_count)
+
+        except Exception as e:
+            logger.error(f"Error streaming search query: {str(e)}", exc_info=True)
+            yield _ndjson("error", detail=str(e))
+
+@router.post("/batch")
+async def search_batch(batch: BatchSearchRequest) -> StreamingResponse:
+    # One NDJSON line per item as it completes: `result` with the item's
+    # SearchResponse or `error`, each with the item's index, then `done`
+    if len(batch.queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.SEARCH_BATCH_MAX_QUERIES} queries per batch"
+        )
+    return StreamingResponse(stream_batch(batch.queries), media_type="application/x-ndjson")
+
+async def stream_batch(items: List[SearchQuery]) -> AsyncIterator[bytes]:
+    # Identical items run once and are reported under every index they appear at
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(item.model_dump_json(), []).append(index)
+    unique = [items[indices[0]] for indices in groups.values()]
+    indices_of = list(groups.values())
+
+    async with SearchSessionLocal() as db:
+        if settings.AIRPORT_INDEX_ENABLED:
+            await airport_index.ensure_fresh(db)
+        await schema_context.ensure_fresh(db)
+    needs_llm = [
+        position for position, item in enumerate(unique)
+        if not item.page_token and (not settings.AIRPORT_INDEX_ENABLED or intent_router.route(item.query) is None)
+    ]
+
+    # Questions for the LLM are converted several per call
+    pack_size = max(1, settings.SEARCH_BATCH_LLM_PACK_SIZE)
+    packs: List[asyncio.Future] = []
+    pack_of: Dict[int, Tuple[asyncio.Future, int]] = {}
+    for start in range(0, len(needs_llm), pack_size):
+        members = needs_llm[start:start + pack_size]
+        questions = [unique[position].query for position in members]
+        pack = asyncio.ensure_future(OpenAIService.generate_sql_queries(questions, schema_context.for_queries(questions)))
+        packs.append(pack)
+        for offset, position in enumerate(members):
+            pack_of[position] = (pack, offset)
+
+    item_slots = asyncio.Semaphore(settings.SEARCH_BATCH_CONCURRENCY)
+
+    async def run_item(position: int) -> Tuple[int, Optional[Dict[str, Any]], Optional[str]]:
+        try:
+            generated_sql = None
+            if position in pack_of:
+                pack, offset = pack_of[position]
+                generated_sql = (await pack)[offset]
+            async with item_slots:
+                async with SearchSessionLocal() as db:
+                    response = await run_search(unique[position], db, generated_sql=generated_sql)
+            return position, search_payload(response, unique[position].result_format), None
+        except HTTPException as e:
+            return position, None, str(e.detail)
+        except Exception as e:
+            logger.error(f"Batch item failed: {str(e)}", exc_info=True)
+            return position, None, str(e)
+
+    tasks = [asyncio.ensure_future(run_item(position)) for position in range(len(unique))]
+    succeeded = failed = 0
+    try:
+        for completed in asyncio.as_completed(tasks):
+            position, response, error = await completed
+            for index in indices_of[position]:
+                if error is None:
+                    succeeded += 1
+                    yield _ndjson("result", index=index, response=response)
+                else:
+                    failed += 1
+                    yield _ndjson("error", index=index, detail=error)
+        yield _ndjson("done", queries=len(items), unique=len(unique), llm_calls=len(packs), succeeded=succeeded, failed=failed)
+    finally:
+        # Nothing keeps running once the client has gone
+        for task in tasks + packs:
+            task.cancel()
+
+@router.get("/explanations/{request_id}", response_model=ExplanationResponse)
+async def get_explanation(request_id: str, wait: float = Query(default=0, ge=0, le=30)) -> Any:
+    # With wait > 0 the request is held until the explanation is ready or the time is up
+    explanation = await explanations.get(request_id, wait)
+    if explanation is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown or expired request id")
+    return explanation
+
+@router.get("/popular")
+async def popular_searches(
+    limit: int = Query(20, ge=1, le=1000),
+    days: int = Query(7, ge=1, le=365),
+    db: AsyncSession = Depends(get_search_db)
+) -> Any:
+    # Questions only: the history of who asked what is not exposed
+    return [{"query": query, "searches": searches} for query, searches in await popular_queries(db, limit, days)]
+
+@router.get("/stats")
+def search_stats() -> Any:
+    return {
+        "sql_cache": sql_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "airport_index": {"airports": len(airport_index), "version": airport_index.version},
+        "schema_context": schema_context.stats(),
+        "history": history_writer.stats(),
+        "warmup": cache_warmer.stats(),
+        "routing": routing_stats(),
+        "query_guard": query_guard.stats(),
+        "speculative_warming": speculative_warmer.stats(),
+        "deferred_explanations": len(explanations),
+        "stages": stage_stats(),
+        "query_shapes": query_shapes.top(),
+        "db_pools": pool_stats()
+    }
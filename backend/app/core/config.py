@@ -5,6 +5,7 @@ class Settings(BaseSettings):
     # API Settings
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Airport Database Assistant"
+    API_ROUTERS: str = "auth,admin,search"  # Routers this worker serves, comma separated; "search" for search-only workers
     
     # Database Settings
     POSTGRES_SERVER: str = "localhost"
@@ -12,14 +13,124 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "airscribe"
     DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 10  # Connections kept open per engine and worker process
+    DB_MAX_OVERFLOW: int = 20  # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: float = 10  # Wait for a free connection before failing the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Replace connections older than this
+    DB_POOL_PRE_PING: bool = True  # Check a connection is alive before handing it out
+    DB_PGBOUNCER_MODE: bool = False  # Behind PgBouncer in transaction mode: no prepared statement caches or startup parameters
     
     # Security Settings
     SECRET_KEY: str = "your-secret-key-here"  # Change this in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # Verified tokens whose claims are kept until they expire
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60  # Reload a user's role and status, for changes made by other workers
     
     # OpenAI Settings
     OPENAI_API_KEY: str = "your-openai-api-key"
+    OPENAI_BASE_URL: Optional[str] = None  # Point at a stub server for benchmarks
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_CONNECTIONS: int = 256
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 64
+    OPENAI_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    LLM_MAX_CONCURRENCY: int = 256
+    
+    # Search Settings
+    SEARCH_MAX_CONCURRENCY: int = 256
+    SEARCH_MAX_ROWS: int = 1000  # Rows per page of search results
+    SEARCH_STREAM_MAX_ROWS: int = 100000
+    SEARCH_STREAM_BATCH_SIZE: int = 500  # Rows per streamed chunk
+    SEARCH_EXPLAIN_SAMPLE_ROWS: int = 1000  # Rows the streamed explanation is based on
+    SEARCH_DISCONNECT_POLL_SECONDS: float = 0.25  # How often a running search checks whether its client is gone
+    SEARCH_DEFERRED_EXPLANATIONS_MAX: int = 1000  # Explanations kept for the explanation endpoint
+    SEARCH_DEFERRED_EXPLANATIONS_TTL_SECONDS: int = 300
+    SEARCH_SPECULATIVE_WARMING: bool = True  # Generate SQL for likely follow-up questions in the background
+    SEARCH_SPECULATIVE_MAX_INFLIGHT: int = 4
+    SEARCH_BATCH_MAX_QUERIES: int = 1000  # Queries accepted by one batch request
+    SEARCH_BATCH_LLM_PACK_SIZE: int = 10  # Questions converted to SQL per LLM call, 1 to disable packing
+    SEARCH_BATCH_CONCURRENCY: int = 16  # Batch items executed at once
+    RESPONSE_COMPRESS_MIN_BYTES: int = 1024  # Smaller response bodies are sent uncompressed
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_BROTLI_QUALITY: int = 4  # Used when the brotli package is installed
+    EXPLAIN_FULL_RESULT_ROWS: int = 20  # Results up to this size go into the explanation prompt whole
+    EXPLAIN_SAMPLE_ROWS: int = 5  # Representative rows sent along with a summary
+    EXPLAIN_TOP_K: int = 5  # Most frequent values listed per text column
+    EXPLAIN_MAX_VALUE_CHARS: int = 80  # Longer text values are cut in the prompt
+    
+    # Query Guard Settings
+    QUERY_GUARD_ENABLED: bool = True  # EXPLAIN generated SQL before running it
+    QUERY_MAX_COST: float = 1_000_000  # Planner cost above which a query is rejected
+    QUERY_MAX_PLAN_ROWS: int = 10_000_000  # Row estimate of any plan node above which a query is rejected
+    QUERY_DEFAULT_LIMIT: int = 100_000  # LIMIT added to generated SQL without one, and the cap on larger ones
+    QUERY_STATEMENT_TIMEOUT_MS: int = 10_000  # statement_timeout for search connections
+    QUERY_GUARD_CACHE_SIZE: int = 1024  # Plan verdicts remembered per exact SQL string
+    QUERY_GUARD_CACHE_TTL_SECONDS: int = 300
+    READ_REPLICA_URL: Optional[str] = None  # Run searches on a replica instead of the primary
+
+    # SQL Normalization Settings
+    SQL_NORMALIZE_ENABLED: bool = True  # Lift literals out of generated SQL into bind parameters
+    SQL_NORMALIZE_CACHE_SIZE: int = 2048  # Parsed statements kept per worker
+    SQL_SHAPE_STATS_MAX: int = 500  # Query shapes tracked for latency stats
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # Prepared statements kept per asyncpg connection
+
+    # SQL Cache Settings
+    SQL_CACHE_ENABLED: bool = True
+    SQL_CACHE_MAX_ENTRIES: int = 1024
+    SQL_CACHE_TTL_SECONDS: int = 3600
+    SQL_CACHE_SIMILARITY_THRESHOLD: float = 0.85
+    SQL_CACHE_SIMILARITY_CANDIDATES: int = 256
+    SQL_CACHE_REDIS_URL: Optional[str] = None  # Share the cache between workers
+    
+    # Search History Settings
+    SEARCH_HISTORY_ENABLED: bool = True
+    SEARCH_HISTORY_BATCH_SIZE: int = 500  # Rows per INSERT
+    SEARCH_HISTORY_FLUSH_SECONDS: float = 2.0  # Write a partial batch after this long
+    SEARCH_HISTORY_MAX_PENDING: int = 20000  # Records buffered per worker before dropping
+    SEARCH_HISTORY_DROP_POLICY: str = "oldest"  # Which records go when the buffer is full: oldest or newest
+    SEARCH_HISTORY_MAX_BACKOFF_SECONDS: float = 60.0  # Longest wait between retries while the database fails
+
+    # Cache Warm-up Settings
+    WARMUP_ENABLED: bool = True  # Generate SQL for popular questions at startup and periodically
+    WARMUP_TOP_N: int = 200  # Most asked questions of the search history to warm
+    WARMUP_WINDOW_DAYS: int = 7
+    WARMUP_INTERVAL_SECONDS: int = 3600
+    WARMUP_LLM_RATE_PER_SECOND: float = 2.0
+    WARMUP_LLM_CONCURRENCY: int = 4
+    WARMUP_DB_RATE_PER_SECOND: float = 10.0
+    WARMUP_MAX_PRECOMPUTE_COST: float = 10_000  # Planner cost up to which the first page is fetched too
+    WARMUP_READY_COVERAGE: float = 0.8  # Share of popular questions warmed before /ready succeeds
+    WARMUP_READY_TIMEOUT_SECONDS: int = 300  # Report ready after this long regardless
+
+    # Schema Context Settings
+    SCHEMA_CONTEXT_SELECT_TABLES: bool = True  # Send only the tables a question refers to
+    SCHEMA_CONTEXT_CHECK_SECONDS: int = 60  # How often to look for a new migration version
+
+    # Result Cache Settings
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Serialized size of all cached pages per worker
+    RESULT_CACHE_MAX_ENTRY_BYTES: int = 8 * 1024 * 1024  # Larger pages are not cached
+    RESULT_CACHE_TTL_SECONDS: int = 600
+    RESULT_CACHE_VOLATILE_TTL_SECONDS: int = 30  # For results reading flight status or gate
+    RESULT_CACHE_VERSION_CHECK_SECONDS: float = 2  # Staleness bound after a write by another worker or client
+    
+    # Reference Data Settings
+    AIRPORT_INDEX_ENABLED: bool = True
+    AIRPORT_INDEX_TTL_SECONDS: int = 300  # Reload even without an invalidation, for changes made by other workers
+    
+    # Observability Settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" for one object per line, "text" for key=value
+    LOG_SAMPLE_RATE: float = 1.0  # Share of successful searches logged; failures are always logged
+    LOG_MAX_FIELD_CHARS: int = 500  # Longer logged values (SQL, questions) are cut
+    METRICS_ENDPOINT_ENABLED: bool = True  # Serve /metrics in the Prometheus text format
+    OTEL_ENABLED: bool = False  # Also report stage spans through OpenTelemetry, if it is installed and configured
+    
+    # Ingestion Settings
+    INGEST_CHUNK_SIZE: int = 50000  # Rows per COPY/upsert round trip
+    INGEST_USE_COPY: bool = True  # Fall back to executemany when False or unsupported
+    INGEST_MAX_REPORTED_ERRORS: int = 1000
+    INGEST_JOB_HISTORY: int = 100  # Finished jobs kept for the status endpoint
     
     class Config:
         case_sensitive = True
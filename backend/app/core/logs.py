@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from typing import Any, Dict
+import json
+import logging
+import random
+
+from app.core.config import settings
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if not fields:
+            return line
+        return line + " " + " ".join(f"{name}={json.dumps(value, default=str)}" for name, value in fields.items())
+
+def configure_logging() -> None:
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+def _field(value: Any) -> Any:
+    if callable(value):
+        value = value()
+    if isinstance(value, str) and len(value) > settings.LOG_MAX_FIELD_CHARS:
+        return f"{value[:settings.LOG_MAX_FIELD_CHARS]}… ({len(value)} chars)"
+    return value
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, sampled: bool = False, **fields: Any) -> None:
+    """Log `event` with structured fields, doing no work for records that are dropped.
+
+    Fields given as callables are only evaluated when the record is emitted,
+    and long strings are cut to LOG_MAX_FIELD_CHARS. Sampled events are kept
+    at LOG_SAMPLE_RATE.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and random.random() >= settings.LOG_SAMPLE_RATE:
+        return
+    logger.log(level, event, extra={"fields": {name: _field(value) for name, value in fields.items()}})
@@ -1,12 +1,17 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import threading
+import time
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -14,6 +19,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+@lru_cache(maxsize=1)
+def _signing_key() -> Key:
+    # Built once instead of on every decode
+    return jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -22,4 +32,55 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt 
\ No newline at end of file
+    return encoded_jwt
+
+class TokenVerifier:
+    """Verifies access tokens, remembering the claims of valid ones until they expire.
+
+    A token seen before costs a dictionary lookup instead of a signature
+    check. At most max_entries tokens are kept, least recently used first
+    out. Raises JWTError for invalid or expired tokens.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._claims: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            claims = self._claims.get(token)
+            if claims is not None:
+                if claims["exp"] > now:
+                    self._claims.move_to_end(token)
+                    self.hits += 1
+                    return claims
+                del self._claims[token]
+            self.misses += 1
+        try:
+            claims = jwt.decode(token, _signing_key(), algorithms=[settings.ALGORITHM])
+        except JWTError:
+            self.rejected += 1
+            raise
+        if "exp" not in claims:
+            # Only tokens that run out are cached
+            return claims
+        with self._lock:
+            self._claims[token] = claims
+            while len(self._claims) > self.max_entries:
+                self._claims.popitem(last=False)
+        return claims
+
+    def clear(self) -> None:
+        with self._lock:
+            self._claims.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._claims), "hits": self.hits, "misses": self.misses, "rejected": self.rejected}
+
+token_verifier = TokenVerifier(settings.AUTH_TOKEN_CACHE_SIZE)
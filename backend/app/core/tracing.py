@@ -0,0 +1,44 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+# Stage timings of the search being handled in the current task
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("search_stages", default=None)
+
+_tracer = otel_trace.get_tracer("airscribe.search") if otel_trace is not None and settings.OTEL_ENABLED else None
+
+def start_trace() -> Dict[str, float]:
+    """Collect the stages recorded from here on, in this task and the ones it starts."""
+    stages: Dict[str, float] = {}
+    _stages.set(stages)
+    return stages
+
+def record_stage(stage: str, seconds: float) -> None:
+    metrics.observe("search_stage_seconds", seconds, stage=stage)
+    stages = _stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    with _tracer.start_as_current_span(stage) if _tracer is not None else nullcontext():
+        try:
+            yield
+        finally:
+            record_stage(stage, time.perf_counter() - started)
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        dict(key).get("stage"): snapshot
+        for key, snapshot in metrics.histogram_snapshots("search_stage_seconds").items()
+    }
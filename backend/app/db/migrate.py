@@ -0,0 +1,118 @@
+"""Apply the SQL migrations in backend/migrations to DATABASE_URL.
+
+Each file runs in its own transaction and is recorded in schema_migrations,
+so running this again only applies new files. Start from a database created
+with db_init.sql (or the ORM models).
+
+    python -m app.db.migrate            # apply pending migrations
+    python -m app.db.migrate --status   # list applied and pending migrations
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import hashlib
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+# Held while migrating so two workers starting together do not both apply a file
+_ADVISORY_LOCK_ID = 7_361_022
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text()
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha1(self.path.read_bytes()).hexdigest()
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    # Files are named <version>_<name>.sql and applied in version order
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        migrations.append(Migration(version, name, path))
+    return migrations
+
+def _ensure_table(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(32) PRIMARY KEY, "
+        "name VARCHAR(255) NOT NULL, "
+        "checksum CHAR(40) NOT NULL, "
+        "applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP)"
+    )
+
+def applied_migrations(connection: Connection) -> Dict[str, str]:
+    """Version to checksum of every applied migration."""
+    if connection.exec_driver_sql("SELECT to_regclass('schema_migrations')").scalar() is None:
+        return {}
+    return dict(connection.exec_driver_sql("SELECT version, checksum FROM schema_migrations").all())
+
+def current_version(connection: Connection) -> Optional[str]:
+    applied = applied_migrations(connection)
+    return max(applied) if applied else None
+
+def migrate(engine: Optional[Engine] = None, target: Optional[str] = None) -> List[str]:
+    """Apply pending migrations up to `target` (all by default); returns the versions applied."""
+    if engine is None:
+        from app.db.session import get_engine
+        engine = get_engine()
+
+    applied_now = []
+    for migration in discover_migrations():
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": _ADVISORY_LOCK_ID})
+            _ensure_table(connection)
+            applied = applied_migrations(connection)
+            if migration.version in applied:
+                if applied[migration.version] != migration.checksum:
+                    logger.warning(f"Migration {migration.version}_{migration.name} changed after it was applied")
+                continue
+            logger.info(f"Applying migration {migration.version}_{migration.name}")
+            # Straight to the driver: migration files hold several statements
+            # and % signs that must not be taken for placeholders
+            connection.connection.cursor().execute(migration.sql)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, checksum) VALUES (:version, :name, :checksum)"),
+                {"version": migration.version, "name": migration.name, "checksum": migration.checksum}
+            )
+        applied_now.append(migration.version)
+    return applied_now
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list migrations without applying any")
+    parser.add_argument("--target", help="apply migrations up to and including this version")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from app.db.session import get_engine
+    engine = get_engine()
+    if args.status:
+        with engine.connect() as connection:
+            applied = applied_migrations(connection)
+        for migration in discover_migrations():
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version}  {state:<8} {migration.name}")
+        return
+
+    versions = migrate(engine, args.target)
+    print(f"Applied {', '.join(versions)}" if versions else "Database is up to date")
+
+if __name__ == "__main__":
+    main()
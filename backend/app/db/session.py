@@ -1,13 +1,213 @@
-from sqlalchemy import create_engine
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.metrics import metrics
+
+class _InstrumentedPoolMixin:
+    # Counts checkouts that had to wait for a connection to come back, and
+    # those that gave up after pool_timeout
+    def __init__(self, *args, max_overflow: int = 10, logging_name: Optional[str] = None, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, logging_name=logging_name, **kwargs)
+        # The pool keeps neither of these where it can be read back publicly
+        self.max_overflow = max_overflow
+        self.metrics_name = logging_name or "default"
+
+    def _do_get(self):
+        pool = self.metrics_name
+        exhausted = self.max_overflow > -1 and self.overflow() >= self.max_overflow and self.checkedin() == 0
+        if exhausted:
+            metrics.increment("db_pool_waits_total", pool=pool)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.increment("db_pool_timeouts_total", pool=pool)
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_seconds", time.perf_counter() - started, pool=pool)
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _pool_options(name: str) -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_logging_name": name,
+    }
+
+def get_async_database_url(url: str) -> str:
+    # Same database, driven through asyncpg instead of psycopg. Normalized
+    # search SQL repeats per query shape, so keep enough prepared statements
+    # per connection for the shapes in rotation. PgBouncer in transaction
+    # mode hands each transaction a different server connection, so there
+    # prepared statements cannot be kept at all.
+    cache_size = 0 if settings.DB_PGBOUNCER_MODE else settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+    async_url = make_url(url).set(drivername="postgresql+asyncpg").update_query_dict(
+        {"prepared_statement_cache_size": str(cache_size)}
+    )
+    return async_url.render_as_string(hide_password=False)
+
+def _async_connect_args() -> Dict[str, Any]:
+    if not settings.DB_PGBOUNCER_MODE:
+        return {}
+    # asyncpg still prepares each statement once; unique names keep two
+    # clients sharing a server connection from colliding
+    return {"statement_cache_size": 0, "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"}
+
+def _create_engine() -> Engine:
+    connect_args = {}
+    if settings.DB_PGBOUNCER_MODE and make_url(settings.DATABASE_URL).get_driver_name() == "psycopg":
+        connect_args["prepare_threshold"] = None
+    return create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, connect_args=connect_args, **_pool_options("default"))
+
+def _create_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        get_async_database_url(settings.DATABASE_URL),
+        poolclass=InstrumentedAsyncQueuePool,
+        connect_args=_async_connect_args(),
+        **_pool_options("async"),
+    )
+
+def _create_search_engine() -> AsyncEngine:
+    # Generated SQL runs on its own engine: read-only transactions with a
+    # statement_timeout, on the replica when one is configured
+    connect_args = _async_connect_args()
+    if not settings.DB_PGBOUNCER_MODE:
+        connect_args["server_settings"] = {
+            "default_transaction_read_only": "on",
+            "statement_timeout": str(settings.QUERY_STATEMENT_TIMEOUT_MS),
+        }
+    search_engine = create_async_engine(
+        get_async_database_url(settings.READ_REPLICA_URL or settings.DATABASE_URL),
+        poolclass=InstrumentedAsyncQueuePool,
+        connect_args=connect_args,
+        **_pool_options("search"),
+    )
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer refuses unknown startup parameters, so apply the same
+        # settings to each transaction instead
+        @event.listens_for(search_engine.sync_engine, "begin")
+        def _restrict_transaction(connection):
+            connection.exec_driver_sql(
+                "SELECT set_config('transaction_read_only', 'on', true), "
+                f"set_config('statement_timeout', '{int(settings.QUERY_STATEMENT_TIMEOUT_MS)}', true)"
+            )
+    return search_engine
+
+class LazyEngine:
+    """An engine created on first use, once per process.
+
+    Engines are not shared across fork: a worker that inherits one from its
+    parent drops the inherited connections, leaving them to the parent, and
+    builds its own.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._engine: Optional[Any] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self._engine is None or self._pid != os.getpid():
+            with self._lock:
+                if self._engine is not None and self._pid != os.getpid():
+                    sync_engine = getattr(self._engine, "sync_engine", self._engine)
+                    sync_engine.dispose(close=False)
+                    self._engine = None
+                if self._engine is None:
+                    self._engine = self._factory()
+                    self._pid = os.getpid()
+        return self._engine
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def current(self) -> Optional[Any]:
+        """The engine of this process, without creating one."""
+        return self._engine if self._pid == os.getpid() else None
+
+_engines = {
+    "default": LazyEngine(_create_engine),
+    "async": LazyEngine(_create_async_engine),
+    "search": LazyEngine(_create_search_engine),
+}
+
+def get_engine() -> Engine:
+    return _engines["default"].get()
+
+def get_async_engine() -> AsyncEngine:
+    return _engines["async"].get()
+
+def get_search_engine() -> AsyncEngine:
+    return _engines["search"].get()
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+_async_session_factory = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def SessionLocal():
+    return _session_factory(bind=get_engine())
+
+def AsyncSessionLocal() -> AsyncSession:
+    return _async_session_factory(bind=get_async_engine())
+
+def SearchSessionLocal() -> AsyncSession:
+    return _async_session_factory(bind=get_search_engine())
+
+async def dispose_engines() -> None:
+    for lazy_engine in _engines.values():
+        current = lazy_engine.current()
+        if isinstance(current, AsyncEngine):
+            await current.dispose()
+        elif current is not None:
+            current.dispose()
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool usage for the engines this process has opened."""
+    waits = {dict(labels)["pool"]: count for labels, count in metrics.counter_values("db_pool_waits_total").items()}
+    timeouts = {dict(labels)["pool"]: count for labels, count in metrics.counter_values("db_pool_timeouts_total").items()}
+    checkout = {dict(labels)["pool"]: snapshot for labels, snapshot in metrics.histogram_snapshots("db_pool_checkout_seconds").items()}
+    stats = {}
+    for name, lazy_engine in _engines.items():
+        current = lazy_engine.current()
+        if current is None:
+            continue
+        pool = current.pool
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "waits": waits.get(name, 0),
+            "timeouts": timeouts.get(name, 0),
+            "checkout": checkout.get(name),
+        }
+    return {"pgbouncer_mode": settings.DB_PGBOUNCER_MODE, "pools": stats}
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_search_db():
+    async with SearchSessionLocal() as db:
+        yield db
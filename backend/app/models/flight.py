@@ -1,9 +1,21 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Integer, Float, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
 class Flight(BaseModel):
     __tablename__ = "flights"
+    __table_args__ = (
+        # Upsert key of schedule uploads
+        UniqueConstraint("flight_number", "departure_time", name="uq_flights_number_departure"),
+        # Schedule lookups; kept in line with migrations/0002_flight_schedule_indexes.sql
+        Index("idx_flights_route_departure", "departure_airport_id", "arrival_airport_id", "departure_time"),
+        Index("idx_flights_airline_departure", "airline", "departure_time"),
+        Index(
+            "idx_flights_active_departure", "departure_time",
+            postgresql_where=text("status IN ('scheduled', 'delayed', 'boarding')")
+        ),
+        Index("idx_flights_delayed_departure", "departure_time", postgresql_where=text("status = 'delayed'")),
+    )
 
     flight_number = Column(String, nullable=False)
     airline = Column(String, nullable=False)
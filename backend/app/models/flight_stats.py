@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Date, DateTime, Integer, Numeric, String
+from app.models.base import Base
+
+# Kept by refresh_flight_stats() in migrations/0003_flight_stats.sql
+
+class RouteDailyStats(Base):
+    __tablename__ = "route_daily_stats"
+
+    departure_airport_id = Column(Integer, primary_key=True)
+    arrival_airport_id = Column(Integer, primary_key=True)
+    flight_date = Column(Date, primary_key=True, index=True)
+    flights = Column(Integer, nullable=False)
+    delayed_flights = Column(Integer, nullable=False)
+    cancelled_flights = Column(Integer, nullable=False)
+    price_sum = Column(Numeric)
+    priced_flights = Column(Integer, nullable=False)
+    min_price = Column(Numeric)
+    max_price = Column(Numeric)
+
+class RouteStats(Base):
+    __tablename__ = "route_stats"
+
+    departure_airport_id = Column(Integer, primary_key=True)
+    arrival_airport_id = Column(Integer, primary_key=True)
+    flights = Column(Integer, nullable=False)
+    delayed_flights = Column(Integer, nullable=False)
+    cancelled_flights = Column(Integer, nullable=False)
+    delay_rate = Column(Numeric, nullable=False)
+    avg_price = Column(Numeric)
+    median_price = Column(Numeric)
+    p90_price = Column(Numeric)
+    min_price = Column(Numeric)
+    max_price = Column(Numeric)
+    first_departure = Column(DateTime(timezone=True))
+    last_departure = Column(DateTime(timezone=True))
+    refreshed_at = Column(DateTime(timezone=True))
+
+class AirlineStats(Base):
+    __tablename__ = "airline_stats"
+
+    airline = Column(String(255), primary_key=True)
+    flights = Column(Integer, nullable=False)
+    delayed_flights = Column(Integer, nullable=False)
+    cancelled_flights = Column(Integer, nullable=False)
+    delay_rate = Column(Numeric, nullable=False)
+    avg_price = Column(Numeric)
+    median_price = Column(Numeric)
+    refreshed_at = Column(DateTime(timezone=True))
@@ -1,11 +1,15 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
 class SearchHistory(BaseModel):
     __tablename__ = "search_history"
+    __table_args__ = (
+        # Popular queries over a recent window; kept in line with migrations/0004_search_history.sql
+        Index("idx_search_history_created_at", "created_at"),
+    )
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))  # Searches are anonymous for now
     query = Column(Text, nullable=False)
     generated_sql = Column(Text, nullable=False)
     result_count = Column(Integer)
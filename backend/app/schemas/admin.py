@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
 
 class AdminCommand(BaseModel):
     command: str
@@ -6,4 +8,29 @@ class AdminCommand(BaseModel):
 class AdminResponse(BaseModel):
     command: str
     sql_query: str
-    message: str 
\ No newline at end of file
+    message: str
+
+class RowError(BaseModel):
+    row: int  # 1-based data row of the uploaded file
+    column: str
+    error: str
+
+class UploadResponse(BaseModel):
+    message: str
+    rows_received: int
+    rows_loaded: int
+    rows_rejected: int
+    errors: List[RowError]
+
+class IngestJobResponse(BaseModel):
+    id: str
+    table: str
+    filename: str
+    status: str
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    rows_received: int
+    rows_loaded: int
+    rows_rejected: int
+    errors: List[RowError]
\ No newline at end of file
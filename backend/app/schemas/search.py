@@ -1,15 +1,32 @@
 from datetime import datetime
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Literal, Optional
 
 class SearchQuery(BaseModel):
     query: str
+    page_size: Optional[int] = Field(default=None, ge=1)
+    page_token: Optional[str] = None
+    defer_explanation: bool = False  # Fetch the explanation later from /search/explanations/{request_id}
+    result_format: Literal["rows", "columns"] = "rows"  # "columns": column names once, then rows as arrays
 
 class SearchResponse(BaseModel):
     query: str
     sql_query: str
-    results: List[Dict[str, Any]]
-    explanation: str
+    results: Optional[List[Dict[str, Any]]] = None  # result_format "rows"
+    columns: Optional[List[str]] = None  # result_format "columns"
+    rows: Optional[List[List[Any]]] = None
+    explanation: Optional[str] = None
+    next_page_token: Optional[str] = None
+    request_id: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchQuery] = Field(min_length=1)
+
+class ExplanationResponse(BaseModel):
+    request_id: str
+    status: str  # pending, ready or failed
+    explanation: Optional[str] = None
+    error: Optional[str] = None
 
 class SearchHistoryResponse(BaseModel):
     id: int
@@ -0,0 +1,201 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import get_close_matches
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import math
+import re
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.result_materializer import RowMaterializer
+
+logger = logging.getLogger(__name__)
+
+GRID_DEGREES = 1.0
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES)
+
+def _key(value: Any) -> str:
+    return " ".join(str(value or "").lower().split())
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+@dataclass
+class IndexAnswer:
+    sql_query: str
+    results: List[Dict[str, Any]]
+    explanation: str
+
+class AirportIndex:
+    """In-memory copy of the airports table with lookup structures.
+
+    Holds a code map, city/country maps with fuzzy matching and a lat/lon grid
+    for nearest-airport queries. It reloads itself when invalidated by a write
+    or after AIRPORT_INDEX_TTL_SECONDS, so changes made through another worker
+    are picked up too.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._reload_lock = asyncio.Lock()
+        self._rebuild([])
+
+    def _rebuild(self, records: List[Dict[str, Any]]) -> None:
+        by_code: Dict[str, Dict[str, Any]] = {}
+        by_city: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        by_country: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        grid: Dict[Tuple[int, int], List[Dict[str, Any]]] = defaultdict(list)
+        for record in records:
+            by_code[str(record["code"]).strip().upper()] = record
+            by_city[_key(record["city"])].append(record)
+            by_country[_key(record["country"])].append(record)
+            if record.get("latitude") is not None and record.get("longitude") is not None:
+                grid[_cell(record["latitude"], record["longitude"])].append(record)
+        # Swap everything at once so readers never see a half-built index
+        self._records, self._by_code, self._by_city, self._by_country, self._grid = (
+            records, by_code, dict(by_city), dict(by_country), dict(grid)
+        )
+        self.version += 1
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    @property
+    def needs_reload(self) -> bool:
+        if self._stale or self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        if not self.needs_reload:
+            return
+        async with self._reload_lock:
+            if not self.needs_reload:
+                return
+            # Cleared before reading so an invalidation during the load is not lost
+            self._stale = False
+            result = await db.execute(text("SELECT * FROM airports ORDER BY code"))
+            records = RowMaterializer(result.keys()).to_dicts(result.all())
+            self._rebuild(records)
+            self._loaded_at = time.monotonic()
+            logger.info(f"Airport index loaded {len(records)} airports (version {self.version})")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def by_code(self, code: str) -> Optional[Dict[str, Any]]:
+        return self._by_code.get(code.strip().upper())
+
+    def _fuzzy(self, mapping: Dict[str, List[Dict[str, Any]]], name: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        key = _key(name)
+        if key in mapping:
+            return key, mapping[key]
+        matches = get_close_matches(key, mapping.keys(), n=1, cutoff=0.85)
+        return (matches[0], mapping[matches[0]]) if matches else (None, [])
+
+    def in_city(self, city: str) -> List[Dict[str, Any]]:
+        return self._fuzzy(self._by_city, city)[1]
+
+    def in_country(self, country: str) -> List[Dict[str, Any]]:
+        return self._fuzzy(self._by_country, country)[1]
+
+    def nearest(self, latitude: float, longitude: float, limit: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        # Walk rings of grid cells outwards until enough candidates are found,
+        # then one more ring since a closer airport may sit just across a cell edge
+        center_lat, center_lon = _cell(latitude, longitude)
+        candidates: List[Dict[str, Any]] = []
+        extra_rings = 1
+        for radius in range(0, int(360 / GRID_DEGREES)):
+            for d_lat in range(-radius, radius + 1):
+                for d_lon in range(-radius, radius + 1):
+                    if max(abs(d_lat), abs(d_lon)) == radius:
+                        candidates.extend(self._grid.get((center_lat + d_lat, center_lon + d_lon), ()))
+            if len(candidates) >= min(limit, len(self._records)):
+                if extra_rings == 0:
+                    break
+                extra_rings -= 1
+        ranked = sorted(
+            ((haversine_km(latitude, longitude, r["latitude"], r["longitude"]), r) for r in candidates),
+            key=lambda item: item[0]
+        )
+        return ranked[:limit]
+
+    def answer(self, query: str) -> Optional[IndexAnswer]:
+        """Answer simple reference questions about airports from memory."""
+        if not self._records:
+            return None
+        text_query = query.strip().rstrip("?.!").strip()
+
+        match = _CODE_QUERY.match(text_query)
+        # Any three-letter word fits the pattern ("show all", "what is the"); it
+        # is only taken for a code when typed in capitals or called one
+        if match and (match.group("code").isupper() or _CODE_WORDS.search(text_query)):
+            airport = self.by_code(match.group("code"))
+            if airport is not None:
+                return IndexAnswer(
+                    sql_query=f"SELECT * FROM airports WHERE code = {_sql_literal(airport['code'])}",
+                    results=[airport],
+                    explanation=f"{airport['code']} is {airport['name']} in {airport['city']}, {airport['country']}.",
+                )
+
+        match = _NEAREST_QUERY.match(text_query)
+        if match:
+            latitude, longitude = float(match.group("lat")), float(match.group("lon"))
+            if abs(latitude) <= 90 and abs(longitude) <= 180:
+                ranked = self.nearest(latitude, longitude)
+                results = [dict(airport, distance_km=round(distance, 1)) for distance, airport in ranked]
+                closest = results[0]
+                return IndexAnswer(
+                    sql_query=f"SELECT * FROM airports ORDER BY power(latitude - {latitude}, 2) + power(longitude - {longitude}, 2) LIMIT {len(results)}",
+                    results=results,
+                    explanation=f"The closest airport to ({latitude}, {longitude}) is {closest['name']} ({closest['code']}), {closest['distance_km']} km away.",
+                )
+
+        match = _PLACE_QUERY.match(text_query)
+        if match:
+            place = match.group("place")
+            for column, mapping in (("city", self._by_city), ("country", self._by_country)):
+                name, airports = self._fuzzy(mapping, place)
+                if airports:
+                    label = airports[0][column]
+                    codes = ", ".join(airport["code"] for airport in airports)
+                    return IndexAnswer(
+                        sql_query=f"SELECT * FROM airports WHERE {column} = {_sql_literal(label)} ORDER BY code",
+                        results=airports,
+                        explanation=f"There {'is' if len(airports) == 1 else 'are'} {len(airports)} airport{'' if len(airports) == 1 else 's'} in {label}: {codes}.",
+                    )
+        return None
+
+_CODE_QUERY = re.compile(
+    r"^(?:(?:show|tell me about|what is|what's|info(?:rmation)? (?:about|on|for)|details (?:of|for|about))\s+)?"
+    r"(?:the\s+)?(?:airport\s+)?(?:code\s+)?(?P<code>[A-Za-z]{3})(?:\s+airport)?(?:\s+code)?$",
+    re.IGNORECASE,
+)
+_CODE_WORDS = re.compile(r"\b(?:airport|code)\b", re.IGNORECASE)
+_PLACE_QUERY = re.compile(
+    r"^(?:(?:show|list|find|get|which|what)\s+(?:me\s+)?(?:all\s+)?(?:the\s+)?)?airports?\s+(?:are\s+)?(?:in|located in)\s+(?P<place>[\w .'-]+)$",
+    re.IGNORECASE,
+)
+_NEAREST_QUERY = re.compile(
+    r"^(?:(?:show|find|what is|what's|which is)\s+)?(?:the\s+)?(?:nearest|closest)\s+airports?\s+(?:to|near)\s+"
+    r"\(?(?P<lat>-?\d+(?:\.\d+)?)\s*,\s*(?P<lon>-?\d+(?:\.\d+)?)\)?$",
+    re.IGNORECASE,
+)
+
+airport_index = AirportIndex(ttl_seconds=settings.AIRPORT_INDEX_TTL_SECONDS)
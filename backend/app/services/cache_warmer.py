@@ -0,0 +1,185 @@
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.db.session import SearchSessionLocal
+from app.services.airport_index import airport_index
+from app.services.intent_router import intent_router
+from app.services.openai_service import OpenAIService
+from app.services.query_cache import sql_cache
+from app.services.query_guard import enforce_limit, explain
+from app.services.schema_context import schema_context
+from app.services.search_history import popular_queries
+from app.services.sql_normalizer import fetch_prepared_page
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart."""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+class CacheWarmer:
+    """Fills the SQL and result caches with the most asked questions.
+
+    Takes the top_n questions of the search history, generates SQL for the
+    ones the intent router cannot answer and the SQL cache does not hold,
+    and fetches the first page of those whose plan costs at most
+    max_precompute_cost. LLM calls and statements are rate limited so a
+    warm-up never crowds out live searches. Runs at startup and then every
+    interval_seconds.
+
+    Coverage is the share of those questions that no longer need the LLM.
+    The worker reports ready once a warm-up pass reaches ready_coverage,
+    when there is nothing to warm, or after ready_timeout_seconds at the
+    latest, so an unreachable LLM cannot keep it out of rotation.
+    """
+
+    def __init__(
+        self,
+        top_n: int,
+        window_days: int,
+        interval_seconds: float,
+        llm_rate: float,
+        llm_concurrency: int,
+        db_rate: float,
+        max_precompute_cost: float,
+        ready_coverage: float,
+        ready_timeout_seconds: float
+    ):
+        self.top_n = top_n
+        self.window_days = window_days
+        self.interval_seconds = interval_seconds
+        self.max_precompute_cost = max_precompute_cost
+        self.ready_coverage = ready_coverage
+        self.ready_timeout_seconds = ready_timeout_seconds
+        self._llm_limiter = RateLimiter(llm_rate)
+        self._llm_slots = asyncio.Semaphore(llm_concurrency)
+        self._db_limiter = RateLimiter(db_rate)
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._started_at: Optional[float] = None
+        self._ready = not settings.WARMUP_ENABLED
+        self.runs = 0
+        self.questions = 0
+        self.covered = 0
+        self.generated = 0
+        self.precomputed = 0
+        self.failed = 0
+        self.last_run_seconds = 0.0
+
+    @property
+    def coverage(self) -> float:
+        return self.covered / self.questions if self.questions else 1.0
+
+    @property
+    def ready(self) -> bool:
+        if not self._ready and self._started_at is not None and time.monotonic() - self._started_at > self.ready_timeout_seconds:
+            logger.warning(f"Cache warm-up at {self.coverage:.0%} coverage after {self.ready_timeout_seconds}s, reporting ready anyway")
+            self._ready = True
+        return self._ready
+
+    def start(self) -> None:
+        if self._task is None and settings.WARMUP_ENABLED:
+            self._started_at = time.monotonic()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Cache warm-up failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _warm(self, question: str) -> bool:
+        # True once the question no longer needs the LLM
+        if settings.AIRPORT_INDEX_ENABLED and intent_router.route(question) is not None:
+            return True
+        schema_info = schema_context.for_query(question)
+        if await sql_cache.contains(question, schema_info):
+            return True
+        try:
+            async with self._llm_slots:
+                await self._llm_limiter.acquire()
+                sql_query = await OpenAIService.generate_sql_query(question, schema_info)
+            self.generated += 1
+            sql_query = enforce_limit(sql_query, settings.QUERY_DEFAULT_LIMIT)
+            await self._db_limiter.acquire()
+            async with SearchSessionLocal() as db:
+                # Only cheap results are fetched; the SQL alone saves the LLM call
+                if (await explain(db, sql_query)).total_cost <= self.max_precompute_cost:
+                    await fetch_prepared_page(db, sql_query, settings.SEARCH_MAX_ROWS, 0)
+                    self.precomputed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.info(f"Warm-up of '{question}' failed: {str(e)}")
+        return await sql_cache.contains(question, schema_info)
+
+    async def run_once(self) -> float:
+        """One warm-up pass; returns its coverage."""
+        started = time.perf_counter()
+        async with SearchSessionLocal() as db:
+            if settings.AIRPORT_INDEX_ENABLED:
+                await airport_index.ensure_fresh(db)
+            await schema_context.ensure_fresh(db)
+            questions = [question for question, _ in await popular_queries(db, self.top_n, self.window_days)]
+        self.questions, self.covered = len(questions), 0
+
+        async def warm(question: str) -> None:
+            if await self._warm(question):
+                self.covered += 1
+                if not self._ready and self.coverage >= self.ready_coverage:
+                    self._ready = True
+                    logger.info(f"Cache warm-up reached {self.coverage:.0%} coverage, ready")
+
+        # Most asked first; the LLM limiter and slots pace the rest
+        await asyncio.gather(*(warm(question) for question in questions))
+        self._ready = self._ready or not questions or self.coverage >= self.ready_coverage
+        self.runs += 1
+        self.last_run_seconds = time.perf_counter() - started
+        logger.info(f"Cache warm-up covered {self.covered} of {self.questions} popular questions in {self.last_run_seconds:.1f}s")
+        return self.coverage
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.WARMUP_ENABLED,
+            "ready": self.ready,
+            "runs": self.runs,
+            "questions": self.questions,
+            "covered": self.covered,
+            "coverage": round(self.coverage, 4),
+            "generated": self.generated,
+            "precomputed": self.precomputed,
+            "failed": self.failed,
+            "last_run_ms": round(self.last_run_seconds * 1000, 3),
+        }
+
+cache_warmer = CacheWarmer(
+    top_n=settings.WARMUP_TOP_N,
+    window_days=settings.WARMUP_WINDOW_DAYS,
+    interval_seconds=settings.WARMUP_INTERVAL_SECONDS,
+    llm_rate=settings.WARMUP_LLM_RATE_PER_SECOND,
+    llm_concurrency=settings.WARMUP_LLM_CONCURRENCY,
+    db_rate=settings.WARMUP_DB_RATE_PER_SECOND,
+    max_precompute_cost=settings.WARMUP_MAX_PRECOMPUTE_COST,
+    ready_coverage=settings.WARMUP_READY_COVERAGE,
+    ready_timeout_seconds=settings.WARMUP_READY_TIMEOUT_SECONDS,
+)
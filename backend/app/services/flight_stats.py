@@ -0,0 +1,37 @@
+from datetime import date
+from typing import Optional
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+STATS_TABLES = ("route_daily_stats", "route_stats", "airline_stats")
+# Held until commit; concurrent refreshes would otherwise both re-insert the rows they deleted
+REFRESH_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('refresh_flight_stats'))"
+
+def refresh_flight_stats(db: Session, from_date: Optional[date] = None, to_date: Optional[date] = None) -> bool:
+    """Recompute the flight statistics for departures from_date..to_date, or all of them.
+
+    Runs in its own transaction after the flights were committed. Failures
+    are logged rather than raised: stale statistics should not fail a write
+    that already went through.
+    """
+    started = time.perf_counter()
+    try:
+        db.rollback()
+        db.execute(text(REFRESH_LOCK_SQL))
+        db.execute(text("SELECT refresh_flight_stats(CAST(:from_date AS DATE), CAST(:to_date AS DATE))"), {"from_date": from_date, "to_date": to_date})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Flight statistics refresh failed: {str(e)}")
+        return False
+    result_cache.invalidate(STATS_TABLES)
+    scope = f"{from_date} to {to_date}" if from_date is not None else "all departures"
+    logger.info(f"Refreshed flight statistics for {scope} in {time.perf_counter() - started:.2f}s")
+    return True
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional
+import logging
+import os
+import threading
+import uuid
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.airport_index import airport_index
+from app.services.ingest_specs import AIRPORTS, IngestReport, TableSpec
+from app.services.result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+async def keep_upload(file: UploadFile) -> BinaryIO:
+    """The upload's spooled file, opened anew so it outlives the request.
+
+    Starlette closes the upload once the response is sent; a duplicate of
+    its descriptor keeps the data readable for a background job without
+    copying it. An upload still held in memory (under 1 MB) is written out
+    to a temporary file first.
+    """
+    await file.seek(0)
+    descriptor = await run_in_threadpool(lambda: os.dup(file.file.fileno()))
+    return os.fdopen(descriptor, "rb")
+
+@dataclass
+class IngestJob:
+    id: str
+    table: str
+    filename: str
+    status: str = "queued"  # queued, running, succeeded or failed
+    report: IngestReport = field(default_factory=IngestReport)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "table": self.table,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            **self.report.as_dict(),
+        }
+
+# Jobs live in the worker that accepted the upload; only the latest are kept
+_jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+def create_job(table: str, filename: str) -> IngestJob:
+    job = IngestJob(id=uuid.uuid4().hex, table=table, filename=filename)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > settings.INGEST_JOB_HISTORY:
+            _jobs.popitem(last=False)
+    return job
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def run_job(job: IngestJob, source: BinaryIO, spec: TableSpec) -> None:
+    # Runs in the thread pool after the upload request has returned
+    from app.services.ingestion import ingest_file
+
+    job.status = "running"
+    db = SessionLocal()
+    try:
+        def progress(report: IngestReport) -> None:
+            job.report = report
+
+        job.report = ingest_file(db, source, job.filename, spec, progress)
+        job.status = "succeeded"
+    except Exception as e:
+        logger.error(f"Ingestion job {job.id} failed: {str(e)}", exc_info=True)
+        db.rollback()
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        db.close()
+        result_cache.invalidate([spec.table])
+        if spec is AIRPORTS:
+            airport_index.invalidate()
+        job.finished_at = datetime.utcnow()
+        source.close()
@@ -0,0 +1,94 @@
+# The upload tables and their columns, without the pandas machinery of
+# app.services.ingestion, so routes and job tracking import them cheaply
+from dataclasses import dataclass, field
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FLIGHT_STATUSES = ("scheduled", "delayed", "cancelled", "boarding", "departed", "arrived")
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    kind: str  # "str", "int", "float" or "datetime"
+    required: bool = False
+
+@dataclass(frozen=True)
+class TableSpec:
+    table: str
+    columns: Tuple[ColumnSpec, ...]
+    conflict_columns: Tuple[str, ...]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+AIRPORTS = TableSpec(
+    table="airports",
+    columns=(
+        ColumnSpec("code", "str", required=True),
+        ColumnSpec("name", "str", required=True),
+        ColumnSpec("city", "str", required=True),
+        ColumnSpec("country", "str", required=True),
+        ColumnSpec("latitude", "float", required=True),
+        ColumnSpec("longitude", "float", required=True),
+        ColumnSpec("timezone", "str", required=True),
+        ColumnSpec("terminal_count", "int"),
+        ColumnSpec("runway_count", "int"),
+        ColumnSpec("description", "str"),
+    ),
+    conflict_columns=("code",),
+)
+
+FLIGHTS = TableSpec(
+    table="flights",
+    columns=(
+        ColumnSpec("flight_number", "str", required=True),
+        ColumnSpec("airline", "str", required=True),
+        ColumnSpec("departure_airport_id", "int", required=True),
+        ColumnSpec("arrival_airport_id", "int", required=True),
+        ColumnSpec("departure_time", "datetime", required=True),
+        ColumnSpec("arrival_time", "datetime", required=True),
+        ColumnSpec("duration", "int"),
+        ColumnSpec("aircraft_type", "str"),
+        ColumnSpec("status", "str"),
+        ColumnSpec("gate", "str"),
+        ColumnSpec("terminal", "str"),
+        ColumnSpec("price", "float"),
+    ),
+    conflict_columns=("flight_number", "departure_time"),
+)
+
+@dataclass
+class IngestReport:
+    rows_received: int = 0
+    rows_loaded: int = 0
+    rows_rejected: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    # Departure dates of the flights loaded, for the statistics refresh
+    first_departure: Optional[date] = None
+    last_departure: Optional[date] = None
+
+    def add_errors(self, errors: List[Dict[str, Any]]) -> None:
+        room = settings.INGEST_MAX_REPORTED_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def add_departures(self, departures: "pd.Series") -> None:
+        if departures.empty:
+            return
+        first, last = departures.min().date(), departures.max().date()
+        self.first_departure = min(first, self.first_departure or first)
+        self.last_departure = max(last, self.last_departure or last)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_received": self.rows_received,
+            "rows_loaded": self.rows_loaded,
+            "rows_rejected": self.rows_rejected,
+            "errors": self.errors,
+        }
@@ -0,0 +1,332 @@
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import io
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.flight_stats import refresh_flight_stats
+from app.services.ingest_specs import AIRPORTS, FLIGHT_STATUSES, FLIGHTS, IngestReport, TableSpec
+
+logger = logging.getLogger(__name__)
+
+# Held until the chunk commits; two uploads would otherwise both create a missing partition
+PARTITION_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('ensure_flight_partitions'))"
+
+def read_table(source: Union[str, Path, BinaryIO], filename: str) -> pd.DataFrame:
+    suffix = Path(filename or "").suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(source, dtype=str, keep_default_na=False)
+    if suffix == ".parquet":
+        return pd.read_parquet(source)
+    if suffix in (".xlsx", ""):
+        return pd.read_excel(source)
+    raise ValueError(f"Unsupported file type '{suffix}', expected .xlsx, .csv or .parquet")
+
+def _iter_excel_chunks(source: Union[str, Path, BinaryIO], chunk_size: int) -> Iterator[pd.DataFrame]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(name).strip() if name is not None else "" for name in next(rows, ())]
+        start, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=header, index=pd.RangeIndex(start, start + len(batch)))
+                start, batch = start + len(batch), []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=pd.RangeIndex(start, start + len(batch)))
+    finally:
+        workbook.close()
+
+def _iter_parquet_chunks(source: Union[str, Path, BinaryIO], chunk_size: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    start = 0
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+        df = batch.to_pandas()
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
+
+def iter_table_chunks(source: Union[str, Path, BinaryIO], filename: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield the rows of an uploaded file `chunk_size` at a time.
+
+    Only one chunk is held in memory; the frame index keeps counting across
+    chunks so row numbers in error reports refer to the whole file.
+    """
+    suffix = Path(filename or "").suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    if suffix == ".parquet":
+        return _iter_parquet_chunks(source, chunk_size)
+    if suffix in (".xlsx", ""):
+        return _iter_excel_chunks(source, chunk_size)
+    raise ValueError(f"Unsupported file type '{suffix}', expected .xlsx, .csv or .parquet")
+
+def _row_numbers(df: pd.DataFrame) -> np.ndarray:
+    # Errors refer to 1-based data rows of the uploaded file, header excluded
+    return df.index.to_numpy() + 1
+
+def _row_errors(mask: np.ndarray, row_numbers: np.ndarray, column: str, message: str) -> List[Dict[str, Any]]:
+    return [{"row": int(row), "column": column, "error": message} for row in row_numbers[mask]]
+
+def validate_frame(df: pd.DataFrame, spec: TableSpec) -> Tuple[pd.DataFrame, List[Dict[str, Any]], int]:
+    """Coerce `df` to the column types of `spec`, column by column.
+
+    Returns the valid rows, an error per invalid cell and the number of
+    rejected rows.
+    """
+    row_numbers = _row_numbers(df)
+    rejected = np.zeros(len(df), dtype=bool)
+    errors: List[Dict[str, Any]] = []
+    clean = pd.DataFrame(index=df.index)
+
+    for column in spec.columns:
+        if column.name not in df.columns:
+            if column.required:
+                raise ValueError(f"Missing required column '{column.name}'")
+            clean[column.name] = None
+            continue
+
+        raw = df[column.name]
+        if raw.dtype == object or pd.api.types.is_string_dtype(raw):
+            raw = raw.astype("string").str.strip().replace("", pd.NA)
+        present = raw.notna().to_numpy()
+
+        if column.kind == "str":
+            values = raw.astype("string")
+        elif column.kind == "datetime":
+            values = pd.to_datetime(raw, errors="coerce", utc=True)
+        else:
+            values = pd.to_numeric(raw, errors="coerce")
+            if column.kind == "int":
+                fractional = values.notna() & (values != values.round())
+                values = values.mask(fractional).astype("Int64")
+        valid = values.notna().to_numpy()
+
+        bad_value = present & ~valid
+        if bad_value.any():
+            errors.extend(_row_errors(bad_value, row_numbers, column.name, f"not a valid {column.kind}"))
+        if column.required:
+            missing = ~present
+            if missing.any():
+                errors.extend(_row_errors(missing, row_numbers, column.name, "value is required"))
+            rejected |= ~valid
+        else:
+            rejected |= bad_value
+        clean[column.name] = values
+
+    for mask, column, message in _domain_checks(clean, spec):
+        if mask.any():
+            errors.extend(_row_errors(mask, row_numbers, column, message))
+            rejected |= mask
+
+    errors.sort(key=lambda error: error["row"])
+    return clean[~rejected], errors, int(rejected.sum())
+
+def _domain_checks(df: pd.DataFrame, spec: TableSpec) -> Iterable[Tuple[np.ndarray, str, str]]:
+    if spec is AIRPORTS:
+        df["code"] = df["code"].str.upper()
+        yield (df["code"].str.len() > 3).fillna(False).to_numpy(), "code", "must be at most 3 characters"
+        yield (df["latitude"].abs() > 90).fillna(False).to_numpy(), "latitude", "must be between -90 and 90"
+        yield (df["longitude"].abs() > 180).fillna(False).to_numpy(), "longitude", "must be between -180 and 180"
+    elif spec is FLIGHTS:
+        df["status"] = df["status"].str.lower()
+        unknown_status = (df["status"].notna() & ~df["status"].isin(FLIGHT_STATUSES)).fillna(False)
+        yield unknown_status.to_numpy(), "status", f"must be one of {', '.join(FLIGHT_STATUSES)}"
+        yield (df["arrival_time"] < df["departure_time"]).fillna(False).to_numpy(), "arrival_time", "is before departure_time"
+
+def check_airport_ids(db: Session, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]], int]:
+    # Rejects flights whose airports do not exist instead of failing a whole chunk on the foreign key
+    known = np.fromiter((row[0] for row in db.execute(text("SELECT id FROM airports"))), dtype=np.int64)
+    row_numbers = _row_numbers(df)
+    rejected = np.zeros(len(df), dtype=bool)
+    errors = []
+    for column in ("departure_airport_id", "arrival_airport_id"):
+        unknown = ~df[column].isin(known).to_numpy()
+        if unknown.any():
+            errors.extend(_row_errors(unknown, row_numbers, column, "unknown airport id"))
+            rejected |= unknown
+    errors.sort(key=lambda error: error["row"])
+    return df[~rejected], errors, int(rejected.sum())
+
+def ensure_flight_partitions(db: Session, departures: pd.Series) -> int:
+    """Create the monthly flights partitions that `departures` fall in and that are missing.
+
+    Without them the rows land in flights_default. Does nothing when flights
+    is not partitioned; returns the number of partitions created.
+    """
+    departures = departures.dropna()
+    if departures.empty:
+        return 0
+    if departures.dt.tz is not None:
+        departures = departures.dt.tz_convert(None)
+    months = np.unique(departures.to_numpy().astype("datetime64[M]")).astype("datetime64[D]").tolist()
+    missing = db.execute(text(
+        "SELECT month FROM unnest(CAST(:months AS DATE[])) AS month "
+        "WHERE to_regproc('ensure_flight_partitions') IS NOT NULL "
+        "AND to_regclass(format('flights_%s', to_char(month, 'YYYY_MM'))) IS NULL"
+    ), {"months": months}).scalars().all()
+    if not missing:
+        return 0
+    db.execute(text(PARTITION_LOCK_SQL))
+    created = db.execute(text(
+        "SELECT coalesce(sum(ensure_flight_partitions(month, month)), 0) FROM unnest(CAST(:months AS DATE[])) AS month"
+    ), {"months": missing}).scalar()
+    if created:
+        logger.info(f"Created {created} flights partition(s) from {missing[0]} to {missing[-1]}")
+    return created
+
+def _upsert_sql(spec: TableSpec, rows_sql: str) -> str:
+    columns = spec.column_names
+    updates = [column for column in columns if column not in spec.conflict_columns]
+    return (
+        f"INSERT INTO {spec.table} ({', '.join(columns)}, created_at, updated_at) {rows_sql} "
+        f"ON CONFLICT ({', '.join(spec.conflict_columns)}) DO UPDATE SET "
+        + ", ".join(f"{column} = EXCLUDED.{column}" for column in updates)
+        + ", updated_at = now()"
+    )
+
+def _to_python(value: Any) -> Any:
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+def _with_iso_timestamps(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Formatting through numpy is much faster than to_csv(date_format=...)
+    chunk = chunk.copy()
+    for column in chunk.columns:
+        if isinstance(chunk[column].dtype, pd.DatetimeTZDtype):
+            values = chunk[column].dt.tz_convert(None).to_numpy()
+            chunk[column] = np.where(np.isnat(values), "", values.astype("datetime64[us]").astype(str))
+    return chunk
+
+def _copy_rows(cursor: Any, copy_sql: str, buffer: io.StringIO) -> None:
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(copy_sql, buffer)
+    else:
+        with cursor.copy(copy_sql) as copy:
+            copy.write(buffer.getvalue())
+
+class BulkLoader:
+    """Upserts validated frames into one table, using COPY when the driver allows it."""
+
+    def __init__(self, db: Session, spec: TableSpec):
+        self.db = db
+        self.spec = spec
+        self.staging_table = f"_ingest_{spec.table}"
+        self.use_copy = settings.INGEST_USE_COPY and self._supports_copy()
+
+    def _supports_copy(self) -> bool:
+        cursor = self.db.connection().connection.dbapi_connection.cursor()
+        try:
+            return hasattr(cursor, "copy_expert") or hasattr(cursor, "copy")
+        finally:
+            cursor.close()
+
+    def load(self, df: pd.DataFrame) -> int:
+        if df.empty:
+            return 0
+        # A statement cannot upsert the same key twice, the last occurrence wins
+        df = df.drop_duplicates(subset=list(self.spec.conflict_columns), keep="last")
+        for start in range(0, len(df), settings.INGEST_CHUNK_SIZE):
+            chunk = df.iloc[start:start + settings.INGEST_CHUNK_SIZE]
+            if self.use_copy:
+                self._load_with_copy(chunk)
+            else:
+                self._load_with_executemany(chunk)
+        return len(df)
+
+    def _load_with_copy(self, chunk: pd.DataFrame) -> None:
+        columns = self.spec.column_names
+        # Chunks may be committed on different pooled connections, so the
+        # staging table is (re)created on whichever connection this one uses
+        self.db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {self.staging_table} "
+            f"AS SELECT {', '.join(columns)} FROM {self.spec.table} WITH NO DATA"
+        ))
+        self.db.execute(text(f"TRUNCATE {self.staging_table}"))
+
+        buffer = io.StringIO()
+        _with_iso_timestamps(chunk).to_csv(buffer, header=False, index=False, na_rep="")
+        buffer.seek(0)
+        cursor = self.db.connection().connection.dbapi_connection.cursor()
+        try:
+            _copy_rows(cursor, f"COPY {self.staging_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        self.db.execute(text(_upsert_sql(
+            self.spec, f"SELECT {', '.join(columns)}, now(), now() FROM {self.staging_table}"
+        )))
+
+    def _load_with_executemany(self, chunk: pd.DataFrame) -> None:
+        columns = self.spec.column_names
+        records = [
+            {column: _to_python(value) for column, value in zip(columns, row)}
+            for row in chunk.itertuples(index=False, name=None)
+        ]
+        values = ", ".join(f":{column}" for column in columns)
+        self.db.execute(text(_upsert_sql(self.spec, f"VALUES ({values}, now(), now())")), records)
+
+def ingest_frame(db: Session, df: pd.DataFrame, spec: TableSpec, report: IngestReport, loader: Optional[BulkLoader] = None) -> BulkLoader:
+    report.rows_received += len(df)
+    clean, errors, rejected = validate_frame(df, spec)
+    if spec is FLIGHTS and not clean.empty:
+        clean, id_errors, id_rejected = check_airport_ids(db, clean)
+        errors = sorted(errors + id_errors, key=lambda error: error["row"])
+        rejected += id_rejected
+    report.rows_rejected += rejected
+    report.add_errors(errors)
+
+    if spec is FLIGHTS:
+        ensure_flight_partitions(db, clean["departure_time"])
+    loader = loader or BulkLoader(db, spec)
+    report.rows_loaded += loader.load(clean)
+    if spec is FLIGHTS:
+        report.add_departures(clean["departure_time"])
+    return loader
+
+def ingest_file(
+    db: Session,
+    source: Union[str, Path, BinaryIO],
+    filename: str,
+    spec: TableSpec,
+    progress: Optional[Callable[[IngestReport], None]] = None
+) -> IngestReport:
+    """Parse and load a spooled upload chunk by chunk.
+
+    Each chunk is committed as soon as it is loaded, so a large file never
+    sits in memory or in one long transaction; rows of chunks committed before
+    a failure stay loaded, and flight statistics are refreshed for them
+    either way.
+    """
+    report = IngestReport()
+    loader = None
+    try:
+        for chunk in iter_table_chunks(source, filename, settings.INGEST_CHUNK_SIZE):
+            loader = ingest_frame(db, chunk, spec, report, loader)
+            db.commit()
+            if progress is not None:
+                progress(report)
+    finally:
+        if report.first_departure is not None:
+            _refresh_flight_stats(db, report)
+    logger.info(f"Loaded {report.rows_loaded} {spec.table} rows, rejected {report.rows_rejected}")
+    return report
+
+def _refresh_flight_stats(db: Session, report: IngestReport) -> None:
+    # A day either side: statistics bucket departures by the database's
+    # time zone, uploads are read as UTC
+    refresh_flight_stats(db, report.first_departure - timedelta(days=1), report.last_departure + timedelta(days=1))
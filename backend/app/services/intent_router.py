@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Union
+import re
+
+from app.core.metrics import metrics
+from app.services.airport_index import AirportIndex, IndexAnswer, airport_index
+
+@dataclass
+class TemplateQuery:
+    """A parameterized SQL template filled from slots extracted from the question."""
+    intent: str
+    sql: str
+    params: Dict[str, Any]
+    describe: Callable[[List[Dict[str, Any]]], str]
+
+    @property
+    def display_sql(self) -> str:
+        # Literal version of the statement, shown to the user and used for page tokens
+        def literal(value: Any) -> str:
+            if isinstance(value, (list, tuple)):
+                return "(" + ", ".join(literal(item) for item in value) + ")"
+            if isinstance(value, (int, float)):
+                return str(value)
+            return "'" + str(value).replace("'", "''") + "'"
+        return re.sub(r":(\w+)", lambda m: literal(self.params[m.group(1)]), self.sql)
+
+Route = Union[IndexAnswer, TemplateQuery]
+
+_FLIGHT_SELECT = (
+    "SELECT f.*, dep.code AS departure_airport, arr.code AS arrival_airport "
+    "FROM flights f "
+    "JOIN airports dep ON dep.id = f.departure_airport_id "
+    "JOIN airports arr ON arr.id = f.arrival_airport_id"
+)
+
+_PREFIX = r"^(?:(?:show|list|find|get|search|give)\s+(?:me\s+)?|(?:are there|any|what are)\s+)?(?:all\s+)?(?:the\s+)?(?:available\s+)?"
+_DATE = r"(?:\s+(?:on|for)\s+(?P<date>\d{4}-\d{2}-\d{2})|\s+(?P<relative>today|tomorrow|yesterday|tonight))?"
+
+_ROUTE_QUERY = re.compile(
+    _PREFIX + r"flights?\s+(?:from\s+(?P<origin>.+?))?(?:\s*to\s+(?P<destination>.+?))?" + _DATE + r"$",
+    re.IGNORECASE,
+)
+_STATUS_QUERY = re.compile(
+    r"^(?:(?:what is|what's|show|get|check)\s+(?:me\s+)?)?(?:the\s+)?(?:status\s+(?:of|for)\s+)?(?:flight\s+)?"
+    r"(?P<flight>[A-Za-z0-9]{2}\s?\d{1,4})(?:\s+(?:flight\s+)?status)?$",
+    re.IGNORECASE,
+)
+_STATUS_WORDS = re.compile(r"\bstatus\b", re.IGNORECASE)
+
+def _day_bounds(slots: Dict[str, Optional[str]], today: date) -> Optional[Dict[str, datetime]]:
+    # Raises ValueError for a date that matches the pattern but does not exist
+    if slots.get("date"):
+        day = date.fromisoformat(slots["date"])
+    elif slots.get("relative"):
+        offset = {"today": 0, "tonight": 0, "tomorrow": 1, "yesterday": -1}[slots["relative"].lower()]
+        day = today + timedelta(days=offset)
+    else:
+        return None
+    start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    return {"day_start": start, "day_end": start + timedelta(days=1)}
+
+def _resolve_place(index: AirportIndex, place: str) -> List[Dict[str, Any]]:
+    place = place.strip()
+    airport = index.by_code(place) if len(place) == 3 else None
+    if airport is not None:
+        return [airport]
+    return index.in_city(place)
+
+def _place_label(airports: List[Dict[str, Any]]) -> str:
+    codes = ", ".join(airport["code"] for airport in airports)
+    return f"{airports[0]['city']} ({codes})"
+
+class IntentRouter:
+    """Maps common question shapes to answers or SQL templates without the LLM.
+
+    Rules are tried in order: reference questions the airport index answers
+    from memory, then flight templates. Anything else returns None and goes to
+    the LLM.
+    """
+
+    def __init__(self, index: AirportIndex):
+        self.index = index
+
+    def route(self, query: str, today: Optional[date] = None) -> Optional[Route]:
+        today = today or datetime.now(timezone.utc).date()
+        question = " ".join(query.strip().rstrip("?.!").split())
+
+        answer = self.index.answer(question)
+        if answer is not None:
+            return answer
+
+        match = _ROUTE_QUERY.match(question)
+        if match and (match.group("origin") or match.group("destination")):
+            try:
+                return self._flights_on_route(match.groupdict(), today)
+            except ValueError:
+                # "flights to LHR on 2025-02-30": leave the odd date to the LLM
+                return None
+
+        match = _STATUS_QUERY.match(question)
+        if match and (_STATUS_WORDS.search(question) or question.lower().startswith("flight")):
+            return self._flight_status(match.group("flight"))
+        return None
+
+    def _flights_on_route(self, slots: Dict[str, Optional[str]], today: date) -> Optional[TemplateQuery]:
+        conditions, params, labels = [], {}, []
+        for slot, column, word in (("origin", "departure_airport_id", "from"), ("destination", "arrival_airport_id", "to")):
+            if not slots.get(slot):
+                continue
+            airports = _resolve_place(self.index, slots[slot])
+            if not airports:
+                # An unknown place is the LLM's problem, not a reason to return nothing
+                return None
+            conditions.append(f"f.{column} IN :{slot}_ids")
+            params[f"{slot}_ids"] = [airport["id"] for airport in airports]
+            labels.append(f"{word} {_place_label(airports)}")
+
+        bounds = _day_bounds(slots, today)
+        if bounds is not None:
+            # departure_time is a UTC timestamp without time zone; the aware
+            # bounds are converted in SQL so the session time zone plays no part
+            conditions.append(
+                "f.departure_time >= (CAST(:day_start AS timestamptz) AT TIME ZONE 'UTC') "
+                "AND f.departure_time < (CAST(:day_end AS timestamptz) AT TIME ZONE 'UTC')"
+            )
+            params.update(bounds)
+            labels.append(f"on {bounds['day_start'].date().isoformat()}")
+
+        summary = " ".join(labels)
+
+        def describe(rows: List[Dict[str, Any]]) -> str:
+            if not rows:
+                return f"There are no flights {summary}."
+            return f"Found {len(rows)} flight{'' if len(rows) == 1 else 's'} {summary}, the first departing at {rows[0]['departure_time']}."
+
+        return TemplateQuery(
+            intent="flights_on_route",
+            sql=f"{_FLIGHT_SELECT} WHERE {' AND '.join(conditions)} ORDER BY f.departure_time",
+            params=params,
+            describe=describe,
+        )
+
+    def _flight_status(self, flight_number: str) -> TemplateQuery:
+        flight_number = flight_number.replace(" ", "").upper()
+
+        def describe(rows: List[Dict[str, Any]]) -> str:
+            if not rows:
+                return f"No flight {flight_number} was found."
+            latest = rows[0]
+            gate = f" from gate {latest['gate']}" if latest.get("gate") else ""
+            return (
+                f"Flight {flight_number} from {latest['departure_airport']} to {latest['arrival_airport']} "
+                f"departing {latest['departure_time']}{gate} is {latest['status'] or 'unknown'}."
+            )
+
+        return TemplateQuery(
+            intent="flight_status",
+            sql=f"{_FLIGHT_SELECT} WHERE upper(f.flight_number) = :flight_number ORDER BY f.departure_time DESC LIMIT 5",
+            params={"flight_number": flight_number},
+            describe=describe,
+        )
+
+def routing_stats() -> Dict[str, Any]:
+    counts = {dict(key).get("path"): value for key, value in metrics.counter_values("search_requests_total").items()}
+    # Follow-up pages and failures are left out; they say nothing about routing
+    bypassed = counts.get("airport_index", 0) + counts.get("template", 0)
+    total = bypassed + counts.get("llm", 0)
+    return {
+        "requests": counts,
+        "bypass_rate": round(bypassed / total, 4) if total else 0.0,
+        "latency": {
+            dict(key).get("path"): snapshot
+            for key, snapshot in metrics.histogram_snapshots("search_latency_seconds").items()
+        },
+    }
+
+intent_router = IntentRouter(airport_index)
@@ -1,11 +1,70 @@
-from openai import OpenAI
 from app.core.config import settings
-from typing import List, Dict, Any
+from app.services.query_cache import sql_cache
+from app.services.result_summarizer import summarize_results
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, AsyncIterator
+import asyncio
 import json
 from decimal import Decimal
 from datetime import datetime
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Returned when the model's reply does not look like SQL
+DEFAULT_SQL = "SELECT * FROM airports LIMIT 5"
+
+_client: Optional["AsyncOpenAI"] = None
+_llm_slots: Optional[asyncio.Semaphore] = None
+
+def get_client() -> "AsyncOpenAI":
+    # One pooled, keep-alive HTTP client per process, shared by all requests.
+    # The openai package takes most of a second to import, so it is only
+    # loaded here, by the first LLM call or the startup warm-up
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=http_client,
+        )
+    return _client
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+def _get_llm_slots() -> asyncio.Semaphore:
+    # Bound the number of in-flight LLM calls so a burst queues here instead of
+    # overwhelming the connection pool or the API rate limit
+    global _llm_slots
+    if _llm_slots is None:
+        _llm_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return _llm_slots
+
+async def chat_completion(**kwargs) -> Any:
+    async with _get_llm_slots():
+        return await get_client().chat.completions.create(**kwargs)
+
+async def stream_chat_completion(**kwargs) -> AsyncIterator[str]:
+    # The slot is held until the last token has been received
+    async with _get_llm_slots():
+        stream = await get_client().chat.completions.create(stream=True, **kwargs)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
 # Mock implementation for testing
 class MockOpenAIService:
@@ -28,7 +87,11 @@ OpenAIService = MockOpenAIService
 
 class OpenAIService:
     @staticmethod
-    def generate_sql_query(natural_language_query: str, schema_info: str) -> str:
+    async def generate_sql_query(natural_language_query: str, schema_info: str) -> str:
+        cached_sql = await sql_cache.get(natural_language_query, schema_info)
+        if cached_sql is not None:
+            return cached_sql
+
         prompt = f"""
         Given the following database schema information:
         {schema_info}
@@ -41,7 +104,7 @@ class OpenAIService:
         If the query is unclear, return a simple query like 'SELECT * FROM airports LIMIT 5'
         """
 
-        response = client.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a SQL expert. Convert natural language to SQL queries. Return ONLY the SQL query, nothing else."},
@@ -51,19 +114,83 @@ class OpenAIService:
         )
 
         # Extract just the SQL query, removing any markdown or explanations
-        sql_query = response.choices[0].message.content.strip()
+        sql_query = OpenAIService._clean_sql(response.choices[0].message.content)
+        
+        # If the response doesn't look like SQL, return a default query
+        if sql_query is None:
+            return DEFAULT_SQL
+
+        await sql_cache.set(natural_language_query, schema_info, sql_query)
+        return sql_query
+
+    @staticmethod
+    def _clean_sql(content: str) -> Optional[str]:
+        sql_query = content.strip()
         if sql_query.startswith("```sql"):
             sql_query = sql_query[6:]
         if sql_query.endswith("```"):
             sql_query = sql_query[:-3]
         sql_query = sql_query.strip()
-        
-        # If the response doesn't look like SQL, return a default query
         if not any(keyword in sql_query.upper() for keyword in ["SELECT", "INSERT", "UPDATE", "DELETE"]):
-            return "SELECT * FROM airports LIMIT 5"
-            
+            return None
         return sql_query
 
+    @staticmethod
+    async def generate_sql_queries(natural_language_queries: List[str], schema_info: str) -> List[str]:
+        """SQL for several questions, with one LLM call for all cache misses.
+
+        If the reply cannot be matched up with the questions, each question
+        is converted on its own instead.
+        """
+        sql_queries: List[Optional[str]] = list(await asyncio.gather(*(sql_cache.get(query, schema_info) for query in natural_language_queries)))
+        missing = [index for index, sql_query in enumerate(sql_queries) if sql_query is None]
+        if len(missing) == 1:
+            sql_queries[missing[0]] = await OpenAIService.generate_sql_query(natural_language_queries[missing[0]], schema_info)
+        elif missing:
+            questions = "\n".join(f"{number}. {natural_language_queries[index]}" for number, index in enumerate(missing, 1))
+            prompt = f"""
+        Given the following database schema information:
+        {schema_info}
+
+        Convert each of these numbered natural language queries to SQL:
+        {questions}
+
+        IMPORTANT: Return ONLY a JSON array with one SQL query string per question, in the same order.
+        The queries should be safe and follow SQL best practices.
+        If a question is unclear, use a simple query like 'SELECT * FROM airports LIMIT 5' for it.
+        """
+
+            response = await chat_completion(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a SQL expert. Convert natural language to SQL queries. Return ONLY a JSON array of SQL strings, nothing else."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1
+            )
+
+            content = response.choices[0].message.content.strip()
+            if content.startswith("```"):
+                content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+            try:
+                packed = json.loads(content)
+            except json.JSONDecodeError:
+                packed = None
+            if not isinstance(packed, list) or len(packed) != len(missing) or not all(isinstance(sql, str) for sql in packed):
+                packed_queries = await asyncio.gather(*(
+                    OpenAIService.generate_sql_query(natural_language_queries[index], schema_info) for index in missing
+                ))
+            else:
+                packed_queries = []
+                for index, content in zip(missing, packed):
+                    sql_query = OpenAIService._clean_sql(content)
+                    if sql_query is not None:
+                        await sql_cache.set(natural_language_queries[index], schema_info, sql_query)
+                    packed_queries.append(sql_query or DEFAULT_SQL)
+            for index, sql_query in zip(missing, packed_queries):
+                sql_queries[index] = sql_query
+        return sql_queries
+
     @staticmethod
     async def generate_mock_results(sql_query: str) -> List[Dict[str, Any]]:
         prompt = f"""
@@ -76,7 +203,7 @@ class OpenAIService:
         Generate 3-5 rows of data.
         """
 
-        response = await client.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a database expert generating realistic mock data."},
@@ -107,7 +234,7 @@ class OpenAIService:
         Please provide only the SQL query without any explanations.
         """
 
-        response = await client.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a SQL expert. Convert natural language to SQL queries for database modifications."},
@@ -119,7 +246,7 @@ class OpenAIService:
         return response.choices[0].message.content.strip()
 
     @staticmethod
-    def explain_query_results(results: List[Dict[str, Any]], query: str) -> str:
+    def _explanation_messages(results: List[Dict[str, Any]], query: str, row_count: Optional[int] = None) -> List[Dict[str, str]]:
         # Convert Decimal and datetime to JSON-serializable types
         def json_serializer(obj):
             if isinstance(obj, Decimal):
@@ -128,21 +255,42 @@ class OpenAIService:
                 return obj.isoformat()
             raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
+        # Only a summary of large results goes into the prompt
+        summary = summarize_results(results, row_count)
+
         prompt = f"""
         Explain these query results in natural language:
         Query: {query}
-        Results: {json.dumps(results, indent=2, default=json_serializer)}
+        Results: {json.dumps(summary, default=json_serializer)}
 
-        Provide a clear and concise explanation of what these results mean.
+        The results are either the full rows or, for larger results, per-column
+        statistics with a few sample rows. Provide a clear and concise
+        explanation of what these results mean.
         """
 
-        response = client.chat.completions.create(
+        return [
+            {"role": "system", "content": "You are a helpful assistant explaining database query results."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    async def explain_query_results(results: List[Dict[str, Any]], query: str, row_count: Optional[int] = None) -> str:
+        # Summarizing a large page takes tens of milliseconds; keep it off the event loop
+        messages = await asyncio.to_thread(OpenAIService._explanation_messages, results, query, row_count)
+        response = await chat_completion(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant explaining database query results."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.7
         )
 
-        return response.choices[0].message.content.strip() 
\ No newline at end of file
+        return response.choices[0].message.content.strip()
+
+    @staticmethod
+    async def stream_explanation(results: List[Dict[str, Any]], query: str, row_count: Optional[int] = None) -> AsyncIterator[str]:
+        messages = await asyncio.to_thread(OpenAIService._explanation_messages, results, query, row_count)
+        async for token in stream_chat_completion(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.7
+        ):
+            yield token 
\ No newline at end of file
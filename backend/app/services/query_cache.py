@@ -0,0 +1,428 @@
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning for SQL generation
+_STOPWORDS = {
+    "a", "an", "the", "please", "show", "me", "list", "give", "find", "get", "all",
+    "what", "which", "are", "is", "there", "any", "of", "for", "can", "you", "i",
+    "want", "see", "display", "tell", "about", "s", "located", "currently", "available",
+}
+
+# Common phrasings folded onto the same tokens
+_SYNONYMS = {
+    "flight": "flights",
+    "departure": "flights from",
+    "departures": "flights from",
+    "departing": "flights from",
+    "leaving": "flights from",
+    "arrival": "flights to",
+    "arrivals": "flights to",
+    "arriving": "flights to",
+    "airport": "airports",
+    "airline": "airlines",
+    "cheapest": "lowest",
+    "cheaper": "lower",
+}
+
+# Tokens whose presence changes the meaning of a query regardless of similarity
+_DATE_WORDS = {
+    "today", "tomorrow", "yesterday", "tonight", "now", "week", "month", "year",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+}
+_DIRECTION_WORDS = {"from", "to"}
+
+_CODE_PATTERN = re.compile(r"\b[A-Z]{2,3}\b")
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(query: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(query.lower().replace("'s", "")):
+        if token not in _STOPWORDS:
+            tokens.extend(_SYNONYMS.get(token, token).split())
+    return tokens
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(_tokens(query))
+
+
+@lru_cache(maxsize=32)
+def schema_fingerprint(schema_info: str) -> str:
+    return hashlib.sha256(schema_info.encode("utf-8")).hexdigest()[:16]
+
+
+def _entities(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Extract the literal values of a query and the direction they are used in.
+
+    Two queries are only allowed to share cached SQL when these agree, so that
+    "flights from JFK to LAX" never answers "flights from LAX to JFK".
+    """
+    codes = {code.lower() for code in _CODE_PATTERN.findall(query)}
+    tokens = _tokens(query)
+    entities = {
+        token for token in tokens
+        if token in codes or token in _DATE_WORDS or any(ch.isdigit() for ch in token)
+    }
+    directions = [
+        [token, tokens[i + 1]]
+        for i, token in enumerate(tokens[:-1])
+        if token in _DIRECTION_WORDS
+    ]
+    return sorted(entities), directions
+
+
+def _vector(normalized: str) -> Tuple[Dict[str, float], float]:
+    # Character trigrams capture spelling variants, whole words keep the intent
+    padded = f" {normalized} "
+    counts = Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+    counts.update({f"w:{word}": 4 for word in normalized.split()})
+    norm = math.sqrt(sum(value * value for value in counts.values()))
+    return dict(counts), norm
+
+
+def _cosine(a: Tuple[Dict[str, float], float], b: Tuple[Dict[str, float], float]) -> float:
+    (vec_a, norm_a), (vec_b, norm_b) = a, b
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(vec_a) > len(vec_b):
+        vec_a, vec_b = vec_b, vec_a
+    dot = sum(value * vec_b.get(key, 0.0) for key, value in vec_a.items())
+    return dot / (norm_a * norm_b)
+
+
+def _directions_conflict(a: List[List[str]], b: List[List[str]]) -> bool:
+    roles_a = {entity: direction for direction, entity in a}
+    roles_b = {entity: direction for direction, entity in b}
+    return any(
+        entity in roles_b and roles_b[entity] != direction
+        for entity, direction in roles_a.items()
+    )
+
+
+def _words_align(a: str, b: str) -> bool:
+    # Every word of each query must appear, possibly misspelled, in the other one;
+    # otherwise a modifier such as "delayed" or "lowest" would be silently dropped
+    words_a, words_b = set(a.split()), set(b.split())
+    for source, target in ((words_a - words_b, words_b), (words_b - words_a, words_a)):
+        for word in source:
+            if not any(SequenceMatcher(None, word, other).ratio() >= 0.8 for other in target):
+                return False
+    return True
+
+
+class InMemoryCacheBackend:
+    """Process-local LRU store with per-entry expiry."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def recent(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        now = time.monotonic()
+        with self._lock:
+            items = []
+            for key in reversed(self._entries):
+                expires_at, value = self._entries[key]
+                if expires_at >= now:
+                    items.append((key, value))
+                if len(items) >= limit:
+                    break
+            return items
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        # Expired entries linger until they are looked up or evicted
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for expires_at, _ in self._entries.values() if expires_at >= now)
+
+
+class RedisCacheBackend:
+    """Redis store shared by all workers; a sorted set of access times drives LRU."""
+
+    blocking = True  # Every call is a network round trip
+
+    def __init__(self, url: str, max_entries: int, ttl_seconds: int, namespace: str = "sqlcache"):
+        import redis
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._redis = redis.Redis.from_url(url)
+        self._namespace = namespace
+        self._lru_key = f"{namespace}:lru"
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self._namespace}:entry:{key}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.get(self._entry_key(key))
+        if raw is None:
+            return None
+        self._redis.zadd(self._lru_key, {key: time.time()})
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        pipe = self._redis.pipeline()
+        pipe.set(self._entry_key(key), json.dumps(value), ex=self.ttl_seconds)
+        pipe.zadd(self._lru_key, {key: time.time()})
+        pipe.zcard(self._lru_key)
+        size = pipe.execute()[-1]
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted = [member for member, _ in self._redis.zpopmin(self._lru_key, overflow)]
+            if evicted:
+                self._redis.delete(*[self._entry_key(k.decode()) for k in evicted])
+                self.evictions += len(evicted)
+
+    def recent(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        keys = [k.decode() for k in self._redis.zrevrange(self._lru_key, 0, limit - 1)]
+        if not keys:
+            return []
+        values = self._redis.mget([self._entry_key(k) for k in keys])
+        expired = [k for k, raw in zip(keys, values) if raw is None]
+        if expired:
+            self._redis.zrem(self._lru_key, *expired)
+        return [(k, json.loads(raw)) for k, raw in zip(keys, values) if raw is not None]
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(self._entry_key(key))
+        self._redis.zrem(self._lru_key, key)
+
+    def clear(self) -> None:
+        keys = [k.decode() for k in self._redis.zrange(self._lru_key, 0, -1)]
+        if keys:
+            self._redis.delete(*[self._entry_key(k) for k in keys])
+        self._redis.delete(self._lru_key)
+
+    def __len__(self) -> int:
+        return self._redis.zcard(self._lru_key)
+
+
+class SQLQueryCache:
+    """Two-tier cache of generated SQL keyed on the normalized question and schema.
+
+    Lookups first try an exact match on the normalized query and then fall back
+    to the most similar recent query, provided the similarity clears the
+    threshold and both queries refer to the same literal values. Calls to a
+    blocking backend and the similarity scan run in the thread pool, so the
+    event loop only does in-process dictionary lookups.
+    """
+
+    def __init__(self, backend, similarity_threshold: float, similarity_candidates: int, enabled: bool = True):
+        self.backend = backend
+        self.similarity_threshold = similarity_threshold
+        self.similarity_candidates = similarity_candidates
+        self.enabled = enabled
+        self._vectors: "OrderedDict[str, Tuple[Dict[str, float], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    @staticmethod
+    def make_key(normalized: str, schema_hash: str) -> str:
+        return hashlib.sha256(f"{schema_hash}|{normalized}".encode("utf-8")).hexdigest()[:32]
+
+    def _cached_vector(self, key: str, normalized: str) -> Tuple[Dict[str, float], float]:
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                return vector
+        vector = _vector(normalized)
+        with self._lock:
+            self._vectors[key] = vector
+            while len(self._vectors) > self.similarity_candidates * 2:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get(self, query: str, schema_info: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            if self.backend.blocking:
+                return await run_in_threadpool(self._lookup, query, schema_info)
+            sql_query = self._exact(query, schema_info)
+            if sql_query is not None:
+                return sql_query
+            if self.similarity_threshold < 1.0:
+                return await run_in_threadpool(self._similar, query, schema_info)
+            self._count("misses")
+            return None
+        except Exception as e:
+            # The cache must never take the search path down with it
+            logger.warning(f"SQL cache lookup failed: {e}")
+            self._count("errors")
+            return None
+
+    async def contains(self, query: str, schema_info: str) -> bool:
+        # Exact-match probe that leaves the hit/miss counters alone
+        if not self.enabled:
+            return False
+        key = self.make_key(normalize_query(query), schema_fingerprint(schema_info))
+        try:
+            return await self._call(self.backend.get, key) is not None
+        except Exception:
+            return False
+
+    def _lookup(self, query: str, schema_info: str) -> Optional[str]:
+        sql_query = self._exact(query, schema_info)
+        return sql_query if sql_query is not None else self._similar(query, schema_info)
+
+    def _exact(self, query: str, schema_info: str) -> Optional[str]:
+        entry = self.backend.get(self.make_key(normalize_query(query), schema_fingerprint(schema_info)))
+        if entry is None:
+            return None
+        self._count("exact_hits")
+        return entry["sql"]
+
+    def _similar(self, query: str, schema_info: str) -> Optional[str]:
+        normalized = normalize_query(query)
+        schema_hash = schema_fingerprint(schema_info)
+        key = self.make_key(normalized, schema_hash)
+        if self.similarity_threshold < 1.0:
+            entities, directions = _entities(query)
+            probe = self._cached_vector(key, normalized)
+            best_key, best_entry, best_score = None, None, 0.0
+            for candidate_key, candidate in self.backend.recent(self.similarity_candidates):
+                if candidate["schema"] != schema_hash or candidate["entities"] != entities:
+                    continue
+                if _directions_conflict(directions, candidate["directions"]):
+                    continue
+                if not _words_align(normalized, candidate["query"]):
+                    continue
+                score = _cosine(probe, self._cached_vector(candidate_key, candidate["query"]))
+                if score > best_score:
+                    best_key, best_entry, best_score = candidate_key, candidate, score
+            if best_entry is not None and best_score >= self.similarity_threshold:
+                # Touch the matched entry so it stays warm in the LRU order
+                self.backend.get(best_key)
+                self._count("similar_hits")
+                logger.debug(f"SQL cache similarity hit ({best_score:.3f}): {normalized!r} ~ {best_entry['query']!r}")
+                return best_entry["sql"]
+
+        self._count("misses")
+        return None
+
+    async def set(self, query: str, schema_info: str, sql_query: str) -> None:
+        if not self.enabled:
+            return
+        normalized = normalize_query(query)
+        schema_hash = schema_fingerprint(schema_info)
+        entities, directions = _entities(query)
+        try:
+            await self._call(self.backend.set, self.make_key(normalized, schema_hash), {
+                "query": normalized,
+                "schema": schema_hash,
+                "entities": entities,
+                "directions": directions,
+                "sql": sql_query,
+            })
+            self._count("stores")
+        except Exception as e:
+            logger.warning(f"SQL cache store failed: {e}")
+            self._count("errors")
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters.get("exact_hits", 0) + counters.get("similar_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "exact_hits": counters.get("exact_hits", 0),
+            "similar_hits": counters.get("similar_hits", 0),
+            "misses": counters.get("misses", 0),
+            "stores": counters.get("stores", 0),
+            "errors": counters.get("errors", 0),
+            "evictions": self.backend.evictions,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_sql_cache() -> SQLQueryCache:
+    if settings.SQL_CACHE_REDIS_URL:
+        backend = RedisCacheBackend(
+            settings.SQL_CACHE_REDIS_URL,
+            max_entries=settings.SQL_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SQL_CACHE_TTL_SECONDS,
+        )
+    else:
+        backend = InMemoryCacheBackend(
+            max_entries=settings.SQL_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SQL_CACHE_TTL_SECONDS,
+        )
+    return SQLQueryCache(
+        backend,
+        similarity_threshold=settings.SQL_CACHE_SIMILARITY_THRESHOLD,
+        similarity_candidates=settings.SQL_CACHE_SIMILARITY_CANDIDATES,
+        enabled=settings.SQL_CACHE_ENABLED,
+    )
+
+
+sql_cache = build_sql_cache()
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+import json
+import logging
+import threading
+import time
+
+import sqlglot
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlglot import exp
+
+from app.core.config import settings
+from app.services.sql_normalizer import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+class QueryRejected(ValueError):
+    pass
+
+@dataclass
+class PlanEstimate:
+    total_cost: float
+    plan_rows: int
+    max_node_rows: int
+
+def enforce_limit(sql_query: str, max_rows: int) -> str:
+    """Add LIMIT `max_rows` to a read statement without one, or lower a larger one.
+
+    Statements that do not parse, or whose limit is not a plain number, are
+    returned unchanged; the plan check still applies to them.
+    """
+    try:
+        statements = sqlglot.parse(sql_query.strip().rstrip(";"), read="postgres")
+    except sqlglot.errors.ParseError:
+        return sql_query
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return sql_query
+
+    tree = statements[0]
+    limit = tree.args.get("limit")
+    if limit is None:
+        return tree.limit(max_rows).sql(dialect="postgres")
+    value = limit.expression
+    if isinstance(value, exp.Literal) and value.is_int and int(value.this) > max_rows:
+        limit.set("expression", exp.Literal.number(max_rows))
+        return tree.sql(dialect="postgres")
+    return sql_query
+
+def _nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+async def explain(db: AsyncSession, sql_query: str) -> PlanEstimate:
+    # Runs the literal SQL through the driver directly: nothing to bind, and
+    # colons inside string literals are left alone
+    connection = await db.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql_query.strip().rstrip(';')}")
+    document = result.scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    plan = document[0]["Plan"]
+    return PlanEstimate(
+        total_cost=float(plan["Total Cost"]),
+        plan_rows=int(plan["Plan Rows"]),
+        max_node_rows=max(int(node.get("Plan Rows", 0)) for node in _nodes(plan)),
+    )
+
+class QueryGuard:
+    """Checks the planner's estimate for generated SQL before it runs.
+
+    Verdicts are remembered per exact SQL string for a while, so a repeated
+    query costs no extra round trip. They are not shared across a query
+    shape: estimates depend on the constants, and a selective variant says
+    nothing about a full scan of the same shape.
+    """
+
+    def __init__(self, max_cost: float, max_plan_rows: int, cache_size: int, ttl_seconds: float):
+        self.max_cost = max_cost
+        self.max_plan_rows = max_plan_rows
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self._verdicts: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.cached = 0
+        self.rejected = 0
+
+    def _cached_verdict(self, sql_query: str) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            entry = self._verdicts.get(sql_query)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                return False, None
+            self._verdicts.move_to_end(sql_query)
+            return True, entry[1]
+
+    def _remember(self, sql_query: str, reason: Optional[str]) -> None:
+        with self._lock:
+            self._verdicts[sql_query] = (time.monotonic(), reason)
+            self._verdicts.move_to_end(sql_query)
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+
+    def _judge(self, estimate: PlanEstimate) -> Optional[str]:
+        if estimate.total_cost > self.max_cost:
+            return f"Query is too expensive to run (estimated cost {estimate.total_cost:,.0f}, limit {self.max_cost:,.0f}). Try a narrower question."
+        if estimate.max_node_rows > self.max_plan_rows:
+            return f"Query would process too many rows (estimated {estimate.max_node_rows:,}, limit {self.max_plan_rows:,}). Try a narrower question."
+        return None
+
+    async def check(self, db: AsyncSession, sql_query: str) -> None:
+        """Raise QueryRejected if the plan for `sql_query` is over budget."""
+        if not settings.QUERY_GUARD_ENABLED:
+            return
+        # Keyed by the SQL as it will run, constants and LIMIT included
+        found, reason = self._cached_verdict(sql_query)
+        if found:
+            self.cached += 1
+        else:
+            estimate = await explain(db, sql_query)
+            reason = self._judge(estimate)
+            self._remember(sql_query, reason)
+            self.checked += 1
+            logger.info(f"Plan estimate for shape {normalize_sql(sql_query).fingerprint}: cost {estimate.total_cost}, rows {estimate.plan_rows}, widest node {estimate.max_node_rows}")
+        if reason is not None:
+            self.rejected += 1
+            raise QueryRejected(reason)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.QUERY_GUARD_ENABLED,
+            "explained": self.checked,
+            "cached_verdicts": self.cached,
+            "rejected": self.rejected,
+        }
+
+query_guard = QueryGuard(
+    max_cost=settings.QUERY_MAX_COST,
+    max_plan_rows=settings.QUERY_MAX_PLAN_ROWS,
+    cache_size=settings.QUERY_GUARD_CACHE_SIZE,
+    ttl_seconds=settings.QUERY_GUARD_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,75 @@
+from typing import Any, Dict, Optional
+import asyncio
+import gzip
+
+import orjson
+from fastapi import Response
+
+from app.core.config import settings
+from app.services.result_materializer import converter_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def _default(value: Any) -> Any:
+    # orjson writes datetimes, dates, times and UUIDs itself; the rest goes
+    # through the converters used for materialized rows
+    convert = converter_for(value)
+    if convert is None:
+        raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+    return convert(value)
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default)
+
+def search_payload(response: Dict[str, Any], result_format: str) -> Dict[str, Any]:
+    """The body for a search response held as `columns` plus `rows` of values.
+
+    The columnar form is sent as is. The default form repeats the column
+    names in every row, as `results`.
+    """
+    if result_format == "columns":
+        return response
+    columns = response["columns"]
+    payload = {name: value for name, value in response.items() if name not in ("columns", "rows")}
+    payload["results"] = [dict(zip(columns, row)) for row in response["rows"]]
+    return payload
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip()] = quality
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+
+async def render_json(payload: Any, accept_encoding: str = "") -> Response:
+    """Serialize `payload` with orjson, compressed as the client accepts.
+
+    Small bodies are sent uncompressed; larger ones are compressed off the
+    event loop.
+    """
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= settings.RESPONSE_COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        body = await asyncio.to_thread(_compress, body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
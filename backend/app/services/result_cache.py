@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+import sqlglot
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlglot import exp
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.response_renderer import dumps
+from app.services.result_materializer import ResultPage
+
+logger = logging.getLogger(__name__)
+
+# Columns that change without a write going through this API (flight
+# operations feeds); results reading them expire after the volatile TTL
+VOLATILE_COLUMNS = {"flights": {"status", "gate"}}
+
+@lru_cache(maxsize=settings.SQL_NORMALIZE_CACHE_SIZE)
+def referenced_tables(sql: str) -> Optional[Tuple[FrozenSet[str], bool]]:
+    """Tables a read statement depends on, and whether it reads a volatile column.
+
+    Returns None for SQL that does not parse as a single query; such results
+    are not cached since nothing could invalidate them.
+    """
+    try:
+        statements = sqlglot.parse(sql.strip().rstrip(";"), read="postgres")
+    except sqlglot.errors.ParseError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return None
+    tree = statements[0]
+    ctes = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    tables = frozenset(table.name.lower() for table in tree.find_all(exp.Table) if table.name.lower() not in ctes)
+    volatile_columns = set().union(*(VOLATILE_COLUMNS.get(table, set()) for table in tables))
+    volatile = bool(volatile_columns) and (
+        tree.find(exp.Star) is not None
+        or any(column.name.lower() in volatile_columns for column in tree.find_all(exp.Column))
+    )
+    return tables, volatile
+
+def written_tables(sql: str) -> Optional[FrozenSet[str]]:
+    """Tables an admin statement may have changed, or None if it cannot be told."""
+    try:
+        statements = sqlglot.parse(sql.strip().rstrip(";"), read="postgres")
+    except sqlglot.errors.ParseError:
+        return None
+    tables = set()
+    for statement in statements:
+        if statement is None:
+            continue
+        tables.update(table.name.lower() for table in statement.find_all(exp.Table))
+    return frozenset(tables)
+
+@dataclass
+class CachedPage:
+    page: ResultPage
+    tables: FrozenSet[str]
+    expires_at: float
+    size: int
+
+class ResultCache:
+    """Pages of search results, keyed on canonical SQL, parameters and page window.
+
+    Entries are dropped when a table they read is written through this
+    worker, expire after ttl_seconds (volatile_ttl_seconds when they read
+    volatile columns), and are evicted least recently used past max_bytes.
+    The cache is per worker: writes by anyone else show up in the
+    data_versions table, checked at most every version_check_seconds, which
+    bounds how stale a page can be. Without that table only the TTL does.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_bytes: int,
+        ttl_seconds: float,
+        volatile_ttl_seconds: float,
+        version_check_seconds: float
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl_seconds = ttl_seconds
+        self.volatile_ttl_seconds = volatile_ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._entries: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        # Bumped by every invalidation; a page read before one is not stored
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._versions: Optional[Dict[str, int]] = None
+        self._checked_at: Optional[float] = None
+        self._check_lock = asyncio.Lock()
+
+    @property
+    def needs_check(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at > self.version_check_seconds
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Drop the entries of tables whose data_versions changed since the last check."""
+        if not settings.RESULT_CACHE_ENABLED or not self.needs_check:
+            return
+        async with self._check_lock:
+            if not self.needs_check:
+                return
+            self._checked_at = time.monotonic()
+            # Looked up first: selecting from a missing table would abort the transaction
+            if (await db.execute(text("SELECT to_regclass('data_versions')"))).scalar() is None:
+                return
+            versions = dict((await db.execute(text("SELECT table_name, version FROM data_versions"))).all())
+            previous, self._versions = self._versions, versions
+        if previous is None:
+            # Nothing was cached before the first check that it could be stale against
+            return
+        changed = [table for table, version in versions.items() if previous.get(table) != version]
+        if changed:
+            self.invalidate(changed)
+
+    @staticmethod
+    def key(sql: str, params: Dict[str, Any], page_size: int, offset: int) -> str:
+        bound = repr(sorted(params.items()))
+        return hashlib.sha1(f"{sql}\0{bound}\0{page_size}\0{offset}".encode()).hexdigest()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, key: str) -> Optional[ResultPage]:
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                outcome = "miss"
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                outcome = "hit"
+        metrics.increment("result_cache_requests_total", outcome=outcome)
+        return None if entry is None else entry.page
+
+    def put(self, key: str, sql: str, page: ResultPage, epoch: int) -> None:
+        if not settings.RESULT_CACHE_ENABLED:
+            return
+        references = referenced_tables(sql)
+        if references is None:
+            return
+        tables, volatile = references
+        size = len(dumps(page.values))
+        if size > self.max_entry_bytes:
+            return
+        ttl = self.volatile_ttl_seconds if volatile else self.ttl_seconds
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CachedPage(page, tables, time.monotonic() + ttl, size)
+            self._bytes += size
+            self.stores += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> None:
+        """Drop entries reading any of `tables`, or everything when None."""
+        with self._lock:
+            self.epoch += 1
+            if tables is None:
+                stale = list(self._entries)
+            else:
+                written = {table.lower() for table in tables}
+                stale = [key for key, entry in self._entries.items() if entry.tables & written]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+        if stale:
+            logger.info(f"Result cache dropped {len(stale)} entries after a write to {', '.join(sorted(tables)) if tables is not None else 'the database'}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.RESULT_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.RESULT_CACHE_MAX_ENTRY_BYTES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    volatile_ttl_seconds=settings.RESULT_CACHE_VOLATILE_TTL_SECONDS,
+    version_check_seconds=settings.RESULT_CACHE_VERSION_CHECK_SECONDS,
+)
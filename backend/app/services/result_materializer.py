@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+import base64
+import hashlib
+import hmac
+import json
+import re
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.sqltypes import NullType
+
+from app.core.config import settings
+from app.core.tracing import record_stage
+
+Converter = Optional[Callable[[Any], Any]]
+
+def _isoformat(value: Any) -> str:
+    return value.isoformat()
+
+# Converters to JSON-friendly values, looked up by the Python type of a column
+_CONVERTERS: Dict[type, Converter] = {
+    Decimal: float,
+    datetime: _isoformat,
+    date: _isoformat,
+    time: _isoformat,
+    timedelta: timedelta.total_seconds,
+    UUID: str,
+    bytes: bytes.hex,
+    memoryview: lambda value: value.hex(),
+}
+
+def converter_for(value: Any) -> Converter:
+    for value_type in type(value).__mro__:
+        if value_type in _CONVERTERS:
+            return _CONVERTERS[value_type]
+    return None
+
+class RowMaterializer:
+    """Turns result tuples into JSON-ready dicts.
+
+    The converter of each column is picked from its first non-null value and
+    reused for every following row, instead of type-checking every cell.
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self._converters: List[Converter] = [None] * len(self.columns)
+        self._pending = set(range(len(self.columns)))
+
+    def _resolve(self, row: Sequence[Any]) -> None:
+        for index in list(self._pending):
+            value = row[index]
+            if value is not None:
+                self._converters[index] = converter_for(value)
+                self._pending.discard(index)
+
+    def convert_row(self, row: Sequence[Any]) -> List[Any]:
+        if self._pending:
+            self._resolve(row)
+        return [
+            value if convert is None or value is None else convert(value)
+            for convert, value in zip(self._converters, row)
+        ]
+
+    def to_dicts(self, rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+        columns = self.columns
+        return [dict(zip(columns, self.convert_row(row))) for row in rows]
+
+def _sign(payload: bytes) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+def encode_page_token(sql_query: str, offset: int) -> str:
+    payload = json.dumps({"sql": sql_query, "offset": offset}, separators=(",", ":")).encode()
+    return f"{base64.urlsafe_b64encode(payload).decode().rstrip('=')}.{_sign(payload)}"
+
+def decode_page_token(token: str) -> Tuple[str, int]:
+    # Tokens are signed so a client can only page through SQL we generated
+    try:
+        encoded, signature = token.split(".", 1)
+        payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed page token")
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise ValueError("Invalid page token")
+    data = json.loads(payload)
+    return data["sql"], int(data["offset"])
+
+_SELECT_PATTERN = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+def paginate_sql(sql_query: str) -> Optional[str]:
+    # Wrap single read statements so PostgreSQL only produces the requested page
+    statement = sql_query.strip().rstrip(";").strip()
+    if not _SELECT_PATTERN.match(statement) or ";" in statement:
+        return None
+    return f"SELECT * FROM ({statement}) AS _page LIMIT :_page_limit OFFSET :_page_offset"
+
+@dataclass
+class ResultPage:
+    columns: List[str]
+    values: List[Tuple[Any, ...]] = field(default_factory=list)  # Rows as the driver returned them
+    next_page_token: Optional[str] = None
+    _rows: Optional[List[Dict[str, Any]]] = field(default=None, repr=False)
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        """The page as JSON-ready dicts, converted on first use.
+
+        Responses are serialized from `values` directly; only explanations
+        need the converted rows.
+        """
+        if self._rows is None:
+            started = perf_counter()
+            self._rows = RowMaterializer(self.columns).to_dicts(self.values)
+            record_stage("row_conversion", perf_counter() - started)
+        return self._rows
+
+def bind_statement(sql_query: str, params: Dict[str, Any]) -> TextClause:
+    # Parameters are left untyped so PostgreSQL infers each type from where the
+    # parameter appears, as it would for a literal. List values are bound as
+    # expanding parameters, for `column IN :values`.
+    statement = text(sql_query)
+    if not params:
+        return statement
+    return statement.bindparams(*(
+        bindparam(name, value, type_=NullType(), expanding=isinstance(value, (list, tuple)))
+        for name, value in params.items()
+    ))
+
+async def fetch_page(
+    db: AsyncSession,
+    sql_query: str,
+    page_size: int,
+    offset: int = 0,
+    params: Optional[Dict[str, Any]] = None,
+    token_sql: Optional[str] = None
+) -> ResultPage:
+    """Run `sql_query` and return at most `page_size` rows starting at `offset`.
+
+    Rows are read through a server-side cursor in batches, so memory stays
+    bounded by the page size whatever the size of the full result set.
+    Parameterized statements pass `token_sql`, a self-contained version of
+    the query to carry in the next page token.
+    """
+    params = dict(params or {})
+    paged_sql = paginate_sql(sql_query)
+    if paged_sql is not None:
+        statement = bind_statement(paged_sql, {**params, "_page_limit": page_size + 1, "_page_offset": offset})
+    else:
+        statement = bind_statement(sql_query, params)
+
+    started = perf_counter()
+    result = await db.stream(
+        statement,
+        execution_options={"yield_per": min(page_size + 1, settings.SEARCH_STREAM_BATCH_SIZE)}
+    )
+    page = ResultPage(columns=list(result.keys()))
+    has_more = False
+    skipped = 0
+    try:
+        async for partition in result.partitions():
+            if paged_sql is None and skipped < offset:
+                # Statements that cannot be wrapped are paged by skipping rows
+                drop = min(offset - skipped, len(partition))
+                skipped += drop
+                partition = partition[drop:]
+            remaining = page_size - len(page.values)
+            page.values.extend(map(tuple, partition[:remaining]))
+            if len(partition) > remaining:
+                has_more = True
+                break
+    finally:
+        await result.close()
+    record_stage("db_execute", perf_counter() - started)
+
+    if has_more:
+        page.next_page_token = encode_page_token(token_sql or sql_query, offset + page_size)
+    return page
@@ -0,0 +1,102 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import re
+import sys
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas is imported by the first result large enough to be summarized, so
+# the search path does not load it at startup
+
+# Materialized rows carry timestamps as ISO strings
+_ISO_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?([+-]\d{2}:?\d{2}|Z)?)?$")
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > settings.EXPLAIN_MAX_VALUE_CHARS:
+        return value[:settings.EXPLAIN_MAX_VALUE_CHARS] + "…"
+    np = sys.modules.get("numpy")
+    # Without numpy loaded there cannot be NumPy values to convert
+    if np is not None and isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+def _number(value: float) -> Any:
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 4)
+
+def _numeric_stats(values: "pd.Series") -> Dict[str, Any]:
+    return {
+        "type": "number",
+        "min": _number(values.min()),
+        "max": _number(values.max()),
+        "avg": _number(values.mean()),
+        "median": _number(values.median()),
+    }
+
+def _timestamp_stats(values: "pd.Series") -> Optional[Dict[str, Any]]:
+    import pandas as pd
+
+    sample = values.iloc[0]
+    if not isinstance(sample, str) or not _ISO_TIMESTAMP.match(sample):
+        return None
+    parsed = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+    if parsed.isna().any():
+        return None
+    return {"type": "timestamp", "earliest": values.iloc[parsed.argmin()], "latest": values.iloc[parsed.argmax()]}
+
+def _categorical_stats(values: "pd.Series") -> Dict[str, Any]:
+    import pandas as pd
+
+    if values.map(lambda value: isinstance(value, (list, dict))).any():
+        values = values.astype(str)
+    counts = values.value_counts()
+    return {
+        "type": "bool" if pd.api.types.is_bool_dtype(values) else "text",
+        "distinct": int(counts.size),
+        "top": [[_clip(value), int(count)] for value, count in counts.head(settings.EXPLAIN_TOP_K).items()],
+    }
+
+def _column_summary(column: "pd.Series") -> Dict[str, Any]:
+    import pandas as pd
+
+    values = column.dropna()
+    summary: Dict[str, Any] = {"nulls": int(column.size - values.size)}
+    if values.empty:
+        return {"type": "empty", **summary}
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return {**_numeric_stats(values), **summary}
+    return {**(_timestamp_stats(values) or _categorical_stats(values)), **summary}
+
+def _sample_rows(df: "pd.DataFrame", size: int) -> List[Dict[str, Any]]:
+    import numpy as np
+
+    # First, last and evenly spaced rows in between, so ordered results show their range
+    positions = np.unique(np.linspace(0, len(df) - 1, num=min(size, len(df))).astype(int))
+    return [
+        {name: _clip(value) for name, value in row.items() if value is not None and value == value}
+        for row in df.iloc[positions].to_dict("records")
+    ]
+
+def summarize_results(results: List[Dict[str, Any]], row_count: Optional[int] = None) -> Dict[str, Any]:
+    """A compact description of a result set for the explanation prompt.
+
+    Small results are passed through whole. Larger ones are reduced to per
+    column statistics (min/max/avg/median for numbers, time ranges, top values
+    and distinct counts otherwise) plus a few representative rows, so the
+    prompt stays about the same size whatever the number of rows.
+    """
+    row_count = len(results) if row_count is None else row_count
+    if len(results) <= settings.EXPLAIN_FULL_RESULT_ROWS:
+        return {"row_count": row_count, "rows": [{name: _clip(value) for name, value in row.items()} for row in results]}
+
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(results)
+    return {
+        "row_count": row_count,
+        "rows_summarized": len(df),
+        "columns": {name: _column_summary(df[name]) for name in df.columns},
+        "sample": _sample_rows(df, settings.EXPLAIN_SAMPLE_ROWS),
+    }
@@ -0,0 +1,265 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import re
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.migrate import current_version
+
+logger = logging.getLogger(__name__)
+
+# Never shown to the LLM: credentials, other users' questions, bookkeeping
+HIDDEN_TABLES = {"users", "search_history", "schema_migrations", "data_versions"}
+HIDDEN_COLUMNS = {"hashed_password", "created_at", "updated_at", "refreshed_at"}
+
+# Kept by refresh_flight_stats(); readable by searches, never written by admin commands
+DERIVED_TABLES = {"route_daily_stats", "route_stats", "airline_stats"}
+
+TABLE_NOTES = {
+    "route_daily_stats": "per route and departure day; avg price = sum(price_sum)/sum(priced_flights)",
+    "route_stats": "per route over all flights; delay_rate 0-1",
+    "airline_stats": "per airline name over all flights; delay_rate 0-1",
+}
+
+# Links the LLM should know about that are not foreign keys
+EXTRA_REFERENCES = {
+    "route_daily_stats": {"departure_airport_id": "airports", "arrival_airport_id": "airports"},
+    "route_stats": {"departure_airport_id": "airports", "arrival_airport_id": "airports"},
+}
+
+# Words in a question that point at a table, besides its own name and columns
+TABLE_KEYWORDS = {
+    "airports": {"airport", "city", "cities", "country", "countries", "near", "nearest", "hub", "located"},
+    "flights": {
+        "flight", "depart", "departure", "departing", "arrive", "arrival", "arriving", "delay", "delayed",
+        "cancel", "cancelled", "gate", "price", "fare", "ticket", "cheap", "cheapest", "schedule", "route",
+        "leaving", "landing",
+    },
+    "airlines": {"airline", "carrier"},
+    "aircraft_types": {"aircraft", "plane", "planes", "manufacturer", "capacity", "boeing", "airbus"},
+}
+
+# Questions asking for these get the statistics tables next to flights:
+# airline_stats when they mention airlines, the route tables otherwise too
+AIRLINE_WORDS = {"airline", "carrier"}
+AGGREGATE_WORDS = {
+    "average", "avg", "mean", "median", "percentile", "rate", "percent", "percentage", "busiest", "most",
+    "least", "total", "count", "many", "number", "statistics", "stats", "typical", "usually", "often", "per",
+}
+
+# Column names too common to say anything about the question
+_GENERIC_COLUMN_WORDS = {"id", "name", "code", "time", "at", "type", "count", "min", "max", "sum", "first", "last"}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _words(value: str) -> List[str]:
+    return _WORD.findall(value.lower())
+
+def _type_name(column_type: sqltypes.TypeEngine) -> str:
+    if getattr(column_type, "enums", None):
+        return "|".join(column_type.enums)
+    if isinstance(column_type, sqltypes.Integer):
+        return "int"
+    if isinstance(column_type, sqltypes.Boolean):
+        return "bool"
+    if isinstance(column_type, (sqltypes.Numeric, sqltypes.Float)):
+        return "num"
+    if isinstance(column_type, sqltypes.DateTime):
+        return "timestamptz" if column_type.timezone else "timestamp"
+    if isinstance(column_type, sqltypes.Date):
+        return "date"
+    if isinstance(column_type, (sqltypes.String, sqltypes.Text)):
+        return "text"
+    return str(column_type).lower()
+
+@dataclass(frozen=True)
+class TableInfo:
+    name: str
+    line: str
+    references: FrozenSet[str]
+    keywords: FrozenSet[str]
+
+def describe_table(name: str, columns: Iterable[Tuple[str, sqltypes.TypeEngine]], primary_key: Iterable[str], foreign_keys: Dict[str, str]) -> TableInfo:
+    """One line per table: `flights: id int pk, airline_id int>airlines, ...`"""
+    primary_key = list(primary_key)
+    foreign_keys = {**foreign_keys, **EXTRA_REFERENCES.get(name, {})}
+    parts = []
+    keywords = set(TABLE_KEYWORDS.get(name, ())) | {name, name.rstrip("s")} | set(name.split("_"))
+    for column, column_type in columns:
+        if column in HIDDEN_COLUMNS:
+            continue
+        part = f"{column} {_type_name(column_type)}"
+        if column in primary_key and len(primary_key) == 1:
+            part += " pk"
+        if column in foreign_keys:
+            part += f">{foreign_keys[column]}"
+        parts.append(part)
+        # Key columns name other tables (departure_airport_id), not this one
+        if column not in primary_key and column not in foreign_keys:
+            keywords.update(word for word in _words(column) if word not in _GENERIC_COLUMN_WORDS)
+    line = f"{name}: {', '.join(parts)}"
+    if len(primary_key) > 1:
+        line += f"; pk({', '.join(primary_key)})"
+    if name in TABLE_NOTES:
+        line += f"; {TABLE_NOTES[name]}"
+    return TableInfo(name, line, frozenset(foreign_keys.values()), frozenset(keywords))
+
+def _introspect(connection: Connection) -> Dict[str, TableInfo]:
+    inspector = inspect(connection)
+    # Monthly partitions of flights show up as tables of their own
+    partitions = set(connection.execute(text(
+        "SELECT relname FROM pg_class WHERE relispartition AND relnamespace = current_schema()::regnamespace"
+    )).scalars())
+    tables = {}
+    for name in inspector.get_table_names():
+        if name in HIDDEN_TABLES or name in partitions:
+            continue
+        foreign_keys = {
+            column: foreign_key["referred_table"]
+            for foreign_key in inspector.get_foreign_keys(name)
+            for column in foreign_key["constrained_columns"]
+        }
+        tables[name] = describe_table(
+            name,
+            [(column["name"], column["type"]) for column in inspector.get_columns(name)],
+            inspector.get_pk_constraint(name)["constrained_columns"],
+            foreign_keys,
+        )
+    return tables
+
+def _from_models() -> Dict[str, TableInfo]:
+    from app.models import airport, flight, flight_stats, search_history, user  # noqa: F401 (registers the tables)
+    from app.models.base import Base
+
+    tables = {}
+    for name, table in Base.metadata.tables.items():
+        if name in HIDDEN_TABLES:
+            continue
+        tables[name] = describe_table(
+            name,
+            [(column.name, column.type) for column in table.columns],
+            [column.name for column in table.primary_key.columns],
+            {foreign_key.parent.name: foreign_key.column.table.name for foreign_key in table.foreign_keys},
+        )
+    return tables
+
+class SchemaContext:
+    """Compact schema descriptions for LLM prompts, built from the database.
+
+    The tables are read once through the inspector (from the ORM models if
+    the database cannot be reached) and rendered one line each. Searches get
+    only the tables their question mentions plus the tables those reference,
+    which keeps prompts short and stable for a given kind of question. The
+    description is rebuilt when the applied migration version changes, which
+    is checked at most every check_interval_seconds.
+    """
+
+    def __init__(self, check_interval_seconds: float):
+        self.check_interval_seconds = check_interval_seconds
+        self.version: Optional[str] = None
+        self.source = "none"
+        self._tables: Dict[str, TableInfo] = {}
+        self._rendered: Dict[FrozenSet[str], str] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+
+    def load(self, connection: Optional[Connection] = None) -> None:
+        """Rebuild from `connection`, or from the ORM models when None."""
+        if connection is None:
+            tables, version, source = _from_models(), None, "models"
+        else:
+            tables, version, source = _introspect(connection), current_version(connection), "database"
+        # Swapped together so readers never mix two schema versions
+        self._tables, self._rendered, self.version, self.source = tables, {}, version, source
+        self._checked_at = time.monotonic()
+        self.builds += 1
+        logger.info(f"Schema context built from the {source} with {len(tables)} tables (migration {version})")
+
+    def load_at_startup(self) -> None:
+        from app.db.session import get_engine
+
+        try:
+            with get_engine().connect() as connection:
+                self.load(connection)
+        except Exception as e:
+            logger.warning(f"Schema introspection failed, describing the ORM models instead: {str(e)}")
+            self.load()
+
+    def _refresh(self, connection: Connection) -> None:
+        # The version check is one primary key scan of schema_migrations
+        if self.source != "database" or current_version(connection) != self.version:
+            self.load(connection)
+        else:
+            self._checked_at = time.monotonic()
+
+    @property
+    def needs_check(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at > self.check_interval_seconds
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        if not self.needs_check:
+            return
+        async with self._lock:
+            if self.needs_check:
+                await db.run_sync(lambda session: self._refresh(session.connection()))
+
+    def ensure_fresh_sync(self, db: Session) -> None:
+        if self.needs_check:
+            self._refresh(db.connection())
+
+    def relevant_tables(self, queries: Iterable[str]) -> FrozenSet[str]:
+        words = {word for query in queries for word in _words(query)}
+        words |= {word.rstrip("s") for word in words}
+        selected = {name for name, table in self._tables.items() if name not in DERIVED_TABLES and words & table.keywords}
+        if "flights" in selected and words & AGGREGATE_WORDS:
+            derived = {"airline_stats"} if words & AIRLINE_WORDS else set()
+            if not derived or words & TABLE_KEYWORDS["airports"] or "route" in words:
+                derived |= {"route_daily_stats", "route_stats"}
+            selected |= derived & self._tables.keys()
+        if not selected:
+            return frozenset(name for name in self._tables if name not in DERIVED_TABLES)
+        # Tables the selection points at, so joins can be written
+        for name in list(selected):
+            selected |= self._tables[name].references & self._tables.keys()
+        return frozenset(selected)
+
+    def render(self, tables: Iterable[str]) -> str:
+        key = frozenset(tables)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            # Sorted, so the same selection always gives the same prompt (and SQL cache key)
+            lines = [self._tables[name].line for name in sorted(key) if name in self._tables]
+            rendered = "PostgreSQL tables (column type, >table = references its id):\n" + "\n".join(lines)
+            self._rendered[key] = rendered
+        return rendered
+
+    def for_queries(self, queries: Iterable[str]) -> str:
+        if not settings.SCHEMA_CONTEXT_SELECT_TABLES:
+            return self.render(self._tables)
+        return self.render(self.relevant_tables(queries))
+
+    def for_query(self, query: str) -> str:
+        return self.for_queries([query])
+
+    def for_admin(self) -> str:
+        return self.render(name for name in self._tables if name not in DERIVED_TABLES)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "source": self.source,
+            "migration": self.version,
+            "tables": len(self._tables),
+            "builds": self.builds,
+            "full_chars": len(self.render(self._tables)),
+        }
+
+schema_context = SchemaContext(settings.SCHEMA_CONTEXT_CHECK_SECONDS)
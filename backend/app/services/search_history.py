@@ -0,0 +1,156 @@
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from sqlalchemy import DateTime, column, insert, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import get_async_engine
+
+logger = logging.getLogger(__name__)
+
+# Only the columns both db_init.sql and the ORM schema have; the ORM model's
+# updated_at default would otherwise be inserted too. created_at is sent as a
+# timestamptz, which PostgreSQL converts for the ORM schema's plain timestamp
+_HISTORY = table(
+    "search_history",
+    column("user_id"), column("query"), column("generated_sql"), column("result_count"),
+    column("created_at", DateTime(timezone=True)),
+)
+
+class HistoryWriter:
+    """Writes search history in the background, batched.
+
+    record() only appends to an in-memory buffer, so searches never wait on
+    the database. A background task inserts the buffer in multi-row INSERTs
+    of up to batch_size rows, as soon as a batch is full or every
+    flush_interval_seconds. When the database is slow or down, failed
+    batches go back to the buffer and flushes back off up to
+    max_backoff_seconds; once the buffer holds max_pending records, new
+    records ("newest") or the oldest ones ("oldest") are dropped.
+    Whatever is buffered is flushed on shutdown.
+    """
+
+    def __init__(self, max_pending: int, batch_size: int, flush_interval_seconds: float, max_backoff_seconds: float, drop_policy: str):
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError(f"Unknown history drop policy '{drop_policy}'")
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.drop_policy = drop_policy
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._delay = flush_interval_seconds
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def record(self, query: str, generated_sql: str, result_count: Optional[int], user_id: Optional[int] = None) -> None:
+        if not settings.SEARCH_HISTORY_ENABLED:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            metrics.increment("search_history_dropped_total", policy=self.drop_policy)
+            if self.drop_policy == "newest":
+                return
+            self._pending.popleft()
+        self._pending.append({
+            "user_id": user_id,
+            "query": query,
+            "generated_sql": generated_sql,
+            "result_count": result_count,
+            "created_at": datetime.now(timezone.utc),
+        })
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None and settings.SEARCH_HISTORY_ENABLED:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # One last attempt; records that still cannot be written are lost
+        await self.flush()
+        if self._pending:
+            logger.warning(f"Search history lost {len(self._pending)} records at shutdown")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if await self.flush():
+                self._delay = self.flush_interval_seconds
+            else:
+                self._delay = min(self.max_backoff_seconds, self._delay * 2)
+
+    async def flush(self) -> bool:
+        """Write everything buffered; returns False if a batch failed."""
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            started = time.perf_counter()
+            try:
+                async with get_async_engine().begin() as connection:
+                    await connection.execute(insert(_HISTORY), batch)
+            except Exception as e:
+                self.failed_flushes += 1
+                metrics.increment("search_history_flush_failures_total")
+                logger.warning(f"Search history flush of {len(batch)} records failed, retrying in {min(self.max_backoff_seconds, self._delay * 2):.1f}s: {str(e)}")
+                # Back in front of newer records, within the buffer bound
+                room = self.max_pending - len(self._pending)
+                self.dropped += max(0, len(batch) - room)
+                self._pending.extendleft(reversed(batch[:max(0, room)]))
+                return False
+            self.last_flush_seconds = time.perf_counter() - started
+            self.written += len(batch)
+            metrics.increment("search_history_written_total", len(batch))
+            metrics.observe("search_history_flush_seconds", self.last_flush_seconds)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.SEARCH_HISTORY_ENABLED,
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+        }
+
+async def popular_queries(db: AsyncSession, limit: int = 100, days: int = 7) -> List[Tuple[str, int]]:
+    """Most asked questions of the last `days`, with how often, case and spacing ignored."""
+    result = await db.execute(
+        text(
+            "SELECT min(query) AS query, count(*) AS searches FROM search_history "
+            "WHERE created_at >= CAST(:since AS TIMESTAMPTZ) GROUP BY lower(btrim(query)) "
+            "ORDER BY searches DESC, query LIMIT :limit"
+        ),
+        {"since": datetime.now(timezone.utc) - timedelta(days=days), "limit": limit}
+    )
+    return [(row.query, row.searches) for row in result]
+
+history_writer = HistoryWriter(
+    max_pending=settings.SEARCH_HISTORY_MAX_PENDING,
+    batch_size=settings.SEARCH_HISTORY_BATCH_SIZE,
+    flush_interval_seconds=settings.SEARCH_HISTORY_FLUSH_SECONDS,
+    max_backoff_seconds=settings.SEARCH_HISTORY_MAX_BACKOFF_SECONDS,
+    drop_policy=settings.SEARCH_HISTORY_DROP_POLICY,
+)
@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import logging
+import re
+import time
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.intent_router import intent_router
+from app.services.openai_service import OpenAIService
+from app.services.query_cache import sql_cache
+
+logger = logging.getLogger(__name__)
+
+class ClientDisconnected(Exception):
+    pass
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[Any]) -> Any:
+    """Await `awaitable`, cancelling it if the client goes away first.
+
+    Cancellation closes an in-flight OpenAI request, and asyncpg sends a cancel
+    request for a running statement, so neither keeps working for nobody.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.SEARCH_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                metrics.increment("search_cancelled_total")
+                raise ClientDisconnected()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+@dataclass
+class DeferredExplanation:
+    task: "asyncio.Task[str]"
+    created_at: float = field(default_factory=time.monotonic)
+
+    def as_dict(self, request_id: str) -> Dict[str, Any]:
+        if not self.task.done():
+            return {"request_id": request_id, "status": "pending", "explanation": None, "error": None}
+        if self.task.cancelled():
+            return {"request_id": request_id, "status": "failed", "explanation": None, "error": "Explanation was cancelled"}
+        error = self.task.exception()
+        if error is not None:
+            return {"request_id": request_id, "status": "failed", "explanation": None, "error": str(error)}
+        return {"request_id": request_id, "status": "ready", "explanation": self.task.result(), "error": None}
+
+class ExplanationStore:
+    """Explanations computed after the search response has gone out.
+
+    Entries live in the worker that served the search, for ttl_seconds after
+    they were submitted. Pending entries pushed out of a full store are
+    cancelled.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, DeferredExplanation]" = OrderedDict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            request_id, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - entry.created_at <= self.ttl_seconds:
+                break
+            entry.task.cancel()
+            del self._entries[request_id]
+
+    def submit(self, request_id: str, explanation: Awaitable[str]) -> None:
+        self._entries[request_id] = DeferredExplanation(asyncio.ensure_future(explanation))
+        self._evict()
+
+    async def get(self, request_id: str, wait_seconds: float = 0) -> Optional[Dict[str, Any]]:
+        self._evict()
+        entry = self._entries.get(request_id)
+        if entry is None:
+            return None
+        if wait_seconds > 0 and not entry.task.done():
+            await asyncio.wait({entry.task}, timeout=wait_seconds)
+        return entry.as_dict(request_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+explanations = ExplanationStore(settings.SEARCH_DEFERRED_EXPLANATIONS_MAX, settings.SEARCH_DEFERRED_EXPLANATIONS_TTL_SECONDS)
+
+_ROUTE = re.compile(
+    r"\bfrom\s+(?P<origin>.+?)\s+to\s+(?P<destination>.+?)"
+    r"(?P<rest>\s+(?:on|for|in|at|before|after|between|today|tomorrow|tonight|this|next)\b.*)?$",
+    re.IGNORECASE,
+)
+_DAY_SHIFTS = {"today": "tomorrow", "tonight": "tomorrow", "yesterday": "today"}
+
+def follow_up_queries(query: str) -> List[str]:
+    """Questions a user tends to ask next: the return trip and the next day."""
+    question = " ".join(query.strip().rstrip("?.!").split())
+    candidates = []
+    match = _ROUTE.search(question)
+    if match:
+        candidates.append(
+            f"{question[:match.start()]}from {match.group('destination')} to {match.group('origin')}{match.group('rest') or ''}"
+        )
+    for day, next_day in _DAY_SHIFTS.items():
+        shifted = re.sub(rf"\b{day}\b", next_day, question, flags=re.IGNORECASE)
+        if shifted != question:
+            candidates.append(shifted)
+            break
+    return [candidate for candidate in dict.fromkeys(candidates) if candidate.lower() != question.lower()]
+
+class SpeculativeWarmer:
+    """Generates SQL for likely follow-up questions in the background.
+
+    The results only land in the SQL cache, so the follow-up, if it comes,
+    skips the LLM. Questions the intent router answers or the cache already
+    holds are skipped, and at most max_inflight generations run at once.
+    """
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.started = 0
+        self.dropped = 0
+
+    async def _generate(self, query: str, schema_info: str) -> None:
+        try:
+            # Checked here rather than in warm(): with Redis it is a round trip
+            if await sql_cache.contains(query, schema_info):
+                return
+            self.started += 1
+            await OpenAIService.generate_sql_query(query, schema_info)
+        except Exception as e:
+            logger.info(f"Speculative SQL generation failed for '{query}': {e}")
+
+    def warm(self, query: str, schema_for: Callable[[str], str]) -> None:
+        # schema_for gives the schema description each candidate would be asked with
+        if not settings.SEARCH_SPECULATIVE_WARMING:
+            return
+        for candidate in follow_up_queries(query):
+            schema_info = schema_for(candidate)
+            if intent_router.route(candidate) is not None:
+                continue
+            if len(self._tasks) >= self.max_inflight:
+                self.dropped += 1
+                continue
+            task = asyncio.ensure_future(self._generate(candidate, schema_info))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.SEARCH_SPECULATIVE_WARMING,
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "dropped": self.dropped,
+        }
+
+speculative_warmer = SpeculativeWarmer(settings.SEARCH_SPECULATIVE_MAX_INFLIGHT)
@@ -0,0 +1,211 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import sqlglot
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlglot import exp
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.services.result_cache import result_cache
+from app.services.result_materializer import ResultPage, fetch_page
+
+logger = logging.getLogger(__name__)
+
+# Only literals in these clauses are lifted. Literals in the select list or in
+# GROUP BY/ORDER BY positions would change meaning or leave PostgreSQL unable
+# to infer a parameter type.
+_LIFTED_CLAUSES = (exp.Where, exp.Having, exp.Join, exp.Limit, exp.Offset)
+_KEPT_PARENTS = (exp.Interval, exp.Group, exp.Ordered, exp.DataType)
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_ISO_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?$")
+# datatype_mismatch, indeterminate_datatype, ambiguous_function, undefined_function
+_BINDING_SQLSTATES = ("42804", "42P18", "42725", "42883")
+
+@dataclass(frozen=True)
+class NormalizedQuery:
+    sql: str
+    params: Dict[str, Any]
+    fingerprint: str
+    parameterized: bool
+
+def fingerprint_sql(sql: str) -> str:
+    return hashlib.sha1(" ".join(sql.split()).encode()).hexdigest()[:16]
+
+def _literal_value(literal: exp.Literal) -> Any:
+    # asyncpg checks argument types strictly, so hand it the Python type the
+    # column will expect rather than the literal's text
+    if not literal.is_string:
+        number = literal.this
+        return int(number) if re.fullmatch(r"-?\d+", number) else Decimal(number)
+    value = literal.this
+    if _ISO_DATE.match(value):
+        return date.fromisoformat(value)
+    if _ISO_DATETIME.match(value):
+        # Naive, asyncpg would read it in the server process's local time for
+        # a timestamptz; see _placeholder for how it is turned back
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    return value
+
+def _placeholder(name: str, value: Any) -> exp.Expression:
+    if isinstance(value, datetime):
+        # The UTC value back to its wall-clock time: typed timestamp, it meets
+        # any column as the literal did, timestamp and timestamptz alike
+        return exp.var(f"(CAST(:{name} AS TIMESTAMPTZ) AT TIME ZONE 'UTC')")
+    return exp.var(f":{name}")
+
+def binding_failed(error: DBAPIError) -> bool:
+    """Whether `error` may come from a lifted value rather than from the SQL itself.
+
+    Data exceptions (asyncpg reports its own argument checks as 22000) and
+    type resolution errors qualify; cancellations, timeouts and the like do not.
+    """
+    sqlstate = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None) or ""
+    return sqlstate.startswith("22") or sqlstate in _BINDING_SQLSTATES
+
+def _liftable(literal: exp.Literal) -> bool:
+    if isinstance(literal.parent, _KEPT_PARENTS):
+        return False
+    clause = literal.find_ancestor(*_LIFTED_CLAUSES, exp.Select)
+    return clause is not None and not isinstance(clause, exp.Select)
+
+@lru_cache(maxsize=settings.SQL_NORMALIZE_CACHE_SIZE)
+def normalize_sql(sql_query: str) -> NormalizedQuery:
+    """Parse `sql_query` and lift its literals into bind parameters.
+
+    Queries that differ only in their constants normalize to the same text,
+    so PostgreSQL plans them once per connection and they share a fingerprint.
+    SQL that does not parse as a single statement is passed through as is.
+    """
+    raw = NormalizedQuery(sql_query, {}, fingerprint_sql(sql_query), False)
+    if not settings.SQL_NORMALIZE_ENABLED:
+        return raw
+    try:
+        statements = sqlglot.parse(sql_query.strip().rstrip(";"), read="postgres")
+    except sqlglot.errors.ParseError:
+        return raw
+    if len(statements) != 1 or statements[0] is None:
+        return raw
+
+    tree = statements[0]
+    params: Dict[str, Any] = {}
+    for literal in list(tree.find_all(exp.Literal)):
+        if not _liftable(literal):
+            continue
+        name = f"p{len(params)}"
+        # A negative number parses as Neg(Literal); lift the sign with it
+        target = literal.parent if isinstance(literal.parent, exp.Neg) else literal
+        value = _literal_value(literal)
+        params[name] = -value if target is not literal else value
+        target.replace(_placeholder(name, value))
+    if not params:
+        return raw
+    canonical = tree.sql(dialect="postgres")
+    return NormalizedQuery(canonical, params, fingerprint_sql(canonical), True)
+
+@dataclass
+class QueryShape:
+    sql: str
+    latency: Histogram = field(default_factory=Histogram)
+    literal_only: bool = False  # Binding failed once; run this shape with literals inline
+
+class QueryShapes:
+    """Latency per query shape, for the most recently seen shapes."""
+
+    def __init__(self, max_shapes: int):
+        self.max_shapes = max_shapes
+        self._shapes: "OrderedDict[str, QueryShape]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, fingerprint: str, sql: str) -> QueryShape:
+        shape = self._shapes.get(fingerprint)
+        if shape is None:
+            shape = self._shapes[fingerprint] = QueryShape(sql)
+            while len(self._shapes) > self.max_shapes:
+                self._shapes.popitem(last=False)
+        else:
+            self._shapes.move_to_end(fingerprint)
+        return shape
+
+    def record(self, fingerprint: str, sql: str, seconds: float) -> None:
+        with self._lock:
+            self._get(fingerprint, sql).latency.observe(seconds)
+
+    def mark_literal_only(self, fingerprint: str, sql: str) -> None:
+        with self._lock:
+            self._get(fingerprint, sql).literal_only = True
+
+    def literal_only(self, fingerprint: str) -> bool:
+        with self._lock:
+            shape = self._shapes.get(fingerprint)
+            return shape is not None and shape.literal_only
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            shapes = sorted(self._shapes.items(), key=lambda item: item[1].latency.count, reverse=True)[:limit]
+            return [
+                {"fingerprint": fingerprint, "sql": shape.sql, "literal_only": shape.literal_only, **shape.latency.snapshot()}
+                for fingerprint, shape in shapes
+            ]
+
+query_shapes = QueryShapes(settings.SQL_SHAPE_STATS_MAX)
+
+async def fetch_prepared_page(
+    db: AsyncSession,
+    sql_query: str,
+    page_size: int,
+    offset: int = 0,
+    params: Optional[Dict[str, Any]] = None,
+    token_sql: Optional[str] = None
+) -> ResultPage:
+    """fetch_page for SQL that may still carry its literals.
+
+    Statements without `params` are normalized first so each query shape
+    reuses one prepared statement. If the bound statement fails because a
+    lifted value does not fit the type PostgreSQL inferred for it (a date-like
+    string compared with a text column), the page is fetched with the literals
+    inline; when that works the shape skips binding from then on.
+    Pages are served from the result cache when the same canonical SQL and
+    parameters were fetched before.
+    """
+    if params is not None:
+        normalized = NormalizedQuery(sql_query, params, fingerprint_sql(sql_query), True)
+    else:
+        normalized = normalize_sql(sql_query)
+        token_sql = token_sql or sql_query
+
+    await result_cache.ensure_fresh(db)
+    cache_key = result_cache.key(normalized.sql, normalized.params, page_size, offset)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    epoch = result_cache.epoch
+
+    started = time.perf_counter()
+    if normalized.parameterized and not query_shapes.literal_only(normalized.fingerprint):
+        try:
+            page = await fetch_page(db, normalized.sql, page_size, offset, params=normalized.params, token_sql=token_sql)
+        except DBAPIError as e:
+            if not binding_failed(e):
+                raise
+            # Retry as written; errors in the SQL itself surface from this run
+            logger.info(f"Bound statement failed for shape {normalized.fingerprint}, retrying with literals: {e.orig}")
+            await db.rollback()
+            page = await fetch_page(db, token_sql or sql_query, page_size, offset)
+            query_shapes.mark_literal_only(normalized.fingerprint, normalized.sql)
+    else:
+        page = await fetch_page(db, token_sql or sql_query, page_size, offset)
+    query_shapes.record(normalized.fingerprint, normalized.sql, time.perf_counter() - started)
+    result_cache.put(cache_key, normalized.sql, page, epoch)
+    return page
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+# role::text reads both db_init.sql's user_role ('admin') and the ORM enum ('ADMIN')
+USER_COLUMNS = "id, email, full_name, role::text AS role, is_active"
+USER_SQL = f"SELECT {USER_COLUMNS} FROM users WHERE email = :email"
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: UserRole
+    is_active: bool
+
+def user_from_row(row: Any) -> CachedUser:
+    return CachedUser(
+        id=row.id,
+        email=row.email,
+        full_name=row.full_name,
+        role=UserRole((row.role or UserRole.USER.value).lower()),
+        is_active=row.is_active is not False,
+    )
+
+def _load_user(email: str) -> Optional[CachedUser]:
+    with SessionLocal() as db:
+        row = db.execute(text(USER_SQL), {"email": email}).first()
+    return None if row is None else user_from_row(row)
+
+class UserCache:
+    """Role and status of recently seen users, by email.
+
+    Authenticated requests read the user from here instead of the users
+    table. Entries are dropped by invalidate() when a user changes through
+    this worker and reloaded after ttl_seconds otherwise. Unknown emails are
+    cached too, so a token for a deleted user does not hit the database on
+    every request.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Optional[CachedUser], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, email: str) -> Tuple[bool, Optional[CachedUser]]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return True, entry[0]
+            self.misses += 1
+            return False, None
+
+    def put(self, email: str, user: Optional[CachedUser]) -> None:
+        with self._lock:
+            self._entries[email] = (user, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get(self, email: str) -> Optional[CachedUser]:
+        found, user = self._cached(email)
+        if found:
+            return user
+        user = await run_in_threadpool(_load_user, email)
+        self.put(email, user)
+        return user
+
+    def invalidate(self, email: Optional[str] = None) -> None:
+        """Forget `email`, or every user when None."""
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+user_cache = UserCache(max_entries=settings.AUTH_TOKEN_CACHE_SIZE, ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,77 @@
+"""Aggregate questions answered from flights against the statistics tables.
+
+Each question is run both ways, as the LLM would write it over flights and
+over route_daily_stats / route_stats / airline_stats (migrations/0003), and
+the two answers are checked to agree. Needs a migrated DATABASE_URL with the
+ORM schema (flights.airline), e.g. loaded with ingest_flights --load.
+
+    python -m benchmarks.aggregate_queries --repeat 5
+"""
+from decimal import Decimal
+import argparse
+import time
+
+from benchmarks.common import save_results, summarize
+
+QUESTIONS = {
+    "busiest_routes": (
+        "SELECT departure_airport_id, arrival_airport_id, count(*) AS flights FROM flights "
+        "GROUP BY 1, 2 ORDER BY flights DESC, 1, 2 LIMIT 10",
+        "SELECT departure_airport_id, arrival_airport_id, flights FROM route_stats "
+        "ORDER BY flights DESC, 1, 2 LIMIT 10",
+    ),
+    "airline_delay_rates": (
+        "SELECT airline, round(count(*) FILTER (WHERE status = 'delayed')::NUMERIC / count(*), 4) AS delay_rate "
+        "FROM flights GROUP BY airline ORDER BY delay_rate DESC, airline",
+        "SELECT airline, delay_rate FROM airline_stats ORDER BY delay_rate DESC, airline",
+    ),
+    "route_median_price": (
+        "SELECT departure_airport_id, arrival_airport_id, percentile_cont(0.5) WITHIN GROUP (ORDER BY price) AS median_price "
+        "FROM flights GROUP BY 1, 2 ORDER BY 1, 2",
+        "SELECT departure_airport_id, arrival_airport_id, median_price FROM route_stats ORDER BY 1, 2",
+    ),
+    "monthly_average_price": (
+        "SELECT date_trunc('month', departure_time)::DATE AS month, round(avg(price)::NUMERIC, 2) AS avg_price "
+        "FROM flights GROUP BY 1 ORDER BY 1",
+        "SELECT date_trunc('month', flight_date)::DATE AS month, round(sum(price_sum) / sum(priced_flights), 2) AS avg_price "
+        "FROM route_daily_stats GROUP BY 1 ORDER BY 1",
+    ),
+}
+
+def _normalize(rows):
+    # percentile_cont gives floats over flights and numerics over the stats
+    return [tuple(round(float(value), 2) if isinstance(value, (float, Decimal)) else value for value in row) for row in rows]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+
+    from app.db.migrate import current_version
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    results = {"migration": current_version(session.connection())}
+    for name, (raw_sql, stats_sql) in QUESTIONS.items():
+        timings = {"flights": [], "stats": []}
+        answers = {}
+        for _ in range(args.repeat):
+            for source, sql in (("flights", raw_sql), ("stats", stats_sql)):
+                started = time.perf_counter()
+                answers[source] = session.execute(text(sql)).all()
+                timings[source].append(time.perf_counter() - started)
+        results[name] = {
+            "flights": summarize(timings["flights"], sum(timings["flights"])),
+            "stats": summarize(timings["stats"], sum(timings["stats"])),
+            "rows": len(answers["stats"]),
+            "answers_match": _normalize(answers["flights"]) == _normalize(answers["stats"]),
+        }
+        print(f"{name:>22}: flights {results[name]['flights']['p50_ms']:>9.1f} ms, "
+              f"stats {results[name]['stats']['p50_ms']:>7.1f} ms, match {results[name]['answers_match']}")
+    session.close()
+    print(f"saved to {save_results('aggregate_queries', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+import json
+import platform
+import statistics
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    # Latencies in seconds in, milliseconds out
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+    }
+
+def save_results(name: str, results: Dict[str, Any]) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    path = RESULTS_DIR / f"{name}-{timestamp}.json"
+    payload = {
+        "benchmark": name,
+        "timestamp": timestamp,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2))
+    return path
@@ -0,0 +1,76 @@
+"""Compare two benchmark reports of the same benchmark.
+
+Walks both JSON reports and lines up every numeric result by its path.
+Latencies and times (keys ending in _ms, _s or us_per_op) that grew, and
+throughputs (keys ending in per_s) that shrank, by more than --threshold
+percent are regressions; the exit status is 1 if there are any, so a CI job
+can fail on them.
+
+    python -m benchmarks.compare benchmarks/results/load-A.json benchmarks/results/load-B.json
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = ("per_s",)
+LOWER_IS_BETTER = ("_ms", "_s", "us_per_op")
+
+def numbers(value: Any, path: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, bool):
+        return
+    if isinstance(value, (int, float)):
+        yield path, float(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from numbers(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from numbers(item, f"{path}[{index}]")
+
+def direction(path: str) -> int:
+    """1 when a larger value is better, -1 when smaller is, 0 for plain counts."""
+    key = path.rsplit(".", 1)[-1]
+    if key.endswith(HIGHER_IS_BETTER):
+        return 1
+    if key.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> Tuple[list, int]:
+    before = dict(numbers(baseline["results"]))
+    after = dict(numbers(candidate["results"]))
+    rows, regressions = [], 0
+    for path, old in before.items():
+        new = after.get(path)
+        sign = direction(path)
+        if new is None or sign == 0:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        regressed = -sign * change > threshold
+        regressions += regressed
+        rows.append((path, old, new, change, regressed))
+    return rows, regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change tolerated")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    if baseline["benchmark"] != candidate["benchmark"]:
+        sys.exit(f"Cannot compare a {baseline['benchmark']} report with a {candidate['benchmark']} report")
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    width = max((len(row[0]) for row in rows), default=10)
+    for path, old, new, change, regressed in rows:
+        print(f"{path:<{width}} {old:>12.3f} -> {new:>12.3f} {change:>+8.1f}%{'  REGRESSION' if regressed else ''}")
+    print(f"{regressions} regression(s) beyond {args.threshold}% ({baseline['timestamp']} -> {candidate['timestamp']})")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Synthetic airports and flights at benchmark scale.
+
+Airports are variations of the airports in db_init.sql and sample_data.sql:
+each generated airport takes a real one's country and time zone, a new
+three-letter code and a position near it. Flights are generated as in
+benchmarks/ingest_flights.py over all airports. Rows go into DATABASE_URL
+through the upload path (validation, BulkLoader, statistics refresh), so the
+database needs the ORM schema (flights.airline), migrated; or, with --out,
+they are written as CSV/Parquet files for upload benchmarks.
+
+    python -m benchmarks.datagen --airports 2000 --flights 5000000
+    python -m benchmarks.datagen --airports 500 --flights 100000 --out /tmp/data --format csv
+"""
+from itertools import product
+from pathlib import Path
+from string import ascii_uppercase
+from typing import List, Tuple
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import save_results
+from benchmarks.ingest_flights import generate_flights
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SEED_FILES = (BACKEND_DIR / "db_init.sql", BACKEND_DIR / "sample_data.sql")
+
+# ('JFK', 'John F. Kennedy ...', 'New York', 'United States', 40.6413, -73.7781, 'America/New_York', ...
+_AIRPORT_ROW = re.compile(
+    r"\(\s*'(?P<code>[A-Z]{3})',\s*'(?P<name>(?:[^']|'')*)',\s*'(?P<city>(?:[^']|'')*)',\s*'(?P<country>(?:[^']|'')*)',"
+    r"\s*(?P<latitude>-?[\d.]+),\s*(?P<longitude>-?[\d.]+),\s*'(?P<timezone>[^']*)'"
+)
+
+def seed_airports() -> pd.DataFrame:
+    rows = []
+    for path in SEED_FILES:
+        section = path.read_text().split("INSERT INTO airports", 1)
+        if len(section) == 2:
+            body = section[1].split(";", 1)[0]
+            rows.extend(match.groupdict() for match in _AIRPORT_ROW.finditer(body))
+    seeds = pd.DataFrame(rows).drop_duplicates("code")
+    for column in ("name", "city", "country"):
+        seeds[column] = seeds[column].str.replace("''", "'")
+    seeds[["latitude", "longitude"]] = seeds[["latitude", "longitude"]].astype(float)
+    return seeds.reset_index(drop=True)
+
+def generate_airports(count: int, seed: int = 7) -> pd.DataFrame:
+    """The seed airports first, then variations of them up to `count` (at most 17,576 codes)."""
+    seeds = seed_airports()
+    taken = set(seeds["code"])
+    free_codes = ["".join(letters) for letters in product(ascii_uppercase, repeat=3) if "".join(letters) not in taken]
+    extra = max(0, count - len(seeds))
+    if extra > len(free_codes):
+        raise ValueError(f"At most {len(seeds) + len(free_codes)} airports can have distinct codes")
+    rng = np.random.default_rng(seed)
+    base = seeds.iloc[rng.integers(0, len(seeds), extra)].reset_index(drop=True)
+    codes = rng.choice(free_codes, extra, replace=False)
+    generated = pd.DataFrame({
+        "code": codes,
+        "name": base["city"] + " " + pd.Series(codes) + " Airport",
+        "city": base["city"] + " " + pd.Series(rng.integers(2, 50, extra)).astype(str),
+        "country": base["country"],
+        "latitude": np.clip(base["latitude"] + rng.normal(0, 2, extra), -89, 89).round(4),
+        "longitude": ((base["longitude"] + rng.normal(0, 2, extra) + 180) % 360 - 180).round(4),
+        "timezone": base["timezone"],
+    })
+    airports = pd.concat([seeds, generated], ignore_index=True).head(count)
+    airports["terminal_count"] = rng.integers(1, 8, len(airports))
+    airports["runway_count"] = rng.integers(1, 6, len(airports))
+    airports["description"] = None
+    return airports
+
+def flight_chunks(rows: int, airport_ids: np.ndarray, chunk_size: int, seed: int = 7):
+    # Chunks get their own seed and flight number range so keys rarely repeat
+    for index, start in enumerate(range(0, rows, chunk_size)):
+        chunk = generate_flights(min(chunk_size, rows - start), airport_ids, seed=seed + index)
+        chunk["flight_number"] = chunk["flight_number"].str.replace("FL", f"{ascii_uppercase[index % 26]}{index // 26 % 10}", n=1)
+        yield chunk
+
+def load(airports: pd.DataFrame, flights: int, chunk_size: int) -> Tuple[dict, List[str]]:
+    from sqlalchemy import text
+
+    from app.db.session import SessionLocal
+    from app.services.flight_stats import refresh_flight_stats
+    from app.services.ingestion import AIRPORTS, FLIGHTS, BulkLoader, IngestReport, ingest_frame
+
+    session = SessionLocal()
+    results = {}
+    started = time.perf_counter()
+    report = IngestReport()
+    ingest_frame(session, airports, AIRPORTS, report)
+    session.commit()
+    results["airports"] = {"rows": report.rows_loaded, "seconds": round(time.perf_counter() - started, 3)}
+
+    airport_ids = np.array(session.execute(text("SELECT id FROM airports WHERE code = ANY(:codes)"), {"codes": list(airports["code"])}).scalars().all())
+    started = time.perf_counter()
+    report, loader = IngestReport(), BulkLoader(session, FLIGHTS)
+    for chunk in flight_chunks(flights, airport_ids, chunk_size):
+        ingest_frame(session, chunk, FLIGHTS, report, loader)
+        session.commit()
+        print(f"  {report.rows_loaded:>12,} flights loaded")
+    load_s = time.perf_counter() - started
+    results["flights"] = {"rows": report.rows_loaded, "rejected": report.rows_rejected, "seconds": round(load_s, 3), "rows_per_s": round(report.rows_loaded / load_s)}
+
+    started = time.perf_counter()
+    refresh_flight_stats(session)
+    session.execute(text("ANALYZE airports"))
+    session.execute(text("ANALYZE flights"))
+    session.commit()
+    results["stats_refresh_s"] = round(time.perf_counter() - started, 3)
+    session.close()
+    return results, [f"{key}: {value}" for key, value in results.items()]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--airports", type=int, default=1000)
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    parser.add_argument("--out", type=Path, help="write files here instead of loading DATABASE_URL")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="parquet")
+    args = parser.parse_args()
+
+    airports = generate_airports(args.airports)
+    if args.out is None:
+        results, lines = load(airports, args.flights, args.chunk_size)
+    else:
+        args.out.mkdir(parents=True, exist_ok=True)
+        # Files reference airports by position; upload airports.* first so ids line up on an empty table
+        airport_ids = np.arange(1, len(airports) + 1)
+        flights = pd.concat(flight_chunks(args.flights, airport_ids, args.chunk_size), ignore_index=True)
+        paths = []
+        for name, frame in (("airports", airports), ("flights", flights)):
+            path = args.out / f"{name}.{args.format}"
+            frame.to_csv(path, index=False) if args.format == "csv" else frame.to_parquet(path, index=False)
+            paths.append(str(path))
+        results = {"airports": len(airports), "flights": len(flights), "files": paths}
+        lines = [f"wrote {path}" for path in paths]
+
+    results["requested"] = {"airports": args.airports, "flights": args.flights}
+    for line in lines:
+        print(line)
+    print(f"saved to {save_results('datagen', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Explanation prompt size and build time against result size.
+
+Builds the explanation prompt for generated flight results of growing size
+and compares it with the old prompt, which embedded every row as indented
+JSON. Needs no database or API key.
+
+    python -m benchmarks.explain_prompt --rows 10 100 1000 5000 50000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import save_results
+from benchmarks.ingest_flights import generate_flights
+
+def flight_rows(rows: int) -> list:
+    df = generate_flights(rows, np.arange(1, 101))
+    for column in ("departure_time", "arrival_time"):
+        df[column] = df[column].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return df.to_dict("records")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000, 5000, 50000])
+    args = parser.parse_args()
+
+    from app.services.openai_service import OpenAIService
+
+    results = []
+    for rows in args.rows:
+        records = flight_rows(rows)
+        started = time.perf_counter()
+        messages = OpenAIService._explanation_messages(records, "Which flights leave next month?")
+        build_ms = (time.perf_counter() - started) * 1000
+        legacy_chars = len(json.dumps(records, indent=2, default=str))
+        results.append({
+            "rows": rows,
+            "prompt_chars": len(messages[1]["content"]),
+            "legacy_prompt_chars": legacy_chars,
+            "build_ms": round(build_ms, 2),
+        })
+        print(f"{rows:>7} rows: prompt {results[-1]['prompt_chars']:>6} chars (was {legacy_chars:>10}), built in {build_ms:.1f} ms")
+
+    path = save_results("explain_prompt", {"runs": results})
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Replay a flight schedule query log against the Flight model.
+
+The log mixes the hot query shapes: flights on a route within a day, an
+airline's flights within a day, and delayed or still active flights departing
+in the next hours. It is generated from the airports, airlines and departure
+range in DATABASE_URL (ORM schema, e.g. loaded with ingest_flights --load),
+or read from a JSON lines file written by --write-log. Run it before and
+after `python -m app.db.migrate` to compare plans and latencies.
+
+    python -m benchmarks.flight_queries --queries 2000 --explain
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import save_results, summarize
+
+# Share of each query kind in the generated log
+QUERY_MIX = {"route_day": 0.5, "airline_day": 0.3, "delayed_next_hours": 0.1, "active_next_hours": 0.1}
+
+def build_query_log(count: int, airport_ids: List[int], airlines: List[str], first: datetime, last: datetime, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    span_hours = max(1, int((last - first).total_seconds() // 3600) - 24)
+    kinds, weights = zip(*QUERY_MIX.items())
+    log = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        start = (first + timedelta(hours=rng.randrange(span_hours))).replace(minute=0, second=0, microsecond=0)
+        if kind == "route_day":
+            origin, destination = rng.sample(airport_ids, 2)
+            params = {"origin": origin, "destination": destination, "day": start.date().isoformat()}
+        elif kind == "airline_day":
+            params = {"airline": rng.choice(airlines), "day": start.date().isoformat()}
+        else:
+            params = {"from": start.isoformat(), "hours": rng.choice([2, 4, 6])}
+        log.append({"kind": kind, "params": params})
+    return log
+
+def build_statement(entry: Dict[str, Any]):
+    from sqlalchemy import select
+
+    from app.models.airport import Airport  # registers the relationship target
+    from app.models.flight import Flight
+
+    params = entry["params"]
+    if "day" in params:
+        day_start = datetime.fromisoformat(params["day"])
+        window = (Flight.departure_time >= day_start, Flight.departure_time < day_start + timedelta(days=1))
+    else:
+        window_start = datetime.fromisoformat(params["from"])
+        window = (Flight.departure_time >= window_start, Flight.departure_time < window_start + timedelta(hours=params["hours"]))
+
+    statement = select(Flight).where(*window).order_by(Flight.departure_time)
+    if entry["kind"] == "route_day":
+        return statement.where(Flight.departure_airport_id == params["origin"], Flight.arrival_airport_id == params["destination"])
+    if entry["kind"] == "airline_day":
+        return statement.where(Flight.airline == params["airline"])
+    if entry["kind"] == "delayed_next_hours":
+        return statement.where(Flight.status == "delayed")
+    return statement.where(Flight.status.in_(["scheduled", "delayed", "boarding"]))
+
+def _plan_summary(session, statement) -> str:
+    from sqlalchemy.dialects import postgresql
+
+    compiled = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = [row[0] for row in session.connection().exec_driver_sql(f"EXPLAIN {compiled}")]
+    # Node lines only, without costs
+    return " / ".join(line.strip().split("  (cost")[0] for line in plan if "(cost" in line)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--log", type=Path, help="replay this JSON lines log instead of generating one")
+    parser.add_argument("--write-log", type=Path, help="save the generated log for later runs")
+    parser.add_argument("--explain", action="store_true", help="report the plan of the first query of each kind")
+    args = parser.parse_args()
+
+    from sqlalchemy import func, select
+
+    from app.db.migrate import current_version
+    from app.db.session import SessionLocal
+    from app.models.airport import Airport
+    from app.models.flight import Flight
+
+    session = SessionLocal()
+    if args.log:
+        log = [json.loads(line) for line in args.log.read_text().splitlines() if line.strip()]
+    else:
+        airport_ids = list(session.scalars(select(Airport.id)))
+        airlines = list(session.scalars(select(Flight.airline).distinct()))
+        first, last = session.execute(select(func.min(Flight.departure_time), func.max(Flight.departure_time))).one()
+        log = build_query_log(args.queries, airport_ids, airlines, first, last)
+        if args.write_log:
+            args.write_log.write_text("".join(json.dumps(entry) + "\n" for entry in log))
+
+    latencies: Dict[str, List[float]] = {kind: [] for kind in QUERY_MIX}
+    rows: Dict[str, int] = {kind: 0 for kind in QUERY_MIX}
+    plans: Dict[str, str] = {}
+    started = time.perf_counter()
+    for entry in log:
+        statement = build_statement(entry)
+        if args.explain and entry["kind"] not in plans:
+            plans[entry["kind"]] = _plan_summary(session, statement)
+        query_started = time.perf_counter()
+        rows[entry["kind"]] += len(session.execute(statement).all())
+        latencies[entry["kind"]].append(time.perf_counter() - query_started)
+    elapsed = time.perf_counter() - started
+
+    results: Dict[str, Any] = {
+        "migration": current_version(session.connection()),
+        "queries": len(log),
+        "overall": summarize([value for values in latencies.values() for value in values], elapsed),
+    }
+    for kind, values in latencies.items():
+        if values:
+            results[kind] = {**summarize(values, sum(values)), "rows": rows[kind], **({"plan": plans[kind]} if kind in plans else {})}
+    session.close()
+
+    for key, value in results.items():
+        print(f"{key:>20}: {value}")
+    print(f"saved to {save_results('flight_queries', results)}")
+
+if __name__ == "__main__":
+    main()
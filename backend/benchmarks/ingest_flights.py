@@ -0,0 +1,115 @@
+"""Bulk flight ingestion over a generated schedule file.
+
+Generates N flights, writes them as CSV and Parquet, and times reading plus
+vectorized validation for both formats. With --load the frame is also upserted
+through BulkLoader into the database of DATABASE_URL (tables must exist), and
+the legacy iterrows/ORM loop is timed on a sample for comparison.
+
+    python -m benchmarks.ingest_flights --rows 1000000 --load
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import save_results
+
+AIRLINES = ["American Airlines", "Delta Air Lines", "British Airways", "Lufthansa", "Air France", "Emirates"]
+STATUSES = ["scheduled", "delayed", "cancelled", "boarding", "departed", "arrived"]
+
+def generate_flights(rows: int, airport_ids: np.ndarray, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(datetime(2025, 1, 1))
+    departures = start + rng.integers(0, 365 * 24 * 60, rows).astype("timedelta64[m]")
+    durations = rng.integers(45, 16 * 60, rows)
+    origin = rng.choice(airport_ids, rows)
+    destination = rng.choice(airport_ids, rows)
+    return pd.DataFrame({
+        # Sequential numbers keep (flight_number, departure_time) unique
+        "flight_number": pd.Series(np.arange(rows) % 9999 + 1).map("FL{:04d}".format).to_numpy(),
+        "airline": rng.choice(AIRLINES, rows),
+        "departure_airport_id": origin,
+        "arrival_airport_id": np.where(origin == destination, airport_ids[0], destination),
+        "departure_time": departures,
+        "arrival_time": departures + durations.astype("timedelta64[m]"),
+        "duration": durations,
+        "aircraft_type": rng.choice(["B737", "A320", "B777", "A380", "B787"], rows),
+        "status": rng.choice(STATUSES, rows),
+        "gate": rng.choice([f"{c}{n}" for c in "ABCD" for n in range(1, 40)], rows),
+        "terminal": rng.integers(1, 6, rows).astype(str),
+        "price": np.round(rng.uniform(49, 2500, rows), 2),
+    })
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--load", action="store_true", help="also upsert into DATABASE_URL")
+    parser.add_argument("--legacy-sample", type=int, default=5_000, help="rows loaded with the old per-row loop")
+    args = parser.parse_args()
+
+    from app.services.ingestion import FLIGHTS, BulkLoader, IngestReport, ingest_frame, read_table, validate_frame
+
+    airport_ids = np.arange(1, 6)
+    session = None
+    if args.load:
+        from sqlalchemy import text
+        from app.db.session import SessionLocal
+        session = SessionLocal()
+        airport_ids = np.array([row[0] for row in session.execute(text("SELECT id FROM airports"))])
+
+    results = {"rows": args.rows}
+    frame, results["generate_s"] = _timed(generate_flights, args.rows, airport_ids)
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = Path(workdir) / "flights.csv"
+        parquet_path = Path(workdir) / "flights.parquet"
+        frame.to_csv(csv_path, index=False)
+        frame.to_parquet(parquet_path, index=False)
+        results["csv_mb"] = round(os.path.getsize(csv_path) / 2**20, 1)
+        results["parquet_mb"] = round(os.path.getsize(parquet_path) / 2**20, 1)
+
+        for name, path in (("csv", csv_path), ("parquet", parquet_path)):
+            raw, read_s = _timed(read_table, str(path), path.name)
+            (clean, errors, rejected), validate_s = _timed(validate_frame, raw, FLIGHTS)
+            results[name] = {
+                "read_s": round(read_s, 3),
+                "validate_s": round(validate_s, 3),
+                "rows_per_s": round(args.rows / (read_s + validate_s)),
+                "rejected": rejected,
+            }
+
+        if session is not None:
+            report = IngestReport()
+            raw = read_table(str(parquet_path), parquet_path.name)
+            _, load_s = _timed(ingest_frame, session, raw, FLIGHTS, report)
+            session.commit()
+            results["bulk_load"] = {"seconds": round(load_s, 3), "rows_per_s": round(report.rows_loaded / load_s), "copy": BulkLoader(session, FLIGHTS).use_copy}
+
+            from app.models.airport import Airport  # registers the relationship target
+            from app.models.flight import Flight
+            sample = frame.head(args.legacy_sample).copy()
+            sample["flight_number"] = "LEGACY" + sample["flight_number"]
+            started = time.perf_counter()
+            for _, row in sample.iterrows():
+                session.add(Flight(**{column: row[column] for column in FLIGHTS.column_names}))
+            session.commit()
+            legacy_s = time.perf_counter() - started
+            results["legacy_iterrows"] = {"rows": len(sample), "seconds": round(legacy_s, 3), "rows_per_s": round(len(sample) / legacy_s)}
+            results["speedup"] = round(results["bulk_load"]["rows_per_s"] / results["legacy_iterrows"]["rows_per_s"], 1)
+            session.close()
+
+    for key, value in results.items():
+        print(f"{key:>16}: {value}")
+    print(f"saved to {save_results('ingest_flights', results)}")
+
+if __name__ == "__main__":
+    main()
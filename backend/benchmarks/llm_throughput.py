@@ -0,0 +1,109 @@
+"""Compare the old blocking LLM path with the pooled async client.
+
+The blocking path mirrors a sync `def` endpoint: each request occupies one of
+the 40 threads FastAPI runs sync endpoints on. The async path runs every
+request on the event loop through OpenAIService.
+
+    python -m benchmarks.llm_throughput --requests 400 --latency-ms 2000
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from openai import OpenAI
+
+from benchmarks.common import save_results, summarize
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_stub(latency_ms: int) -> tuple:
+    port = _free_port()
+    env = dict(os.environ, STUB_LLM_LATENCY_MS=str(latency_ms))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.stub_llm:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}/v1"
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=0.2)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Stub LLM server did not start")
+
+def run_blocking(base_url: str, requests: int, threads: int) -> dict:
+    client = OpenAI(api_key="stub", base_url=base_url)
+
+    def call() -> float:
+        started = time.perf_counter()
+        client.chat.completions.create(
+            model="gpt-4",
+            messages=[{"role": "system", "content": "You are a SQL expert."}, {"role": "user", "content": "airports"}],
+        )
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(lambda _: call(), range(requests)))
+    return summarize(latencies, time.perf_counter() - started)
+
+async def run_async(base_url: str, requests: int) -> dict:
+    from app.core.config import settings
+    settings.OPENAI_BASE_URL = base_url
+    settings.OPENAI_API_KEY = "stub"
+
+    from app.services.openai_service import OpenAIService, close_client
+    from app.services.query_cache import sql_cache
+    sql_cache.enabled = False
+
+    async def call(i: int) -> float:
+        started = time.perf_counter()
+        await OpenAIService.generate_sql_query(f"airports {i}", "schema")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(call(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await close_client()
+    return summarize(list(latencies), elapsed)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency-ms", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=40, help="thread pool size of the blocking path")
+    args = parser.parse_args()
+
+    process, base_url = start_stub(args.latency_ms)
+    try:
+        blocking = run_blocking(base_url, args.requests, args.threads)
+        pooled = asyncio.run(run_async(base_url, args.requests))
+    finally:
+        process.terminate()
+        process.wait()
+
+    results = {
+        "requests": args.requests,
+        "latency_ms": args.latency_ms,
+        "blocking": blocking,
+        "async": pooled,
+        "speedup": round(pooled["throughput_per_s"] / blocking["throughput_per_s"], 2),
+    }
+    for name in ("blocking", "async"):
+        print(f"{name:>8}: {results[name]['throughput_per_s']:>8} req/s  p50 {results[name]['p50_ms']} ms  p99 {results[name]['p99_ms']} ms")
+    print(f" speedup: {results['speedup']}x")
+    print(f"saved to {save_results('llm_throughput', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Load scenarios against /search and the admin uploads.
+
+Each scenario sends --requests requests, --concurrency at a time, and reports
+p50/p95/p99 latency and throughput of the successful ones plus the errors by
+status. Without --base-url the API is started with uvicorn against
+DATABASE_URL and an LLM stub (benchmarks/stub_llm.py) with --llm-latency-ms
+per call, so runs need no network and are comparable.
+
+    search_llm      every question different, so each one costs an LLM call
+    search_cached   one question over and over (SQL and result caches)
+    search_index    questions the airport index answers without the LLM
+    upload_flights  --upload-rows generated flights per CSV upload, as admin
+    mixed           85% index/cached, 10% LLM and 5% upload requests
+
+Uploads add flights to the database, over its existing airports. The admin
+token is minted with SECRET_KEY for --admin-email, which must exist as an
+admin user.
+
+    python -m benchmarks.load --scenario search_cached search_llm --requests 500 --concurrency 50
+"""
+from datetime import timedelta
+from itertools import count
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import save_results, summarize
+from benchmarks.llm_throughput import _free_port, start_stub
+
+INDEX_QUESTIONS = ["airports in France", "flights from JFK to LHR", "JFK", "airports in Japan", "flights from LAX to ORD tomorrow"]
+CACHED_QUESTION = "Which airports have more than 3 runways?"
+
+# A scenario builds request n as (method, path, keyword arguments for httpx)
+Request = Tuple[str, str, dict]
+
+def _search(question: str) -> Request:
+    return "POST", "/api/v1/search", {"json": {"query": question}}
+
+class Scenarios:
+    def __init__(self, admin_token: str, upload_rows: int, airport_ids: List[int]):
+        self.headers = {"Authorization": f"Bearer {admin_token}"}
+        self.upload_rows = upload_rows
+        self.airport_ids = airport_ids
+        self._uploads = count()
+        self._run = f"{time.time():.0f}"
+
+    def search_llm(self, n: int) -> Request:
+        return _search(f"Which airports have more than {n} terminals in load run {self._run}?")
+
+    def search_cached(self, n: int) -> Request:
+        return _search(CACHED_QUESTION)
+
+    def search_index(self, n: int) -> Request:
+        return _search(INDEX_QUESTIONS[n % len(INDEX_QUESTIONS)])
+
+    def upload_flights(self, n: int) -> Request:
+        import numpy as np
+
+        from benchmarks.ingest_flights import generate_flights
+
+        upload = next(self._uploads)
+        frame = generate_flights(self.upload_rows, np.array(self.airport_ids), seed=upload)
+        # Numbers unique to this run and upload, so every row is an insert
+        frame["flight_number"] = frame["flight_number"].str.replace("FL", f"L{self._run[-4:]}-{upload}-", n=1)
+        body = frame.to_csv(index=False).encode()
+        return "POST", "/api/v1/admin/upload/flights", {"files": {"file": ("flights.csv", body, "text/csv")}, "headers": self.headers}
+
+    def mixed(self, n: int) -> Request:
+        pick = random.Random(n).random()
+        if pick < 0.05:
+            return self.upload_flights(n)
+        if pick < 0.15:
+            return self.search_llm(n)
+        return self.search_cached(n) if pick < 0.5 else self.search_index(n)
+
+async def run_scenario(client: httpx.AsyncClient, build: Callable[[int], Request], requests: int, concurrency: int) -> Dict:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def one(n: int) -> None:
+        method, path, kwargs = build(n)
+        async with slots:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+        if isinstance(status, int) and status < 400:
+            latencies.append(elapsed)
+        else:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    return {**summarize(latencies, time.perf_counter() - started), "errors": errors}
+
+def start_api(llm_base_url: str) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ, OPENAI_BASE_URL=llm_base_url, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "stub")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            httpx.get(f"{base_url}/", timeout=0.5)
+            return process, base_url
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("API server did not start")
+
+def _airport_ids() -> List[int]:
+    from sqlalchemy import text
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        return list(db.execute(text("SELECT id FROM airports ORDER BY id LIMIT 1000")).scalars())
+
+async def run(base_url: str, args: argparse.Namespace) -> Dict:
+    from app.core.security import create_access_token
+
+    token = create_access_token({"sub": args.admin_email}, timedelta(hours=2))
+    needs_airports = any(name in ("upload_flights", "mixed") for name in args.scenario)
+    scenarios = Scenarios(token, args.upload_rows, _airport_ids() if needs_airports else [])
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        # One request first so the cached question is cached
+        method, path, kwargs = _search(CACHED_QUESTION)
+        await client.request(method, path, **kwargs)
+        for name in args.scenario:
+            results[name] = await run_scenario(client, getattr(scenarios, name), args.requests, args.concurrency)
+            summary = results[name]
+            print(
+                f"{name:<15} {summary['throughput_per_s']:>9} req/s  p50 {summary['p50_ms']:>9} ms  "
+                f"p95 {summary['p95_ms']:>9} ms  p99 {summary['p99_ms']:>9} ms  errors {summary['errors'] or 0}"
+            )
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", default=["search_index", "search_cached", "search_llm"],
+                        choices=["search_llm", "search_cached", "search_index", "upload_flights", "mixed"])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=int, default=800)
+    parser.add_argument("--upload-rows", type=int, default=5000)
+    parser.add_argument("--admin-email", default="admin@airscribe.com")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--base-url", help="an API that is already running, instead of starting one")
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    base_url: Optional[str] = args.base_url
+    try:
+        if base_url is None:
+            stub, llm_base_url = start_stub(args.llm_latency_ms)
+            processes.append(stub)
+            api, base_url = start_api(llm_base_url)
+            processes.append(api)
+        results = asyncio.run(run(base_url, args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    payload = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "llm_latency_ms": None if args.base_url else args.llm_latency_ms,
+        "upload_rows": args.upload_rows,
+        "scenarios": results,
+    }
+    print(f"saved to {save_results('load', payload)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmarks of the per-request hot paths.
+
+Times row conversion, response serialization, upload validation, SQL
+normalization, schema table selection and token verification on generated
+data, best of --repeat runs, and reports microseconds per operation. Needs no
+database, so runs are comparable across machines and commits.
+
+    python -m benchmarks.micro --rows 1000 --repeat 5
+"""
+from datetime import timedelta
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.common import save_results
+from benchmarks.ingest_flights import generate_flights
+from benchmarks.response_render import driver_values
+
+QUESTIONS = [
+    "airports in France",
+    "flights from JFK to LHR tomorrow",
+    "average delay per airline last month",
+    "busiest routes by number of flights",
+]
+
+SQL = [
+    "SELECT * FROM airports WHERE country = 'France' LIMIT 100",
+    "SELECT flight_number, status FROM flights WHERE departure_airport_id = 12 AND departure_time >= '2025-03-01' LIMIT 50",
+    "SELECT airline, count(*) FROM flights WHERE price > 300 GROUP BY airline ORDER BY 2 DESC LIMIT 10",
+]
+
+def _best_of(repeat: int, operations: int, fn, *args) -> float:
+    # Microseconds per operation of the fastest run
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) / operations * 1e6, 3)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per converted or serialized page")
+    parser.add_argument("--upload-rows", type=int, default=100_000, help="rows per validated upload")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.core.security import TokenVerifier, create_access_token
+    from app.services.ingestion import FLIGHTS, validate_frame
+    from app.services.response_renderer import dumps, search_payload
+    from app.services.result_materializer import RowMaterializer
+    from app.services.schema_context import SchemaContext
+    from app.services.sql_normalizer import normalize_sql
+
+    columns, values = driver_values(args.rows)
+    response = {"query": "q", "sql_query": "SELECT 1", "columns": columns, "rows": values}
+    upload = generate_flights(args.upload_rows, pd.Series(range(1, 101)).to_numpy()).astype(str)
+    schema = SchemaContext(check_interval_seconds=0)
+    schema.load()
+    tokens = [create_access_token({"sub": f"user{i}@example.com"}, timedelta(hours=1)) for i in range(100)]
+
+    def convert_rows():
+        RowMaterializer(columns).to_dicts(values)
+
+    def serialize(result_format):
+        dumps(search_payload(response, result_format))
+
+    def normalize():
+        normalize_sql.cache_clear()
+        for sql in SQL:
+            normalize_sql(sql)
+
+    def select_tables():
+        for question in QUESTIONS:
+            schema.relevant_tables(question)
+
+    def verify(verifier):
+        for token in tokens:
+            verifier.verify(token)
+
+    warm = TokenVerifier(len(tokens))
+    verify(warm)
+    # name: (microseconds per operation, unit of an operation)
+    results = {
+        "row_conversion": (_best_of(args.repeat, args.rows, convert_rows), "row"),
+        "serialize_rows": (_best_of(args.repeat, args.rows, serialize, "rows"), "row"),
+        "serialize_columns": (_best_of(args.repeat, args.rows, serialize, "columns"), "row"),
+        "upload_validation": (_best_of(args.repeat, args.upload_rows, validate_frame, upload, FLIGHTS), "row"),
+        "normalize_sql": (_best_of(args.repeat, len(SQL), normalize), "statement"),
+        "schema_table_selection": (_best_of(args.repeat, len(QUESTIONS), select_tables), "question"),
+        "token_verify_uncached": (_best_of(args.repeat, len(tokens), lambda: verify(TokenVerifier(0))), "token"),
+        "token_verify_cached": (_best_of(args.repeat, len(tokens), verify, warm), "token"),
+    }
+    for name, (us, unit) in results.items():
+        print(f"{name:<24} {us:>10.3f} us/{unit}")
+
+    path = save_results("micro", {
+        "rows": args.rows,
+        "upload_rows": args.upload_rows,
+        "benchmarks": {name: {"us_per_op": us, "unit": unit} for name, (us, unit) in results.items()},
+    })
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
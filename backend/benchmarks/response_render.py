@@ -0,0 +1,80 @@
+"""Search response serialization time and size against result size.
+
+Renders generated flight rows, held as driver values (Decimal prices,
+datetimes), the old way (per-cell conversion, response model validation,
+jsonable_encoder, json.dumps) and through the orjson renderer as row objects
+and as columns, and reports gzip and brotli sizes. Needs no database.
+
+    python -m benchmarks.response_render --rows 1000 10000
+"""
+from decimal import Decimal
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import save_results
+from benchmarks.ingest_flights import generate_flights
+
+def driver_values(rows: int):
+    df = generate_flights(rows, np.arange(1, 101))
+    records = df.to_dict("records")
+    columns = ["id", *df.columns]
+    values = []
+    for index, record in enumerate(records, start=1):
+        record["departure_time"] = record["departure_time"].to_pydatetime()
+        record["arrival_time"] = record["arrival_time"].to_pydatetime()
+        record["price"] = Decimal(str(record["price"]))
+        values.append((index, *(value.item() if isinstance(value, np.generic) else value for value in record.values())))
+    return columns, values
+
+def _best_of(repeat: int, fn, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return value, min(timings) * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+
+    from app.schemas.search import SearchResponse
+    from app.services.response_renderer import brotli, dumps, search_payload
+    from app.services.result_materializer import RowMaterializer
+
+    def legacy(columns, values):
+        response = {"query": "q", "sql_query": "SELECT 1", "results": RowMaterializer(columns).to_dicts(values)}
+        return json.dumps(jsonable_encoder(SearchResponse.model_validate(response))).encode()
+
+    def rendered(columns, values, result_format):
+        response = {"query": "q", "sql_query": "SELECT 1", "columns": columns, "rows": values}
+        return dumps(search_payload(response, result_format))
+
+    results = []
+    for rows in args.rows:
+        columns, values = driver_values(rows)
+        run = {"rows": rows}
+        for name, fn, extra in (("legacy", legacy, ()), ("orjson_rows", rendered, ("rows",)), ("orjson_columns", rendered, ("columns",))):
+            body, elapsed_ms = _best_of(args.repeat, fn, columns, values, *extra)
+            run[name] = {
+                "ms": round(elapsed_ms, 2),
+                "bytes": len(body),
+                "gzip_bytes": len(gzip.compress(body, compresslevel=5)),
+                "br_bytes": len(brotli.compress(body, quality=4)) if brotli is not None else None,
+            }
+            print(f"{rows:>7} rows {name:<15} {elapsed_ms:>9.1f} ms {len(body):>11} bytes, gzip {run[name]['gzip_bytes']:>10}")
+        results.append(run)
+
+    path = save_results("response_render", {"runs": results})
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
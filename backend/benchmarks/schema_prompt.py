@@ -0,0 +1,48 @@
+"""Schema description size per question, full and with table selection.
+
+Builds the schema context from DATABASE_URL (from the ORM models when it
+cannot be reached) and reports, for a set of typical questions, the tables
+selected and the size of the description sent with them. Token counts are
+estimated at four characters per token.
+
+    python -m benchmarks.schema_prompt
+"""
+import argparse
+import time
+
+from benchmarks.common import save_results
+
+QUESTIONS = [
+    "airports in Paris",
+    "which airports have more than 3 runways",
+    "flights from JFK to LHR tomorrow",
+    "delayed flights departing in the next 2 hours",
+    "cheapest fare from CDG to FRA next week",
+    "average price per route",
+    "which airline has the most delays",
+    "what is the capacity of a Boeing 777",
+]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1000, help="selections timed per question")
+    args = parser.parse_args()
+
+    from app.services.schema_context import schema_context
+
+    schema_context.load_at_startup()
+    full = schema_context.render(schema_context._tables)
+    results = {"source": schema_context.source, "migration": schema_context.version, "full_chars": len(full), "questions": []}
+    print(f"full schema: {len(full)} chars, ~{len(full) // 4} tokens ({schema_context.source})")
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            description = schema_context.for_query(question)
+        elapsed_us = (time.perf_counter() - started) / args.repeat * 1e6
+        tables = sorted(schema_context.relevant_tables([question]))
+        results["questions"].append({"question": question, "tables": tables, "chars": len(description), "select_us": round(elapsed_us, 1)})
+        print(f"{question:<48} {len(description):>6} chars ~{len(description) // 4:>4} tokens {elapsed_us:>6.1f} us  {', '.join(tables)}")
+    print(f"saved to {save_results('schema_prompt', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Cold start of the API: import time, import profile and time to first response.
+
+Imports `main` in --runs fresh interpreters per router set (API_ROUTERS) and
+reports the import time, which heavy packages got loaded, and a profile of
+`python -X importtime` grouped by top-level package. With --serve it also
+starts uvicorn against DATABASE_URL and times the first response, lifespan
+included.
+
+    python -m benchmarks.startup --routers auth,admin,search search --runs 5 --serve
+"""
+from collections import defaultdict
+from typing import Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import save_results
+from benchmarks.llm_throughput import _free_port
+
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "pyarrow", "openai", "sqlglot", "app.services.ingestion"]
+
+IMPORT_SCRIPT = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import main\n"
+    "elapsed = time.perf_counter() - started\n"
+    f"print(json.dumps({{'import_s': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+)
+
+def _env(routers: str) -> Dict[str, str]:
+    # Timings are of the imports, not of the log output
+    return dict(os.environ, API_ROUTERS=routers, LOG_LEVEL="WARNING")
+
+def import_times(routers: str, runs: int) -> Dict:
+    timings, loaded = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=_env(routers), capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        timings.append(run["import_s"])
+        loaded = run["loaded"]
+    return {
+        "min_ms": round(min(timings) * 1000, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "heavy_modules_loaded": loaded,
+    }
+
+def import_profile(routers: str, top: int) -> List[Dict]:
+    """Self time of every imported module, summed per top-level package."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=_env(routers), capture_output=True, text=True, check=True).stderr
+    packages: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        # import time:  self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return [{"package": name, "self_ms": round(us / 1000, 1)} for name, us in ranked[:top]]
+
+def first_response(routers: str) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=_env(routers),
+    )
+    try:
+        while process.poll() is None:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=0.5)
+                return round((time.perf_counter() - started) * 1000, 1)
+            except httpx.HTTPError:
+                time.sleep(0.02)
+        raise RuntimeError(f"API server with routers {routers} exited during startup")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routers", nargs="+", default=["auth,admin,search", "search"], help="API_ROUTERS values to compare")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the import profile")
+    parser.add_argument("--serve", action="store_true", help="also time uvicorn's first response, with DATABASE_URL")
+    args = parser.parse_args()
+
+    results = {}
+    for routers in args.routers:
+        result = import_times(routers, args.runs)
+        result["profile"] = import_profile(routers, args.top)
+        if args.serve:
+            result["first_response_ms"] = first_response(routers)
+        results[routers] = result
+        print(f"{routers}: import min {result['min_ms']} ms, median {result['median_ms']} ms"
+              + (f", first response {result['first_response_ms']} ms" if args.serve else ""))
+        print(f"  heavy modules loaded: {', '.join(result['heavy_modules_loaded']) or 'none'}")
+        for entry in result["profile"]:
+            print(f"  {entry['package']:<28} {entry['self_ms']:>8} ms")
+
+    print(f"saved to {save_results('startup', {'runs': args.runs, 'routers': results})}")
+
+if __name__ == "__main__":
+    main()
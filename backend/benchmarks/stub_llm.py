@@ -0,0 +1,84 @@
+"""Minimal stand-in for the OpenAI chat completions API.
+
+Run with `uvicorn benchmarks.stub_llm:app --port 8100` and point
+OPENAI_BASE_URL at http://localhost:8100/v1. The response delay is set with
+STUB_LLM_LATENCY_MS (time to the first token when streaming) and the SQL it
+answers with by STUB_LLM_SQL_REPLY. It is a bare ASGI app so that the stub
+itself is never the bottleneck of a load test.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+LATENCY_SECONDS = float(os.environ.get("STUB_LLM_LATENCY_MS", "800")) / 1000
+
+SQL_REPLY = os.environ.get("STUB_LLM_SQL_REPLY", "SELECT * FROM airports LIMIT 5")
+EXPLANATION_REPLY = "These results list the requested airports."
+
+def _completion(content: str) -> bytes:
+    return json.dumps({
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }).encode()
+
+def _chunk(content: Optional[str]) -> bytes:
+    payload = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "gpt-4",
+        "choices": [{
+            "index": 0,
+            "delta": {"content": content} if content is not None else {},
+            "finish_reason": None if content is not None else "stop",
+        }],
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    body = await _read_body(receive)
+    if scope["path"] != "/v1/chat/completions":
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+        return
+
+    request = json.loads(body or b"{}")
+    messages = request.get("messages") or [{"content": ""}]
+    content = SQL_REPLY if "SQL" in messages[0]["content"] else EXPLANATION_REPLY
+    if "JSON array" in messages[0]["content"]:
+        # Packed conversion: one SQL string per numbered question, which sit
+        # between the instruction and the IMPORTANT note
+        listing = messages[-1]["content"].split("numbered", 1)[-1].split("IMPORTANT", 1)[0]
+        questions = sum(1 for line in listing.splitlines() if line.strip()[:1].isdigit())
+        content = json.dumps([SQL_REPLY] * questions)
+    await asyncio.sleep(LATENCY_SECONDS)
+    if not request.get("stream"):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": _completion(content)})
+        return
+
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+    for word in content.split(" "):
+        await send({"type": "http.response.body", "body": _chunk(word + " "), "more_body": True})
+        await asyncio.sleep(0.005)
+    await send({"type": "http.response.body", "body": _chunk(None) + b"data: [DONE]\n\n"})
@@ -101,6 +101,7 @@ CREATE INDEX idx_flights_arrival_time ON flights(arrival_time);
 CREATE INDEX idx_flights_airline_id ON flights(airline_id);
 CREATE INDEX idx_flights_departure_airport_id ON flights(departure_airport_id);
 CREATE INDEX idx_flights_arrival_airport_id ON flights(arrival_airport_id);
+CREATE UNIQUE INDEX uq_flights_number_departure ON flights(flight_number, departure_time);
 CREATE INDEX idx_search_history_user_id ON search_history(user_id);
 CREATE INDEX idx_search_history_created_at ON search_history(created_at);
 
@@ -1,26 +1,92 @@
+from contextlib import asynccontextmanager
+from typing import Optional, Sequence
+import asyncio
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.api.v1.api import api_router
-
-app = FastAPI(
-    title="Airport Database Assistant",
-    description="An intelligent assistant for airport and flight information",
-    version="1.0.0"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:8080"],  # Frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include API router
-app.include_router(api_router, prefix="/api/v1")
-
-@app.get("/")
-async def root():
-    return {"message": "Welcome to Airport Database Assistant API"} 
\ No newline at end of file
+from app.core.logs import configure_logging
+from app.core.metrics import metrics
+from app.api.v1.api import create_api_router
+from app.db.session import dispose_engines
+from app.services.openai_service import close_client, get_client
+
+configure_logging()
+
+def create_app(routers: Optional[Sequence[str]] = None) -> FastAPI:
+    """The API with `routers`, API_ROUTERS by default.
+
+    Only the endpoint modules of those routers are imported, so a search-only
+    worker never loads the ingestion stack. Run one with
+    `API_ROUTERS=search uvicorn main:app`, or `uvicorn main:create_app --factory`.
+    """
+    if routers is None:
+        routers = [name.strip() for name in settings.API_ROUTERS.split(",") if name.strip()]
+    serves_search = "search" in routers
+    serves_llm = serves_search or "admin" in routers
+    if serves_search:
+        from app.services.cache_warmer import cache_warmer
+        from app.services.search_history import history_writer
+    if serves_llm:
+        from app.services.schema_context import schema_context
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if serves_llm:
+            # Introspection is blocking; the search path rechecks it by migration
+            # version. The LLM client is built meanwhile, so the first question
+            # does not wait for the openai import
+            await asyncio.gather(run_in_threadpool(schema_context.load_at_startup), run_in_threadpool(get_client))
+        if serves_search:
+            history_writer.start()
+            # Runs in the background; /ready reports when it has covered enough
+            cache_warmer.start()
+        yield
+        if serves_search:
+            await cache_warmer.stop()
+            # Before the engines go: buffered history is written on the way out
+            await history_writer.stop()
+        await close_client()
+        await dispose_engines()
+
+    app = FastAPI(
+        title="Airport Database Assistant",
+        description="An intelligent assistant for airport and flight information",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:8080"],  # Frontend URL
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Include API router
+    app.include_router(create_api_router(routers), prefix="/api/v1")
+
+    @app.get("/")
+    async def root():
+        return {"message": "Welcome to Airport Database Assistant API"}
+
+    @app.get("/ready", include_in_schema=False)
+    async def ready():
+        # For load balancers: 503 until the popular questions are warmed
+        if not serves_search:
+            return {"ready": True}
+        stats = cache_warmer.stats()
+        return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
+
+    if settings.METRICS_ENDPOINT_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        def prometheus_metrics():
+            # Counters and histograms of this worker process, for Prometheus to scrape
+            return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+app = create_app()
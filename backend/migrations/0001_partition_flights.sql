@@ -0,0 +1,87 @@
+-- Range-partition flights by departure_time, one partition per month.
+-- Departures outside the months created here go to flights_default until
+-- ensure_flight_partitions() is run for their month.
+
+CREATE OR REPLACE FUNCTION ensure_flight_partitions(from_month DATE, to_month DATE) RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month)::DATE;
+    month_end DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= to_month LOOP
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        partition_name := format('flights_%s', to_char(month_start, 'YYYY_MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Rows of this month already in the default partition move with it
+            EXECUTE format('CREATE TABLE %I (LIKE flights INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+            IF to_regclass('flights_default') IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM flights_default WHERE departure_time >= %L AND departure_time < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    month_start, month_end, partition_name
+                );
+            END IF;
+            EXECUTE format('ALTER TABLE flights ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', partition_name, month_start, month_end);
+            created := created + 1;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    foreign_key RECORD;
+    id_sequence TEXT;
+    first_departure DATE;
+    last_departure DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'flights'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE flights RENAME TO flights_unpartitioned;
+    CREATE TABLE flights (LIKE flights_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (departure_time);
+    CREATE TABLE flights_default PARTITION OF flights DEFAULT;
+
+    SELECT min(departure_time)::DATE, max(departure_time)::DATE INTO first_departure, last_departure FROM flights_unpartitioned;
+    PERFORM ensure_flight_partitions(
+        coalesce(first_departure, CURRENT_DATE),
+        greatest(last_departure, (CURRENT_DATE + INTERVAL '12 months')::DATE)
+    );
+    INSERT INTO flights SELECT * FROM flights_unpartitioned;
+
+    -- The id sequence belongs to the old table and would go with it
+    id_sequence := pg_get_serial_sequence('flights_unpartitioned', 'id');
+    IF id_sequence IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY flights.id', id_sequence);
+    END IF;
+
+    FOR foreign_key IN
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = 'flights_unpartitioned'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE flights ADD CONSTRAINT %I %s', foreign_key.conname, foreign_key.definition);
+    END LOOP;
+
+    DROP TABLE flights_unpartitioned;
+
+    -- Unique keys of a partitioned table must include the partition key
+    ALTER TABLE flights ADD CONSTRAINT flights_pkey PRIMARY KEY (id, departure_time);
+    ALTER TABLE flights ADD CONSTRAINT uq_flights_number_departure UNIQUE (flight_number, departure_time);
+    CREATE INDEX idx_flights_departure_time ON flights (departure_time);
+    CREATE INDEX idx_flights_arrival_time ON flights (arrival_time);
+    CREATE INDEX idx_flights_arrival_airport_id ON flights (arrival_airport_id);
+
+    IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+        CREATE TRIGGER update_flights_updated_at
+            BEFORE UPDATE ON flights
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column();
+    END IF;
+END
+$$;
@@ -0,0 +1,31 @@
+-- Indexes for the hot schedule queries: flights on a route in a date window,
+-- an airline's flights in a date window, and active or delayed flights
+-- departing in the next hours.
+
+CREATE INDEX IF NOT EXISTS idx_flights_route_departure
+    ON flights (departure_airport_id, arrival_airport_id, departure_time);
+
+-- db_init.sql references airlines by id; the ORM schema stores the name
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'flights' AND column_name = 'airline_id'
+    ) THEN
+        CREATE INDEX IF NOT EXISTS idx_flights_airline_departure ON flights (airline_id, departure_time);
+    ELSE
+        CREATE INDEX IF NOT EXISTS idx_flights_airline_departure ON flights (airline, departure_time);
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_flights_active_departure
+    ON flights (departure_time) WHERE status IN ('scheduled', 'delayed', 'boarding');
+CREATE INDEX IF NOT EXISTS idx_flights_delayed_departure
+    ON flights (departure_time) WHERE status = 'delayed';
+
+-- Leading columns of the composite indexes above
+DROP INDEX IF EXISTS idx_flights_departure_airport_id;
+DROP INDEX IF EXISTS idx_flights_airline_id;
+
+ANALYZE flights;
@@ -0,0 +1,124 @@
+-- Pre-aggregated flight statistics for aggregate questions (busiest routes,
+-- average fares, delay rates), kept current by refresh_flight_stats().
+
+CREATE TABLE IF NOT EXISTS route_daily_stats (
+    departure_airport_id INTEGER NOT NULL,
+    arrival_airport_id INTEGER NOT NULL,
+    flight_date DATE NOT NULL,
+    flights INTEGER NOT NULL,
+    delayed_flights INTEGER NOT NULL,
+    cancelled_flights INTEGER NOT NULL,
+    price_sum NUMERIC,
+    priced_flights INTEGER NOT NULL,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    PRIMARY KEY (departure_airport_id, arrival_airport_id, flight_date)
+);
+CREATE INDEX IF NOT EXISTS idx_route_daily_stats_date ON route_daily_stats (flight_date);
+
+CREATE TABLE IF NOT EXISTS route_stats (
+    departure_airport_id INTEGER NOT NULL,
+    arrival_airport_id INTEGER NOT NULL,
+    flights INTEGER NOT NULL,
+    delayed_flights INTEGER NOT NULL,
+    cancelled_flights INTEGER NOT NULL,
+    delay_rate NUMERIC NOT NULL,
+    avg_price NUMERIC,
+    median_price NUMERIC,
+    p90_price NUMERIC,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    first_departure TIMESTAMP WITH TIME ZONE,
+    last_departure TIMESTAMP WITH TIME ZONE,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (departure_airport_id, arrival_airport_id)
+);
+
+CREATE TABLE IF NOT EXISTS airline_stats (
+    airline VARCHAR(255) PRIMARY KEY,
+    flights INTEGER NOT NULL,
+    delayed_flights INTEGER NOT NULL,
+    cancelled_flights INTEGER NOT NULL,
+    delay_rate NUMERIC NOT NULL,
+    avg_price NUMERIC,
+    median_price NUMERIC,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Recomputes the days from_date..to_date (all days when both are NULL), and
+-- the totals of every route and airline flying on those days. Uploads only
+-- add or update flights, so their departure range is enough; deletes need a
+-- full refresh.
+DO $migration$
+DECLARE
+    airline_column TEXT := 'f.airline';
+    airline_join TEXT := '';
+BEGIN
+    -- db_init.sql references airlines by id; the ORM schema stores the name
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'flights' AND column_name = 'airline_id'
+    ) THEN
+        airline_column := 'a.name';
+        airline_join := 'JOIN airlines a ON a.id = f.airline_id';
+    END IF;
+
+    EXECUTE format($function$
+CREATE OR REPLACE FUNCTION refresh_flight_stats(from_date DATE DEFAULT NULL, to_date DATE DEFAULT NULL) RETURNS VOID AS $body$
+DECLARE
+    full_refresh BOOLEAN := from_date IS NULL AND to_date IS NULL;
+    range_start DATE := coalesce(from_date, '-infinity'::DATE);
+    range_end DATE := coalesce(to_date, 'infinity'::DATE);
+BEGIN
+    DELETE FROM route_daily_stats WHERE flight_date BETWEEN range_start AND range_end;
+    INSERT INTO route_daily_stats
+    SELECT f.departure_airport_id, f.arrival_airport_id, f.departure_time::DATE,
+           count(*), count(*) FILTER (WHERE f.status = 'delayed'), count(*) FILTER (WHERE f.status = 'cancelled'),
+           sum(f.price), count(f.price), min(f.price), max(f.price)
+    FROM flights f
+    WHERE f.departure_time >= range_start AND f.departure_time < range_end + 1
+    GROUP BY 1, 2, 3;
+
+    IF full_refresh THEN
+        DELETE FROM route_stats;
+        DELETE FROM airline_stats;
+    ELSE
+        DELETE FROM route_stats r USING route_daily_stats d
+        WHERE d.flight_date BETWEEN range_start AND range_end
+          AND r.departure_airport_id = d.departure_airport_id AND r.arrival_airport_id = d.arrival_airport_id;
+        DELETE FROM airline_stats WHERE airline IN (
+            SELECT %1$s FROM flights f %2$s WHERE f.departure_time >= range_start AND f.departure_time < range_end + 1
+        );
+    END IF;
+
+    INSERT INTO route_stats
+    SELECT f.departure_airport_id, f.arrival_airport_id,
+           count(*), count(*) FILTER (WHERE f.status = 'delayed'), count(*) FILTER (WHERE f.status = 'cancelled'),
+           round(count(*) FILTER (WHERE f.status = 'delayed')::NUMERIC / count(*), 4),
+           round(avg(f.price)::NUMERIC, 2),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY f.price),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY f.price),
+           min(f.price), max(f.price), min(f.departure_time), max(f.departure_time), CURRENT_TIMESTAMP
+    FROM flights f
+    WHERE full_refresh OR (f.departure_airport_id, f.arrival_airport_id) IN (
+        SELECT DISTINCT departure_airport_id, arrival_airport_id FROM route_daily_stats
+        WHERE flight_date BETWEEN range_start AND range_end
+    )
+    GROUP BY 1, 2;
+
+    INSERT INTO airline_stats
+    SELECT %1$s,
+           count(*), count(*) FILTER (WHERE f.status = 'delayed'), count(*) FILTER (WHERE f.status = 'cancelled'),
+           round(count(*) FILTER (WHERE f.status = 'delayed')::NUMERIC / count(*), 4),
+           round(avg(f.price)::NUMERIC, 2),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY f.price)
+    FROM flights f %2$s
+    WHERE %1$s IS NOT NULL AND %1$s NOT IN (SELECT airline FROM airline_stats)
+    GROUP BY 1;
+END
+$body$ LANGUAGE plpgsql
+$function$, airline_column, airline_join);
+END
+$migration$;
+
+SELECT refresh_flight_stats();
@@ -0,0 +1,5 @@
+-- Searches are recorded without a user until search requests are authenticated
+ALTER TABLE search_history ALTER COLUMN user_id DROP NOT NULL;
+
+-- Popular queries are counted over a recent window
+CREATE INDEX IF NOT EXISTS idx_search_history_created_at ON search_history (created_at);
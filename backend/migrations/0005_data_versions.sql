@@ -0,0 +1,37 @@
+-- A change counter per table, bumped once per writing statement by whoever
+-- writes. Each worker's result cache polls it and drops the pages it holds
+-- for tables written since, through another worker or outside the API.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO data_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = data_versions.version + 1, changed_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Every table there is now; partitions are covered by their parent
+DO $$
+DECLARE
+    tracked RECORD;
+BEGIN
+    FOR tracked IN
+        SELECT relname FROM pg_class
+        WHERE relnamespace = current_schema()::regnamespace AND relkind IN ('r', 'p') AND NOT relispartition
+            AND relname NOT IN ('data_versions', 'schema_migrations')
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tracked.relname || '_data_version', tracked.relname);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()',
+            tracked.relname || '_data_version', tracked.relname
+        );
+    END LOOP;
+END
+$$;
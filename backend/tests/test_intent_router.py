@@ -0,0 +1,64 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.services.airport_index import AirportIndex, IndexAnswer
+from app.services.intent_router import IntentRouter, TemplateQuery
+
+AIRPORTS = [
+    {"id": 1, "code": "JFK", "name": "John F. Kennedy International", "city": "New York", "country": "United States", "latitude": 40.64, "longitude": -73.78},
+    {"id": 2, "code": "LGA", "name": "LaGuardia", "city": "New York", "country": "United States", "latitude": 40.78, "longitude": -73.87},
+    {"id": 3, "code": "LHR", "name": "Heathrow", "city": "London", "country": "United Kingdom", "latitude": 51.47, "longitude": -0.45},
+    {"id": 4, "code": "ALL", "name": "Albenga", "city": "Albenga", "country": "Italy", "latitude": 44.05, "longitude": 8.13},
+]
+TODAY = date(2025, 3, 10)
+
+@pytest.fixture
+def router():
+    index = AirportIndex(ttl_seconds=300)
+    index._rebuild(AIRPORTS)
+    return IntentRouter(index)
+
+def test_airport_code_is_answered_from_the_index(router):
+    route = router.route("What is JFK?", today=TODAY)
+    assert isinstance(route, IndexAnswer)
+    assert route.results[0]["code"] == "JFK"
+
+@pytest.mark.parametrize("question", ["show all", "what is all"])
+def test_lowercase_word_is_not_taken_for_a_code(router, question):
+    assert router.route(question, today=TODAY) is None
+
+def test_lowercase_code_counts_when_called_an_airport(router):
+    route = router.route("all airport", today=TODAY)
+    assert isinstance(route, IndexAnswer)
+    assert route.results[0]["code"] == "ALL"
+
+def test_route_between_city_and_code(router):
+    route = router.route("flights from New York to LHR", today=TODAY)
+    assert isinstance(route, TemplateQuery)
+    assert route.intent == "flights_on_route"
+    assert route.params == {"origin_ids": [1, 2], "destination_ids": [3]}
+
+def test_relative_day_gives_utc_bounds(router):
+    route = router.route("flights from JFK to LHR tomorrow", today=TODAY)
+    assert route.params["day_start"] == datetime(2025, 3, 11, tzinfo=timezone.utc)
+    assert route.params["day_end"] == datetime(2025, 3, 12, tzinfo=timezone.utc)
+
+def test_impossible_date_goes_to_the_llm(router):
+    assert router.route("flights from JFK to LHR on 2025-02-30", today=TODAY) is None
+
+def test_unknown_place_goes_to_the_llm(router):
+    assert router.route("flights from Atlantis to LHR", today=TODAY) is None
+
+def test_flight_status(router):
+    route = router.route("status of flight ba 117", today=TODAY)
+    assert route.intent == "flight_status"
+    assert route.params == {"flight_number": "BA117"}
+
+def test_display_sql_inlines_the_parameters(router):
+    route = router.route("flights from JFK to LHR", today=TODAY)
+    assert "IN (1)" in route.display_sql and "IN (3)" in route.display_sql
+    assert ":" not in route.display_sql
+
+def test_other_questions_are_not_routed(router):
+    assert router.route("average delay per airline last month", today=TODAY) is None
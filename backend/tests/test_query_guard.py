@@ -0,0 +1,30 @@
+import pytest
+
+from app.services.query_guard import enforce_limit
+
+def test_limit_is_added():
+    assert enforce_limit("SELECT * FROM airports", 100) == "SELECT * FROM airports LIMIT 100"
+
+def test_larger_limit_is_lowered():
+    assert enforce_limit("SELECT * FROM flights LIMIT 5000;", 100) == "SELECT * FROM flights LIMIT 100"
+
+def test_smaller_limit_is_kept():
+    sql = "SELECT * FROM flights LIMIT 10"
+    assert enforce_limit(sql, 100) == sql
+
+def test_limit_applies_to_the_outer_query():
+    limited = enforce_limit("SELECT * FROM (SELECT * FROM flights LIMIT 5000) AS f", 100)
+    assert limited.endswith(") AS f LIMIT 100")
+    assert "LIMIT 5000" in limited
+
+def test_union_is_limited_as_a_whole():
+    assert enforce_limit("SELECT code FROM airports UNION SELECT code FROM airports", 10).endswith("LIMIT 10")
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM flights LIMIT ALL",
+    "DELETE FROM flights",
+    "SELECT 1; SELECT 2",
+    "SELEC * FRM airports",
+])
+def test_other_statements_are_left_alone(sql):
+    assert enforce_limit(sql, 100) == sql
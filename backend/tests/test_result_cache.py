@@ -0,0 +1,62 @@
+from app.services.result_cache import ResultCache
+from app.services.result_materializer import ResultPage
+
+SQL = "SELECT code, name FROM airports WHERE country = :p0"
+
+def _cache(**overrides):
+    options = {"max_bytes": 1000, "max_entry_bytes": 500, "ttl_seconds": 60, "volatile_ttl_seconds": 5, "version_check_seconds": 2}
+    options.update(overrides)
+    return ResultCache(**options)
+
+def _page(rows):
+    return ResultPage(columns=["code", "name"], values=[(f"A{i:02d}", "x" * 20) for i in range(rows)])
+
+def _put(cache, name, page, sql=SQL):
+    key = cache.key(sql, {"p0": name}, 50, 0)
+    cache.put(key, sql, page, cache.epoch)
+    return key
+
+def test_stored_page_is_returned():
+    cache = _cache()
+    page = _page(2)
+    key = _put(cache, "France", page)
+    assert cache.get(key) is page
+    assert cache.stats()["hits"] == 1
+
+def test_least_recently_used_pages_are_evicted_past_max_bytes():
+    cache = _cache()
+    keys = [_put(cache, f"country{i}", _page(10)) for i in range(3)]
+    cache.get(keys[0])
+    _put(cache, "country3", _page(10))
+    assert cache.stats()["bytes"] <= 1000
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["evictions"] >= 1
+
+def test_oversized_page_is_not_stored():
+    cache = _cache()
+    key = _put(cache, "France", _page(40))
+    assert cache.get(key) is None
+    assert cache.stats()["stores"] == 0
+
+def test_expired_page_is_dropped():
+    cache = _cache(ttl_seconds=0)
+    key = _put(cache, "France", _page(1))
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_write_drops_only_pages_of_that_table():
+    cache = _cache()
+    airports = _put(cache, "France", _page(1))
+    flights = _put(cache, "France", _page(1), sql="SELECT flight_number FROM flights WHERE airline = :p0")
+    cache.invalidate(["flights"])
+    assert cache.get(airports) is not None
+    assert cache.get(flights) is None
+
+def test_page_read_before_an_invalidation_is_not_stored():
+    cache = _cache()
+    epoch = cache.epoch
+    cache.invalidate(["airports"])
+    key = cache.key(SQL, {"p0": "France"}, 50, 0)
+    cache.put(key, SQL, _page(1), epoch)
+    assert cache.get(key) is None
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+from jose import JWTError
+
+from app.core.security import TokenVerifier, create_access_token
+
+def test_valid_token_is_verified_once_then_cached():
+    verifier = TokenVerifier(max_entries=10)
+    token = create_access_token({"sub": "user@example.com"}, timedelta(minutes=5))
+    assert verifier.verify(token)["sub"] == "user@example.com"
+    assert verifier.verify(token)["sub"] == "user@example.com"
+    assert verifier.stats() == {"entries": 1, "hits": 1, "misses": 1, "rejected": 0}
+
+def test_expired_token_is_rejected():
+    verifier = TokenVerifier(max_entries=10)
+    token = create_access_token({"sub": "user@example.com"}, timedelta(seconds=-1))
+    with pytest.raises(JWTError):
+        verifier.verify(token)
+    assert verifier.stats()["rejected"] == 1
+
+def test_cached_claims_past_their_expiry_are_verified_again():
+    verifier = TokenVerifier(max_entries=10)
+    token = create_access_token({"sub": "user@example.com"}, timedelta(minutes=5))
+    verifier.verify(token)
+    verifier._claims[token]["exp"] = 0
+    verifier.verify(token)
+    assert verifier.stats()["misses"] == 2
+
+def test_tampered_token_is_rejected():
+    verifier = TokenVerifier(max_entries=10)
+    token = create_access_token({"sub": "user@example.com"}, timedelta(minutes=5))
+    with pytest.raises(JWTError):
+        verifier.verify(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+
+def test_least_recently_used_tokens_are_dropped():
+    verifier = TokenVerifier(max_entries=2)
+    tokens = [create_access_token({"sub": f"user{i}@example.com"}, timedelta(minutes=5)) for i in range(3)]
+    verifier.verify(tokens[0])
+    verifier.verify(tokens[1])
+    verifier.verify(tokens[0])
+    verifier.verify(tokens[2])
+    assert set(verifier._claims) == {tokens[0], tokens[2]}
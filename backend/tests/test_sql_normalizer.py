@@ -0,0 +1,41 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from app.services.sql_normalizer import normalize_sql
+
+def test_literals_in_where_are_lifted():
+    normalized = normalize_sql("SELECT * FROM airports WHERE country = 'France' AND runways > 2")
+    assert normalized.parameterized
+    assert normalized.sql == "SELECT * FROM airports WHERE country = :p0 AND runways > :p1"
+    assert normalized.params == {"p0": "France", "p1": 2}
+
+def test_queries_differing_in_constants_share_a_fingerprint():
+    first = normalize_sql("SELECT * FROM flights WHERE price < 300 LIMIT 10")
+    second = normalize_sql("SELECT * FROM flights WHERE price < 125.5 LIMIT 50")
+    assert first.sql == second.sql
+    assert first.fingerprint == second.fingerprint
+    assert sorted(second.params.values()) == [50, Decimal("125.5")]
+
+def test_negative_numbers_keep_their_sign():
+    assert normalize_sql("SELECT * FROM airports WHERE longitude < -70").params == {"p0": -70}
+
+def test_dates_and_timestamps_get_python_types():
+    params = normalize_sql(
+        "SELECT * FROM flights WHERE departure_time >= '2025-03-01 08:30' AND departure_time < '2025-03-02'"
+    ).params
+    assert params == {"p0": datetime(2025, 3, 1, 8, 30, tzinfo=timezone.utc), "p1": date(2025, 3, 2)}
+
+def test_timestamps_are_bound_as_utc_and_converted_back_in_sql():
+    normalized = normalize_sql("SELECT * FROM flights WHERE departure_time >= '2025-03-01 08:30'")
+    assert "(CAST(:p0 AS TIMESTAMPTZ) AT TIME ZONE 'UTC')" in normalized.sql
+
+def test_select_list_and_group_by_literals_stay():
+    normalized = normalize_sql("SELECT 'x' AS tag, count(*) FROM flights GROUP BY 1 ORDER BY 2")
+    assert not normalized.parameterized
+    assert normalized.params == {}
+
+def test_unparseable_sql_is_passed_through():
+    sql = "SELEC * FRM airports"
+    normalized = normalize_sql(sql)
+    assert normalized.sql == sql
+    assert not normalized.parameterized